@@ -31,6 +31,8 @@ import sys
 # TODO: ConfigParser is known as configparser in python3
 import ConfigParser
 
+from framework.matcher import TestMatcher
+
 __all__ = ['PIGLIT_CONFIG',
            'Options',
            'collect_system_info',
@@ -89,11 +91,20 @@ class Options(object):
     exclude_filter -- list of compiled regex which exclude tests that match
     valgrind -- True if valgrind is to be used
     dmesg -- True if dmesg checking is desired. This forces concurrency off
+    executor -- the name of the framework.executor executor to run tests with
+    history -- a list of earlier results, used to run the longest tests first
+    reuse_results -- a list of earlier results, tests whose fingerprint is
+                     unchanged since are not run, their result is reused
+    driver_fingerprint -- a string identifying the driver under test, part of
+                          the fingerprint of every test
+    shard -- a [index, count] pair, only shard index of count is run
     env -- environment variables set for each test before run
 
     """
     def __init__(self, concurrent=True, execute=True, include_filter=None,
-                 exclude_filter=None, valgrind=False, dmesg=False, sync=False):
+                 exclude_filter=None, valgrind=False, dmesg=False, sync=False,
+                 executor='threads', history=None, reuse_results=None,
+                 driver_fingerprint='', shard=None):
         self.concurrent = concurrent
         self.execute = execute
         self.filter = [re.compile(x) for x in include_filter or []]
@@ -102,6 +113,11 @@ class Options(object):
         self.valgrind = valgrind
         self.dmesg = dmesg
         self.sync = sync
+        self.executor = executor
+        self.history = history or []
+        self.reuse_results = reuse_results or []
+        self.driver_fingerprint = driver_fingerprint
+        self.shard = list(shard or [1, 1])
 
         # env is used to set some base environment variables that are not going
         # to change across runs, without sending them to os.environ which is
@@ -111,6 +127,10 @@ class Options(object):
                  os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
         }
 
+    def matcher(self):
+        """ Return a matcher.TestMatcher for filter and exclude_filter """
+        return TestMatcher(self.filter, self.exclude_filter)
+
     def __iter__(self):
         for key, values in self.__dict__.iteritems():
             # If the values are regex compiled then yield their pattern
@@ -127,7 +147,8 @@ def collect_system_info():
 
     This method runs through a list of tuples, where element 1 is the name of
     the program being run, and elemnt 2 is a command to run (in a form accepted
-    by subprocess.Popen)
+    by subprocess.Popen). The programs are started at the same time, since
+    glxinfo and lspci can each take a while.
 
     """
     progs = [('wglinfo', ['wglinfo']),
@@ -136,20 +157,25 @@ def collect_system_info():
              ('lspci', ['lspci'])]
 
     result = {}
+    procs = []
 
     for name, command in progs:
         try:
-            result[name] = subprocess.check_output(command,
-                                                   stderr=subprocess.STDOUT)
+            procs.append((name, subprocess.Popen(command,
+                                                 stdout=subprocess.PIPE,
+                                                 stderr=subprocess.STDOUT)))
         except OSError as e:
             # If we get the 'no file or directory' error then pass, that means
             # that the binary isn't installed or isn't relavent to the system
             if e.errno != 2:
                 raise
-        except subprocess.CalledProcessError:
-            # If the binary is installed by doesn't work on the window system
-            # (glxinfo) it will raise this error. go on
-            pass
+
+    for name, proc in procs:
+        out = proc.communicate()[0]
+        # If the binary is installed by doesn't work on the window system
+        # (glxinfo) it will fail. go on
+        if proc.returncode == 0:
+            result[name] = out
 
     return result
 
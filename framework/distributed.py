@@ -0,0 +1,503 @@
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# This permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE AUTHOR(S) BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN
+# AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF
+# OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+""" Run a single piglit run on many machines
+
+A Coordinator owns the list of tests to run and the results backend. Workers
+connect to it over TCP, each loads the same profile, and asks for tests by
+name. Results are sent back to the coordinator as they finish, and are
+written into its backend, so workers don't need to share a filesystem with
+it.
+
+Tests are handed out in batches that shrink as the run goes on: large ones
+at the start keep the traffic down, small ones at the end keep the workers
+finishing at about the same time. A worker that runs out of tests while
+others still have a backlog takes half of the backlog of the busiest one. If
+a worker disconnects, the tests it had not finished are handed out again.
+Workers send a heartbeat every few seconds, a worker that has been silent
+for longer than Coordinator.HEARTBEAT_TIMEOUT, because its machine lost power
+or network, is disconnected the same way.
+
+The protocol is one JSON object per line, each with a 'type':
+
+worker -> coordinator:
+hello -- the first message, with the number of 'jobs' the worker runs at once
+request -- asks for a batch of tests
+result -- the 'result' of the test 'name'
+returned -- the 'names' of tests given up after a steal
+heartbeat -- sent periodically, to show that the worker is still alive
+
+coordinator -> worker:
+setup -- the reply to hello, with the 'setup' the worker needs to load the
+         profile
+batch -- the 'names' of tests to run
+steal -- asks the worker to give up some of the tests it hasn't started
+done -- every test has a result, the worker should exit
+
+"""
+
+import socket
+import threading
+import collections
+import multiprocessing
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+import framework.status as status
+from framework.results import TestResult
+from framework.threads import ReadWriteLock
+from framework.incremental import Fingerprinter
+
+__all__ = [
+    'Coordinator',
+    'Worker',
+    'parse_address',
+]
+
+
+def parse_address(value):
+    """ Convert a 'host:port' string into a (host, port) tuple
+
+    The host may be empty, which means every interface when listening.
+
+    """
+    host, _, port = value.rpartition(':')
+    return (host, int(port))
+
+
+def _encode(obj):
+    """ Encoder for json.dumps that handles status.Status and set """
+    if isinstance(obj, status.Status):
+        return str(obj)
+    elif isinstance(obj, set):
+        return list(obj)
+    raise TypeError(repr(obj) + ' is not JSON serializable')
+
+
+class _Connection(object):
+    """ A socket carrying one JSON message per line in each direction
+
+    send() may be called from several threads at once, receive() from only
+    one.
+
+    """
+    def __init__(self, sock):
+        self._sock = sock
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        self._file = sock.makefile('rb')
+        self._lock = threading.Lock()
+
+    def send(self, message):
+        data = json.dumps(message, default=_encode) + '\n'
+        with self._lock:
+            self._sock.sendall(data)
+
+    def receive(self):
+        """ Return the next message, or None if the connection was closed """
+        line = self._file.readline()
+        if not line.endswith('\n'):
+            return None
+        return json.loads(line)
+
+    def close(self):
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+        self._file.close()
+        self._sock.close()
+
+
+class _Remote(object):
+    """ The coordinator's view of a connected worker """
+    def __init__(self, connection, jobs):
+        self.connection = connection
+        self.jobs = jobs
+
+        # Names of the tests handed to this worker that have no result yet
+        self.assigned = set()
+
+        # True if the worker has asked for tests and not yet received any
+        self.hungry = False
+
+        # True while a steal message sent to this worker is unanswered
+        self.stealing = False
+
+        # False once the worker had no tests to give up, until it sends a
+        # result or a request
+        self.stealable = True
+
+
+class Coordinator(object):
+    """ Hands tests out to workers and collects their results
+
+    The coordinator starts listening when it is created, so workers can
+    connect before run() is called.
+
+    Arguments:
+    names -- the names of the tests to run, in the order to hand them out
+    setup -- a JSON serializable object workers need to load the tests
+    backend -- a results.Backend derived instance the results are written to
+    log -- a log.LogManager instance
+    address -- a (host, port) tuple to listen on, port 0 picks a free port
+
+    """
+    # Batches are sized so that the tests left would take about this many
+    # rounds to hand out to all the connected workers
+    BATCH_ROUNDS = 4
+
+    # Seconds between checks whether the run has finished while waiting for
+    # connections
+    ACCEPT_TIMEOUT = 0.5
+
+    # Seconds without a message after which a worker is considered dead, and
+    # its tests are handed out again. This has to be well above
+    # Worker.HEARTBEAT
+    HEARTBEAT_TIMEOUT = 60
+
+    def __init__(self, names, setup, backend, log, address):
+        self._setup = setup
+        self._backend = backend
+        self._log = log
+        self._pending = collections.deque(names)
+        self._total = len(self._pending)
+        self._done = set()
+        self._remotes = []
+        self._lock = threading.RLock()
+        self._finished = threading.Event()
+        if not self._total:
+            self._finished.set()
+
+        self._listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._listener.bind(address)
+        self._listener.listen(64)
+        self._listener.settimeout(self.ACCEPT_TIMEOUT)
+        self.address = self._listener.getsockname()
+
+    def run(self):
+        """ Serve workers until every test has a result """
+        try:
+            while not self._finished.is_set():
+                try:
+                    sock, _ = self._listener.accept()
+                except socket.timeout:
+                    continue
+                # A timeout ends the reading thread of the worker like a
+                # closed connection does
+                sock.settimeout(self.HEARTBEAT_TIMEOUT)
+                thread = threading.Thread(target=self._handle,
+                                          args=(_Connection(sock),))
+                thread.daemon = True
+                thread.start()
+        finally:
+            self._listener.close()
+
+        with self._lock:
+            for remote in self._remotes:
+                remote.connection.close()
+
+    def _handle(self, connection):
+        """ Thread target reading the messages of one worker """
+        remote = None
+        try:
+            hello = connection.receive()
+            if hello is None or hello.get('type') != 'hello':
+                return
+            remote = _Remote(connection, max(1, int(hello.get('jobs', 1))))
+            with self._lock:
+                if self._finished.is_set():
+                    connection.send({'type': 'done'})
+                    return
+                self._remotes.append(remote)
+                connection.send({'type': 'setup', 'setup': self._setup})
+
+            while True:
+                message = connection.receive()
+                if message is None:
+                    break
+                with self._lock:
+                    self._dispatch(remote, message)
+        except (socket.error, ValueError):
+            pass
+        finally:
+            if remote is not None:
+                with self._lock:
+                    self._lost(remote)
+            connection.close()
+
+    def _dispatch(self, remote, message):
+        kind = message.get('type')
+        if kind == 'request':
+            remote.hungry = True
+            remote.stealable = True
+            self._serve()
+        elif kind == 'result':
+            remote.stealable = True
+            self._result(remote, message['name'], message['result'])
+        elif kind == 'returned':
+            remote.stealing = False
+            if not message['names']:
+                remote.stealable = False
+            for name in message['names']:
+                if name in remote.assigned:
+                    remote.assigned.remove(name)
+                    self._pending.append(name)
+            self._serve()
+
+    def _result(self, remote, name, result):
+        remote.assigned.discard(name)
+        if name in self._done:
+            return
+        self._done.add(name)
+
+        result = TestResult(result)
+        log = self._log.get()
+        log.start(name)
+        self._backend.write_test(name, result)
+        log.log(str(result['result']))
+
+        if len(self._done) == self._total:
+            self._finish()
+
+    def _lost(self, remote):
+        """ Hand the unfinished tests of a worker that went away to others """
+        if remote not in self._remotes:
+            return
+        self._remotes.remove(remote)
+        # Put them first, they were handed out before the ones still pending
+        self._pending.extendleft(sorted(remote.assigned - self._done,
+                                        reverse=True))
+        remote.assigned.clear()
+        self._serve()
+
+    def _batch_size(self, remote):
+        jobs = sum(r.jobs for r in self._remotes)
+        size = len(self._pending) * remote.jobs // (jobs * self.BATCH_ROUNDS)
+        return min(len(self._pending), max(remote.jobs, size))
+
+    def _serve(self):
+        """ Send tests to hungry workers, stealing them if none are left """
+        for remote in self._remotes:
+            if not remote.hungry:
+                continue
+            if self._pending:
+                names = [self._pending.popleft()
+                         for _ in xrange(self._batch_size(remote))]
+                remote.assigned.update(names)
+                remote.hungry = False
+                self._send(remote, {'type': 'batch', 'names': names})
+                continue
+
+            # Only a worker with more tests than it can run at once has any
+            # that it hasn't started, and it gives up half of those rounded
+            # down, so it needs at least two
+            victims = [r for r in self._remotes if r is not remote and
+                       not r.stealing and r.stealable and
+                       len(r.assigned) >= r.jobs + 2]
+            if victims:
+                victim = max(victims, key=lambda r: len(r.assigned) - r.jobs)
+                victim.stealing = True
+                self._send(victim, {'type': 'steal'})
+
+    def _send(self, remote, message):
+        try:
+            remote.connection.send(message)
+        except socket.error:
+            # The reading thread will notice and call _lost()
+            pass
+
+    def _finish(self):
+        self._finished.set()
+        for remote in self._remotes:
+            self._send(remote, {'type': 'done'})
+
+
+class Worker(object):
+    """ Runs tests handed out by a Coordinator
+
+    Arguments:
+    address -- the (host, port) tuple of the coordinator
+    load -- a callable that takes the setup sent by the coordinator, and
+            returns a tuple of a dictionary mapping test names to tests, the
+            core.Options of the run, and a dmesg.BaseDmesg derived instance.
+            It is called once, after connecting
+    log -- a log.LogManager instance
+
+    Keyword Arguments:
+    jobs -- the number of tests to run at once. Default: the number of
+            processor cores
+
+    """
+    # Seconds between heartbeats sent to the coordinator
+    HEARTBEAT = 10
+
+    def __init__(self, address, load, log, jobs=None):
+        self.address = address
+        self.jobs = jobs or multiprocessing.cpu_count()
+        self.completed = 0
+        self._load = load
+        self._log = log
+        self._connection = None
+        self._queue = collections.deque()
+        self._requested = False
+        self._done = False
+        self._cond = threading.Condition(threading.Lock())
+        self._stopped = threading.Event()
+
+    def run(self):
+        """ Connect to the coordinator and run tests until it says done
+
+        Raises socket.error if the coordinator cannot be reached.
+
+        """
+        self._connection = _Connection(socket.create_connection(self.address))
+        # Heartbeats are sent while loading the profile too, which can take a
+        # while
+        heartbeat = threading.Thread(target=self._heartbeat)
+        heartbeat.daemon = True
+        heartbeat.start()
+        try:
+            self._connection.send({'type': 'hello', 'jobs': self.jobs})
+            message = self._connection.receive()
+            if message is None or message['type'] != 'setup':
+                return
+            tests, opts, dmesg = self._load(message['setup'])
+            fingerprinter = Fingerprinter(opts.driver_fingerprint)
+
+            reader = threading.Thread(target=self._read)
+            reader.daemon = True
+            reader.start()
+
+            lock = ReadWriteLock()
+            threads = []
+            for _ in xrange(self.jobs):
+                thread = threading.Thread(target=self._work,
+                                          args=(tests, opts, dmesg, lock,
+                                                fingerprinter))
+                thread.daemon = True
+                thread.start()
+                threads.append(thread)
+
+            # Join with a timeout, so that KeyboardInterrupt gets through
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(0.5)
+        finally:
+            self._stopped.set()
+            self._connection.close()
+
+    def _heartbeat(self):
+        """ Thread target telling the coordinator the worker is alive """
+        try:
+            while not self._stopped.wait(self.HEARTBEAT):
+                self._connection.send({'type': 'heartbeat'})
+        except socket.error:
+            pass
+
+    def _read(self):
+        """ Thread target reading the messages of the coordinator """
+        try:
+            while True:
+                message = self._connection.receive()
+                if message is None or message['type'] == 'done':
+                    break
+                elif message['type'] == 'batch':
+                    with self._cond:
+                        self._queue.extend(message['names'])
+                        self._requested = False
+                        self._cond.notify_all()
+                elif message['type'] == 'steal':
+                    with self._cond:
+                        names = [self._queue.pop()
+                                 for _ in xrange(len(self._queue) // 2)]
+                    self._connection.send({'type': 'returned',
+                                           'names': names})
+        except (socket.error, ValueError):
+            pass
+        finally:
+            with self._cond:
+                self._done = True
+                self._cond.notify_all()
+
+    def _next(self):
+        """ Return the name of the next test to run, or None once done
+
+        More tests are requested while there is still one per job left, so
+        that they arrive before the queue runs dry.
+
+        """
+        while True:
+            with self._cond:
+                request = (not self._requested and not self._done and
+                           len(self._queue) <= self.jobs)
+                if request:
+                    self._requested = True
+                elif self._queue:
+                    return self._queue.popleft()
+                elif self._done:
+                    return None
+                else:
+                    self._cond.wait()
+                    continue
+            self._connection.send({'type': 'request'})
+
+    def _work(self, tests, opts, dmesg, lock, fingerprinter):
+        """ Thread target running tests one after another """
+        if opts.concurrent == 'all':
+            exclusive = lambda _: False
+        elif opts.concurrent == 'none':
+            exclusive = lambda _: True
+        else:
+            exclusive = lambda t: not t.run_concurrent
+
+        try:
+            while True:
+                name = self._next()
+                if name is None:
+                    return
+
+                test = tests.get(name)
+                if test is None:
+                    result = TestResult({
+                        'result': 'fail',
+                        'exception': 'Test is not in the profile of the '
+                                     'worker'})
+                else:
+                    hold = lock.write if exclusive(test) else lock.read
+                    with hold():
+                        test.execute(name, self._log.get(), dmesg)
+                    result = test.result
+                    if opts.execute:
+                        result['fingerprint'] = fingerprinter.fingerprint(test)
+
+                self._connection.send({'type': 'result', 'name': name,
+                                       'result': result})
+                if test is not None:
+                    test.release()
+                with self._cond:
+                    self.completed += 1
+        except socket.error:
+            with self._cond:
+                self._done = True
+                self._cond.notify_all()
@@ -29,17 +29,20 @@ import shlex
 import time
 import sys
 import traceback
-from datetime import datetime
 import threading
+import select
 import signal
 import itertools
+import heapq
 import abc
+import collections
+import ConfigParser
 try:
     import simplejson as json
 except ImportError:
     import json
 
-from framework.core import Options
+from framework.core import Options, PIGLIT_CONFIG
 from framework.results import TestResult
 
 
@@ -54,54 +57,560 @@ else:
                                                  '../bin'))
 
 
-class ProcessTimeout(threading.Thread):
-    """ Timeout class for test processes
+def _monotonic():
+    """ Seconds since an arbitrary point, unaffected by changes to the clock
 
-    This class is for terminating tests that run for longer than a certain
-    amount of time. Create an instance by passing it a timeout in seconds
-    and the Popen object that is running your test. Then call the start
-    method (inherited from Thread) to start the timer. The Popen object is
-    killed if the timeout is reached and it has not completed. Wait for the
-    outcome by calling the join() method from the parent.
+    Python 2 has no time.monotonic(), but the elapsed real time reported by
+    times() is monotonic on the platforms piglit runs timeouts on.
 
     """
+    return os.times()[4]
 
-    def __init__(self, timeout, proc):
-        threading.Thread.__init__(self)
+
+class Watchdog(object):
+    """ Enforces the timeouts of all running test processes
+
+    Rather than one timer thread per test, every TestProcess with a timeout
+    registers with a single Watchdog. It keeps a heap of deadlines and has one
+    thread, started on demand, that sleeps until the earliest of them.
+
+    A process that is still running at its deadline is sent SIGTERM. If it is
+    still running after the grace period its whole process group is killed
+    with SIGKILL.
+
+    The grace period can be set in the [core] section of piglit.conf as
+    timeout_grace, in seconds. It defaults to 5.
+
+    """
+    DEFAULT_GRACE = 5
+
+    def __init__(self):
+        # Overrides piglit.conf if set
+        self.grace = None
+
+        self._lock = threading.Lock()
+        self._heap = []
+        self._count = itertools.count()
+        self._thread = None
+
+        # Writing into this pipe wakes the thread when an earlier deadline is
+        # added than the one it is sleeping until
+        self._wake_r, self._wake_w = os.pipe()
+
+    def _grace(self):
+        if self.grace is not None:
+            return self.grace
+        try:
+            return float(PIGLIT_CONFIG.get('core', 'timeout_grace'))
+        except (ConfigParser.NoOptionError, ConfigParser.NoSectionError):
+            return self.DEFAULT_GRACE
+
+    def watch(self, process):
+        """ Start enforcing the timeout of a TestProcess """
+        self._push(_monotonic() + process.timeout, process)
+
+    def cancel(self, process):
+        """ Stop watching a TestProcess that has finished """
+        with self._lock:
+            process.watchdog_entry = None
+
+    def _push(self, deadline, process):
+        entry = [deadline, next(self._count), process]
+        with self._lock:
+            process.watchdog_entry = entry
+            heapq.heappush(self._heap, entry)
+            earliest = self._heap[0] is entry
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run)
+                self._thread.daemon = True
+                self._thread.start()
+        if earliest:
+            os.write(self._wake_w, 'x')
+
+    def _expire(self, now):
+        """ Act on every deadline up to now, returns the next deadline """
+        expired = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                entry = heapq.heappop(self._heap)
+                # Entries of cancelled or rescheduled processes are skipped
+                if entry[2].watchdog_entry is entry:
+                    entry[2].watchdog_entry = None
+                    expired.append(entry[2])
+            # Don't let cancelled entries pile up at the top of the heap
+            while self._heap and self._heap[0][2].watchdog_entry is not \
+                    self._heap[0]:
+                heapq.heappop(self._heap)
+
+        for process in expired:
+            # The process is reaped by whoever is waiting for it, polling it
+            # from here could steal its exit status
+            if process.proc.returncode is not None:
+                continue
+            try:
+                if process.timeout_status == 0:
+                    process.terminate()
+                    self._push(now + self._grace(), process)
+                else:
+                    process.kill()
+            except OSError as e:
+                # The process exited in the meantime
+                if e.errno != errno.ESRCH:
+                    raise
+
+        with self._lock:
+            return self._heap[0][0] if self._heap else None
+
+    def _run(self):
+        while True:
+            deadline = self._expire(_monotonic())
+            timeout = None
+            if deadline is not None:
+                timeout = max(0, deadline - _monotonic())
+            try:
+                readable = select.select([self._wake_r], [], [], timeout)[0]
+            except select.error:
+                continue
+            if readable:
+                os.read(self._wake_r, 512)
+
+
+# The watchdog shared by all tests
+WATCHDOG = Watchdog()
+
+
+class Spawner(object):
+    """ Starts test processes
+
+    The environment variables of a test are taken from the following sources, listed in order of increasing precedence:
+
+      1. This process's current environment.
+      2. Global test options. (Some of these are command line options to
+         Piglit's runner script).
+      3. Per-test environment variables set in all.py.
+
+    Piglit chooses this order because Unix tradition dictates that command
+    line options (2) override environment variables (1); and Piglit considers
+    environment variables set in all.py (3) to be test requirements.
+
+    The first two sources are the same for every test of a run, so they are
+    merged once and cached. Tests without environment variables of their own
+    share that dictionary, the others get a copy with their variables laid
+    over it. reset() drops the cache, TestProfile.run() calls it at the start
+    of each run.
+
+    Each test process is put into a process group of its own, so that the
+    watchdog can kill it along with any children it has started. Where
+    subprocess supports it this is done with start_new_session, which
+    doesn't need a python callback to run between fork and exec.
+
+    """
+    if sys.version_info >= (3, 2):
+        _SESSION = {'start_new_session': True}
+    elif hasattr(os, 'setpgrp'):
+        _SESSION = {'preexec_fn': os.setpgrp}
+    else:
+        _SESSION = {}
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key = None
+        self._base = None
+
+    def reset(self):
+        """ Drop the cached base environment """
+        with self._lock:
+            self._key = None
+            self._base = None
+
+    def environment(self, opts, env):
+        """ Return the full environment for a test
+
+        Arguments:
+        opts -- the core.Options instance of the run
+        env -- the environment variables of the test itself
+
+        """
+        key = (id(opts), tuple(sorted(opts.env.iteritems())))
+        with self._lock:
+            if key != self._key:
+                base = dict(os.environ)
+                base.update((k, str(v)) for k, v in opts.env.iteritems())
+                self._key = key
+                self._base = base
+            base = self._base
+
+        if not env:
+            return base
+        fullenv = base.copy()
+        fullenv.update((k, str(v)) for k, v in env.iteritems())
+        return fullenv
+
+    def spawn(self, command, cwd, opts, env):
+        """ Start a test process with its output connected to pipes
+
+        Returns a subprocess.Popen instance, raises OSError if the command
+        cannot be executed.
+
+        Arguments:
+        command -- the command to run, as a list
+        cwd -- the directory to run it in, or None
+        opts -- the core.Options instance of the run
+        env -- the environment variables of the test itself
+
+        """
+        return subprocess.Popen(command,
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE,
+                                cwd=cwd,
+                                env=self.environment(opts, env),
+                                universal_newlines=True,
+                                **self._SESSION)
+
+
+# The spawner shared by all tests
+SPAWNER = Spawner()
+
+
+def _output_limit():
+    """ Return the number of bytes of each output stream to keep, 0 for all
+
+    This is read from output_limit in the [core] section of piglit.conf.
+
+    """
+    try:
+        return int(PIGLIT_CONFIG.get('core', 'output_limit'))
+    except (ConfigParser.NoOptionError, ConfigParser.NoSectionError):
+        return OutputCapture.DEFAULT_LIMIT
+
+
+def _no_hook():
+    """ The default Test._test_hook_execute_run, does nothing """
+    pass
+
+
+def _rusage(usage):
+    """ Convert a resource.struct_rusage into a dictionary for TestResult
+
+    Times are in seconds, maxrss is in the unit getrusage(2) uses on the
+    platform (KiB on Linux).
+
+    """
+    return {
+        'utime': usage.ru_utime,
+        'stime': usage.ru_stime,
+        'maxrss': usage.ru_maxrss,
+        'minflt': usage.ru_minflt,
+        'majflt': usage.ru_majflt,
+        'nvcsw': usage.ru_nvcsw,
+        'nivcsw': usage.ru_nivcsw,
+    }
+
+
+def _returncode(status):
+    """ Convert a wait() status into a returncode the way subprocess does """
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+class OutputCapture(object):
+    """ Captures one output stream of a test process in bounded memory
+
+    The data fed in is kept in full until it reaches limit bytes. After that
+    only the first and the last limit / 2 bytes are kept, and a marker noting
+    how many bytes were dropped is put between them. This keeps a test that
+    floods its output from using unbounded memory, while keeping the start of
+    the output, which tends to explain what the test was doing, and the end,
+    which tends to explain how it failed.
+
+    If a prefix is given, whole lines starting with it are split off into
+    status_lines as they arrive, rather than being kept with the rest of the
+    output, so they are never lost to truncation.
+
+    Arguments:
+    limit -- the number of bytes to keep, 0 to keep everything. At least one
+             byte of the head and of the tail is kept.
+
+    Keyword Arguments:
+    prefix -- lines starting with this string are collected in status_lines
+
+    """
+    # The default for output_limit in piglit.conf, 1 MiB
+    DEFAULT_LIMIT = 1 << 20
+
+    # A line longer than this is never treated as a status line, this bounds
+    # the memory used for an incomplete line
+    MAX_LINE = 1 << 16
+
+    MARKER = '\n[... {0} bytes of output truncated by piglit ...]\n'
+
+    def __init__(self, limit, prefix=None):
+        self.limit = limit
+        self.prefix = prefix
+        self.status_lines = []
+        self.truncated = 0
+
+        self.__head = []
+        self.__head_size = 0
+        self.__tail = collections.deque()
+        self.__tail_size = 0
+        self.__partial = ''
+
+    def feed(self, data):
+        """ Add data read from the stream """
+        if self.prefix is None:
+            self.__store(data)
+            return
+
+        # Only complete lines can be checked for the prefix, keep the last,
+        # incomplete line until the rest of it arrives
+        data = self.__partial + data
+        end = data.rfind('\n') + 1
+        data, self.__partial = data[:end], data[end:]
+
+        if self.prefix in data:
+            kept = []
+            for line in data.splitlines(True):
+                if line.startswith(self.prefix):
+                    self.status_lines.append(line.rstrip('\r\n'))
+                else:
+                    kept.append(line)
+            data = ''.join(kept)
+        self.__store(data)
+
+        if len(self.__partial) > self.MAX_LINE:
+            self.__store(self.__partial)
+            self.__partial = ''
+
+    def close(self):
+        """ Called at the end of the stream, handles a final unfinished line
+        """
+        partial, self.__partial = self.__partial, ''
+        if self.prefix is not None and partial.startswith(self.prefix):
+            self.status_lines.append(partial.rstrip('\r'))
+        else:
+            self.__store(partial)
+
+    def __store(self, data):
+        if not data:
+            return
+        if not self.limit:
+            self.__head.append(data)
+            return
+
+        half = max(self.limit // 2, 1)
+        if self.__head_size < half:
+            take = data[:half - self.__head_size]
+            self.__head.append(take)
+            self.__head_size += len(take)
+            data = data[len(take):]
+            if not data:
+                return
+
+        self.__tail.append(data)
+        self.__tail_size += len(data)
+        while self.__tail and self.__tail_size - len(self.__tail[0]) >= half:
+            dropped = len(self.__tail.popleft())
+            self.__tail_size -= dropped
+            self.truncated += dropped
+        if self.__tail_size > half:
+            dropped = self.__tail_size - half
+            self.__tail[0] = self.__tail[0][dropped:]
+            self.__tail_size = half
+            self.truncated += dropped
+
+    @property
+    def value(self):
+        """ The captured output, with a marker where it was truncated """
+        value = ''.join(self.__head)
+        if self.truncated:
+            value += self.MARKER.format(self.truncated)
+        return value + ''.join(self.__tail)
+
+
+class TestProcess(object):
+    """ A running test process and the output it has produced
+
+    Test creates one of these each time it spawns its command. The process can
+    be run to completion in the calling thread with wait(), or an executor can
+    multiplex many of them, passing the output of each pipe to feed() as it
+    arrives, and calling close() once the process has exited. If it has a
+    timeout the process is registered with WATCHDOG, which will terminate it
+    if it overruns.
+
+    Output is captured with an OutputCapture per pipe, bounded by
+    output_limit from piglit.conf. Lines of stdout starting with prefix are
+    collected separately, and are available as status_lines.
+
+    Where os.wait4() is available the process is reaped with it, and the
+    resources it used are available as a dictionary in rusage, otherwise
+    rusage is None.
+
+    Arguments:
+    proc -- a subprocess.Popen instance with stdout and stderr pipes
+    timeout -- the time in seconds the process may run, 0 for no limit
+
+    Keyword Arguments:
+    prefix -- stdout lines starting with this string are kept apart from the
+              rest of the output. Default: None
+    limit -- the number of bytes of each pipe to keep, 0 for all. Default: the
+             output_limit set in piglit.conf
+
+    """
+    def __init__(self, proc, timeout, prefix=None, limit=None):
         self.proc = proc
         self.timeout = timeout
-        self.status = 0
 
-    def run(self):
-        start_time = datetime.now()
-        delta = 0
+        # 0 if the process finished on its own, 1 if it had to be terminated,
+        # and 2 if it had to be killed
+        self.timeout_status = 0
+        self.rusage = None
+
+        if limit is None:
+            limit = _output_limit()
+        self.__out = OutputCapture(limit, prefix)
+        self.__err = OutputCapture(limit)
 
-        # poll() returns the returncode attribute, which is either the return
-        # code of the child process (which could be zero), or None if the
-        # process has not yet terminated.
+        # Set and cleared by WATCHDOG
+        self.watchdog_entry = None
+        if self.timeout > 0:
+            WATCHDOG.watch(self)
 
-        while delta < self.timeout and self.proc.poll() is None:
-            time.sleep(1)
-            delta = (datetime.now() - start_time).total_seconds()
+    @property
+    def pid(self):
+        return self.proc.pid
+
+    @property
+    def returncode(self):
+        return self.proc.returncode
+
+    @property
+    def out(self):
+        return self.__translate(self.__out.value)
+
+    @property
+    def err(self):
+        return self.__translate(self.__err.value)
+
+    @property
+    def status_lines(self):
+        return self.__out.status_lines
+
+    @staticmethod
+    def __translate(text):
+        """ Convert line endings the same way universal_newlines does """
+        return text.replace('\r\n', '\n').replace('\r', '\n')
 
-        # if the test is not finished after timeout, first try to terminate it
-        # and if that fails, send SIGKILL to all processes in the test's
-        # process group
+    def feed(self, stream, data):
+        """ Add data read from one of the process' pipes
 
-        if self.proc.poll() is None:
-            self.status = 1
-            self.proc.terminate()
-            time.sleep(5)
+        Arguments:
+        stream -- either self.proc.stdout or self.proc.stderr
+        data -- the bytes read from that pipe
+
+        """
+        if stream is self.proc.stdout:
+            self.__out.feed(data)
+        else:
+            self.__err.feed(data)
+
+    def terminate(self):
+        """ Ask the process to stop after it overran its timeout """
+        self.timeout_status = 1
+        self.proc.terminate()
+
+    def kill(self):
+        """ Kill the process group of a process that ignored terminate() """
+        self.timeout_status = 2
+        if hasattr(os, 'killpg'):
+            os.killpg(self.proc.pid, signal.SIGKILL)
+        else:
+            self.proc.kill()
+
+    def reap(self, block=True):
+        """ Collect the exit status of the process
+
+        Returns the returncode, or None if block is False and the process is
+        still running.
+
+        """
+        if self.proc.returncode is not None:
+            return self.proc.returncode
+        if not hasattr(os, 'wait4'):
+            if block:
+                return self.proc.wait()
+            return self.proc.poll()
+
+        while True:
+            try:
+                pid, status, usage = os.wait4(self.proc.pid,
+                                              0 if block else os.WNOHANG)
+            except OSError as e:
+                if e.errno == errno.EINTR:
+                    continue
+                if e.errno == errno.ECHILD:
+                    # Somebody else reaped it, let subprocess sort it out
+                    return self.proc.poll()
+                raise
+            break
+
+        if pid == 0:
+            return None
+        self.rusage = _rusage(usage)
+        self.proc.returncode = _returncode(status)
+        return self.proc.returncode
+
+    def close(self):
+        """ Called once the process has exited """
+        if self.timeout > 0:
+            WATCHDOG.cancel(self)
+        self.__out.close()
+        self.__err.close()
+
+    def wait(self):
+        """ Run the process to completion in the calling thread
+
+        Both pipes are read as the output arrives, rather than with
+        communicate(), so that the output is bounded while it is captured.
 
-        if self.proc.poll() is None:
-            self.status = 2
-            if hasattr(os, 'killpg'):
-                os.killpg(self.proc.pid, signal.SIGKILL)
-            self.proc.wait()
+        """
+        streams = dict((s.fileno(), s)
+                       for s in [self.proc.stdout, self.proc.stderr])
+        if hasattr(select, 'poll'):
+            poll = select.poll()
+            for fd in streams:
+                poll.register(fd, select.POLLIN | select.POLLPRI)
+        else:
+            poll = None
 
-    def join(self):
-        threading.Thread.join(self)
-        return self.status
+        while streams:
+            try:
+                if poll is not None:
+                    readable = [fd for fd, _ in poll.poll()]
+                else:
+                    readable = select.select(list(streams), [], [])[0]
+            except (select.error, IOError, OSError) as e:
+                if e.args[0] == errno.EINTR:
+                    continue
+                raise
+
+            for fd in readable:
+                try:
+                    data = os.read(fd, 65536)
+                except OSError as e:
+                    if e.errno in [errno.EAGAIN, errno.EINTR]:
+                        continue
+                    data = ''
+                if data:
+                    self.feed(streams[fd], data)
+                    continue
+                if poll is not None:
+                    poll.unregister(fd)
+                streams.pop(fd).close()
+
+        self.reap()
+        self.close()
 
 
 class Test(object):
@@ -116,6 +625,12 @@ class Test(object):
     from the command line, run() is a more basic method for running the test,
     and is called internally by execute(), but is can be useful outside of it.
 
+    A profile holds tens of thousands of tests, so they are kept small: the
+    env and result dictionaries are only created when they are first used,
+    the strings of commands are interned so that the binaries and arguments
+    shared by many tests are stored once, and subclasses that are created in
+    bulk define __slots__ as well.
+
     Arguments:
     command -- a value to be passed to subprocess.Popen
 
@@ -125,22 +640,27 @@ class Test(object):
     """
     OPTS = Options()
     __metaclass__ = abc.ABCMeta
-    __slots__ = ['run_concurrent', 'env', 'result', 'cwd', '_command',
-                 '_test_hook_execute_run', '__proc_timeout']
+    __slots__ = ['run_concurrent', '_env', '_result', 'cwd', '_command',
+                 '_status_lines', '_test_hook_execute_run']
     timeout = 0
 
+    # Lines of stdout starting with this are collected into _status_lines as
+    # the test runs, instead of being stored in the 'out' of the result
+    _status_prefix = None
+
     def __init__(self, command, run_concurrent=False):
         self._command = None
         self.run_concurrent = run_concurrent
         self.command = command
-        self.env = {}
-        self.result = TestResult({'result': 'fail'})
+        self._env = None
+        self._result = None
         self.cwd = None
-        self.__proc_timeout = None
+        self._status_lines = None
 
         # This is a hook for doing some testing on execute right before
-        # self.run is called.
-        self._test_hook_execute_run = lambda: None
+        # self.run is called. It is a named function rather than a lambda so
+        # that tests can be pickled by the profile cache
+        self._test_hook_execute_run = _no_hook
 
     def execute(self, path, log, dmesg):
         """ Run a test
@@ -153,6 +673,26 @@ class Test(object):
         log -- a log.Log instance
         dmesg -- a dmesg.BaseDmesg derived class
 
+        """
+        for process in self.execute_steps(path, log, dmesg):
+            process.wait()
+
+    def execute_steps(self, path, log, dmesg):
+        """ Run a test one process at a time
+
+        This is the generator behind execute(). It yields a TestProcess each
+        time the test has spawned a process, and expects that process to have
+        finished when it is resumed. This allows an executor to supervise the
+        processes of many tests without dedicating a thread to each one.
+
+        Subclasses that override run() cannot be split up this way, their
+        run() is called directly and nothing is yielded.
+
+        Arguments:
+        path -- the name of the test
+        log -- a log.Log instance
+        dmesg -- a dmesg.BaseDmesg derived class
+
         """
         log.start(path)
         # Run the test
@@ -161,7 +701,11 @@ class Test(object):
                 time_start = time.time()
                 dmesg.update_dmesg()
                 self._test_hook_execute_run()
-                self.run()
+                if self.has_steps():
+                    for process in self._run_steps():
+                        yield process
+                else:
+                    self.run()
                 self.result['time'] = time.time() - time_start
                 self.result = dmesg.update_result(self.result)
             # This is a rare case where a bare exception is okay, since we're
@@ -177,8 +721,73 @@ class Test(object):
         else:
             log.log('dry-run')
 
+    def invocation_key(self):
+        """ Return a key that is equal for tests that run the same way
+
+        Tests with the same key run the same command, with the same
+        environment, in the same directory, and interpret the result the same
+        way, so they get the same result and only one of them has to run.
+
+        """
+        return (type(self), self._invocation(), self.cwd, self.timeout,
+                bool(self.run_concurrent),
+                tuple(sorted((self._env or {}).iteritems())))
+
+    def _invocation(self):
+        """ Return what identifies the command of a test for invocation_key()
+
+        Subclasses that create their command lazily can return what the
+        command is created from instead, so that it doesn't have to be.
+
+        """
+        return tuple(self.command)
+
+    def release(self):
+        """ Drop the result of a test once it has been written out
+
+        The result holds the output of the test, keeping it for every test
+        that has run makes the memory of a run grow with its length. The test
+        can still be run again afterwards.
+
+        """
+        self._result = None
+        self._status_lines = None
+
+    def has_steps(self):
+        """ Return True if run() can be split up by execute_steps()
+
+        This is False for subclasses that override run(), since the steps
+        would skip over the overridden method.
+
+        """
+        return type(self).run.__func__ is Test.run.__func__
+
+    @property
+    def env(self):
+        """ Environment variables set for this test only """
+        if self._env is None:
+            self._env = {}
+        return self._env
+
+    @env.setter
+    def env(self, value):
+        self._env = value
+
+    @property
+    def result(self):
+        """ The TestResult of the test, a failure until it has run """
+        if self._result is None:
+            self._result = TestResult({'result': 'fail'})
+        return self._result
+
+    @result.setter
+    def result(self, value):
+        self._result = value
+
     @property
     def command(self):
+        if self._command is None:
+            self.command = self._create_command()
         assert self._command
         if self.OPTS.valgrind:
             return ['valgrind', '--quiet', '--error-exitcode=1',
@@ -188,10 +797,23 @@ class Test(object):
     @command.setter
     def command(self, value):
         if isinstance(value, basestring):
-            self._command = shlex.split(str(value))
-            return
+            value = shlex.split(str(value))
+        if value is not None:
+            value = [intern(a) if type(a) is str else a for a in value]
         self._command = value
 
+    def _create_command(self):
+        """ Create the command of a test that was created without one
+
+        Subclasses that need to do work to find out their command, like
+        reading a test file, can pass None as the command, and override this
+        to do that work the first time command is used. This keeps loading a
+        profile cheap, and skips the work entirely for tests that are
+        filtered out.
+
+        """
+        return None
+
     @abc.abstractmethod
     def interpret_result(self):
         """ Convert the raw output of the test into a form piglit understands
@@ -206,6 +828,16 @@ class Test(object):
         * For 'info', the value will include stderr/out text.
         * For 'returncode', the value will be the numeric exit code/value.
         * For 'command', the value will be command line program and arguments.
+        """
+        for process in self._run_steps():
+            process.wait()
+
+    def _run_steps(self):
+        """ Generator implementing run()
+
+        Yields each TestProcess spawned, which must be finished before the
+        generator is resumed.
+
         """
         self.result['command'] = ' '.join(self.command)
         self.result['environment'] = " ".join(
@@ -222,7 +854,10 @@ class Test(object):
         # https://bugzilla.gnome.org/show_bug.cgi?id=680214 is affecting many
         # developers. If we catch it happening, try just re-running the test.
         for _ in xrange(5):
-            self.__run_command()
+            process = self.__start_command()
+            if process is not None:
+                yield process
+                self.__finish_command(process)
             if "Got spurious window resize" not in self.result['out']:
                 break
 
@@ -236,7 +871,7 @@ class Test(object):
 
         if self.result['returncode'] < 0:
             # check if the process was terminated by the timeout
-            if self.timeout > 0 and self.__proc_timeout.join() > 0:
+            if self.timeout > 0 and process.timeout_status > 0:
                 self.result['result'] = 'timeout'
             else:
                 self.result['result'] = 'crash'
@@ -264,54 +899,16 @@ class Test(object):
         """
         return False
 
-    def __set_process_group(self):
-        if hasattr(os, 'setpgrp'):
-            os.setpgrp()
+    def __start_command(self):
+        """ Start the test command
 
-    def __run_command(self):
-        """ Run the test command and get the result
-
-        This method sets environment options, then runs the executable. If the
-        executable isn't found it sets the result to skip.
+        This method starts the executable through SPAWNER. If the executable
+        isn't found it sets the result to skip and returns None, otherwise it
+        returns a TestProcess.
 
         """
-        # Setup the environment for the test. Environment variables are taken
-        # from the following sources, listed in order of increasing precedence:
-        #
-        #   1. This process's current environment.
-        #   2. Global test options. (Some of these are command line options to
-        #      Piglit's runner script).
-        #   3. Per-test environment variables set in all.py.
-        #
-        # Piglit chooses this order because Unix tradition dictates that
-        # command line options (2) override environment variables (1); and
-        # Piglit considers environment variables set in all.py (3) to be test
-        # requirements.
-        #
-        fullenv = dict()
-        for key, value in itertools.chain(os.environ.iteritems(),
-                                          self.OPTS.env.iteritems(),
-                                          self.env.iteritems()):
-            fullenv[key] = str(value)
-
         try:
-            proc = subprocess.Popen(self.command,
-                                    stdout=subprocess.PIPE,
-                                    stderr=subprocess.PIPE,
-                                    cwd=self.cwd,
-                                    env=fullenv,
-                                    universal_newlines=True,
-                                    preexec_fn=self.__set_process_group)
-            # create a ProcessTimeout object to watch out for test hang if the
-            # process is still going after the timeout, then it will be killed
-            # forcing the communicate function (which is a blocking call) to
-            # return
-            if self.timeout > 0:
-                self.__proc_timeout = ProcessTimeout(self.timeout, proc)
-                self.__proc_timeout.start()
-
-            out, err = proc.communicate()
-            returncode = proc.returncode
+            proc = SPAWNER.spawn(self.command, self.cwd, self.OPTS, self.env)
         except OSError as e:
             # Different sets of tests get built under
             # different build configurations.  If
@@ -320,12 +917,17 @@ class Test(object):
             # failed.
             if e.errno == errno.ENOENT:
                 self.result['result'] = 'skip'
-                out = "Test executable not found.\n"
-                err = ""
-                returncode = None
+                self.result['out'] = u"Test executable not found.\n"
+                self.result['err'] = u""
+                self.result['returncode'] = None
+                return None
             else:
                 raise e
 
+        return TestProcess(proc, self.timeout, prefix=self._status_prefix)
+
+    def __finish_command(self, process):
+        """ Store the output and returncode of a finished TestProcess """
         # proc.communicate() returns 8-bit strings, but we need
         # unicode strings.  In Python 2.x, this is because we
         # will eventually be serializing the strings as JSON,
@@ -340,9 +942,12 @@ class Test(object):
         # replaces erroneous charcters with the Unicode
         # "replacement character" (a white question mark inside
         # a black diamond).
-        self.result['out'] = out.decode('utf-8', 'replace')
-        self.result['err'] = err.decode('utf-8', 'replace')
-        self.result['returncode'] = returncode
+        self.result['out'] = process.out.decode('utf-8', 'replace')
+        self.result['err'] = process.err.decode('utf-8', 'replace')
+        self.result['returncode'] = process.returncode
+        self._status_lines = process.status_lines
+        if process.rusage is not None:
+            self.result['rusage'] = process.rusage
 
 
 class PiglitTest(Test):
@@ -352,11 +957,16 @@ class PiglitTest(Test):
     Expect one line prefixed PIGLIT: in the output, which contains a result
     dictionary. The plain output is appended to this dictionary
     """
+    __slots__ = []
+
     def __init__(self, *args, **kwargs):
         super(PiglitTest, self).__init__(*args, **kwargs)
 
-        # Prepend TEST_BIN_DIR to the path.
-        self._command[0] = os.path.join(TEST_BIN_DIR, self._command[0])
+        # Prepend TEST_BIN_DIR to the path. Subclasses that create their
+        # command lazily have to do this themselves
+        if self._command is not None:
+            self._command[0] = intern(
+                os.path.join(TEST_BIN_DIR, self._command[0]))
 
     def is_skip(self):
         """ Native Piglit-test specific skip checking
@@ -372,11 +982,18 @@ class PiglitTest(Test):
                 return True
         return False
 
+    _status_prefix = 'PIGLIT:'
+
     def interpret_result(self):
-        outlines = self.result['out'].split('\n')
-        outpiglit = (s[7:] for s in outlines if s.startswith('PIGLIT:'))
+        # The PIGLIT: lines are normally split off while the output is read,
+        # if they weren't (the output was set directly) pick them out here
+        if self._status_lines is None:
+            outlines = self.result['out'].split('\n')
+            outpiglit = (s[7:] for s in outlines if s.startswith('PIGLIT:'))
+            self.result['out'] = '\n'.join(
+                s for s in outlines if not s.startswith('PIGLIT:'))
+        else:
+            outpiglit = (s[7:] for s in self._status_lines)
 
         for piglit in outpiglit:
             self.result.recursive_update(json.loads(piglit))
-        self.result['out'] = '\n'.join(
-            s for s in outlines if not s.startswith('PIGLIT:'))
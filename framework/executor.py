@@ -0,0 +1,484 @@
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# This permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE AUTHOR(S) BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN
+# AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF
+# OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+""" Executors that run the tests of a TestProfile
+
+An executor takes an iterable of (name, test) pairs and runs each test, calling
+a callback once a test has finished. Tests can be marked as exclusive, these
+never run at the same time as any other test: before one starts the running
+tests are drained, and once it finishes the other tests are refilled. This
+allows tests that are not thread safe to be interleaved with the concurrent
+ones, rather than running them all in a serial phase of their own.
+
+There are two executors:
+
+ThreadExecutor -- runs each test in a thread of a thread pool, each thread
+                  blocks while its test process runs.
+EventLoopExecutor -- supervises the processes of all running tests from a
+                     single thread, using poll() to read their output and to
+                     notice when they exit.
+
+Most users will want to use get_executor() to pick one by name.
+
+Tests that are still being discovered while the run starts, like the subtests
+of an external suite that has to be asked for them, are handed to the executors
+through a TestQueue. These run after the other tests, as soon as each of them
+has been put into the queue.
+
+"""
+
+import os
+import errno
+import collections
+import select
+import threading
+import itertools
+import Queue
+import multiprocessing
+import multiprocessing.dummy
+
+from framework.threads import ReadWriteLock
+
+__all__ = [
+    'EXECUTORS',
+    'ThreadExecutor',
+    'EventLoopExecutor',
+    'TestQueue',
+    'get_executor',
+]
+
+# A list of available executors
+EXECUTORS = ['threads', 'event-loop']
+
+
+class TestQueue(object):
+    """ A queue of (name, test) pairs that are found while tests run
+
+    A producer calls put() for each test it finds and close() once it is done,
+    even when it fails. Iterating over the queue blocks until the next test is
+    put, and stops once the queue is closed and empty.
+
+    Event loops that can't block on the queue call notify() with the write end
+    of a pipe, one byte is written into it whenever the queue goes from empty
+    to not empty, and when it is closed.
+
+    """
+    def __init__(self):
+        self._queue = collections.deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._fds = []
+
+    def put(self, name, test):
+        """ Add a test to the queue """
+        with self._cond:
+            assert not self._closed
+            if not self._queue:
+                self._wake()
+            self._queue.append((name, test))
+            self._cond.notify()
+
+    def close(self):
+        """ Mark that no more tests will be put into the queue """
+        with self._cond:
+            self._closed = True
+            self._wake()
+            self._cond.notify_all()
+
+    def notify(self, fd):
+        """ Write into fd when there is something new to get """
+        with self._cond:
+            self._fds.append(fd)
+
+    def unnotify(self, fd):
+        """ Stop writing into fd """
+        with self._cond:
+            self._fds.remove(fd)
+
+    def _wake(self):
+        for fd in self._fds:
+            os.write(fd, 'q')
+
+    def get_nowait(self):
+        """ Return the next (name, test) pair without blocking
+
+        Returns None if no test is waiting, and raises StopIteration once the
+        queue is closed and empty.
+
+        """
+        with self._cond:
+            if self._queue:
+                return self._queue.popleft()
+            if self._closed:
+                raise StopIteration
+            return None
+
+    def __iter__(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                pair = self._queue.popleft()
+            yield pair
+
+
+class ThreadExecutor(object):
+    """ Run tests in a pool of threads
+
+    This is the classic piglit executor, each worker thread runs one test at a
+    time, and blocks until that test's process has exited.
+
+    Arguments:
+    jobs -- the number of tests to run at once. Default: the number of
+            processor cores
+
+    """
+    def __init__(self, jobs=None):
+        self.jobs = jobs or multiprocessing.cpu_count()
+
+    def run(self, tests, log, dmesg, callback, exclusive=None,
+            more=None):
+        """ Run tests, and block until all of them have finished
+
+        Arguments:
+        tests -- an iterable of (name, test) pairs
+        log -- a log.LogManager instance
+        dmesg -- a dmesg.BaseDmesg derived instance
+        callback -- called with the name and the test after each test finishes
+
+        Keyword Arguments:
+        exclusive -- a callable that takes a test and returns True if that test
+                     must run on its own. Default: no test is exclusive
+        more -- a TestQueue of tests to run after those in tests, as they are
+                found. Default: None
+
+        """
+        # Each test holds this lock while it runs, exclusive tests as the
+        # writer and all others as readers
+        lock = ReadWriteLock()
+
+        def test(pair):
+            """ Function to call test.execute from .map """
+            name, test = pair
+            if exclusive is not None and exclusive(test):
+                hold = lock.write
+            else:
+                hold = lock.read
+            with hold():
+                test.execute(name, log.get(), dmesg)
+            callback(name, test)
+
+        # Multiprocessing.dummy is a wrapper around Threading that provides a
+        # multiprocessing compatible API
+        pool = multiprocessing.dummy.Pool(self.jobs)
+        if more is not None:
+            tests = itertools.chain(tests, more)
+        pool.imap(test, tests, 1)
+        pool.close()
+        pool.join()
+
+
+class EventLoopExecutor(object):
+    """ Run tests from a single event loop
+
+    Rather than blocking one thread per test this executor starts up to jobs
+    test processes, and multiplexes their stdout and stderr pipes with poll()
+    (or select() where poll() is not available). It reaps processes once both
+    pipes are closed, timeouts are enforced by the shared exectest.WATCHDOG.
+
+    Tests that override Test.run() cannot be split into processes, these are
+    handed off to a helper thread each, which still counts against jobs.
+
+    When an exclusive test comes up no further tests are started, once the
+    running tests have finished the exclusive test runs on its own, and after
+    it the loop goes back to filling all of its jobs.
+
+    Arguments:
+    jobs -- the number of tests to run at once. Default: the number of
+            processor cores
+
+    """
+    # Seconds to wait between checks for processes that have closed their
+    # pipes but not yet exited
+    REAP_INTERVAL = 0.01
+
+    def __init__(self, jobs=None):
+        self.jobs = jobs or multiprocessing.cpu_count()
+
+    def run(self, tests, log, dmesg, callback, exclusive=None,
+            more=None):
+        """ Run tests, and block until all of them have finished
+
+        Arguments:
+        tests -- an iterable of (name, test) pairs
+        log -- a log.LogManager instance
+        dmesg -- a dmesg.BaseDmesg derived instance
+        callback -- called with the name and the test after each test finishes
+
+        Keyword Arguments:
+        exclusive -- a callable that takes a test and returns True if that test
+                     must run on its own. Default: no test is exclusive
+        more -- a TestQueue of tests to run after those in tests, as they are
+                found. Default: None
+
+        """
+        _EventLoop(self, iter(tests), log, dmesg, callback,
+                   exclusive or (lambda _: False), more).run()
+
+
+class _Running(object):
+    """ Book keeping for a test that has been started by the event loop """
+    def __init__(self, name, test, steps):
+        self.name = name
+        self.test = test
+        self.steps = steps
+        self.process = None
+        self.streams = {}
+
+
+class _EventLoop(object):
+    """ The state of a single EventLoopExecutor.run() call """
+    def __init__(self, executor, tests, log, dmesg, callback, exclusive,
+                 more=None):
+        self._executor = executor
+        self._tests = tests
+        self._more = more
+        self._log = log
+        self._dmesg = dmesg
+        self._callback = callback
+        self._exclusive = exclusive
+        self._exhausted = False
+
+        # An exclusive (name, test) pair waiting for the running tests to
+        # drain, and the test object of the exclusive test that is running
+        self._exclusive_waiting = None
+        self._exclusive_running = None
+
+        # Tests started but not yet finished, including threaded ones
+        self._count = 0
+
+        # Maps file descriptors to the _Running instance they belong to
+        self._fds = {}
+
+        # _Running instances whose process has closed both pipes
+        self._reaping = []
+
+        # Threaded tests report back through this queue, and wake the loop up
+        # by writing a byte into the pipe, as does the queue in more
+        self._done = Queue.Queue()
+        self._wake_r, self._wake_w = os.pipe()
+
+        if hasattr(select, 'poll'):
+            self._poll = select.poll()
+        else:
+            self._poll = None
+        self._register(self._wake_r)
+
+    def _register(self, fd):
+        if self._poll is not None:
+            self._poll.register(fd, select.POLLIN | select.POLLPRI)
+
+    def _unregister(self, fd):
+        if self._poll is not None:
+            self._poll.unregister(fd)
+
+    def _wait(self, timeout):
+        """ Wait up to timeout seconds for readable file descriptors """
+        try:
+            if self._poll is not None:
+                if timeout is not None:
+                    timeout = int(timeout * 1000) + 1
+                return [fd for fd, _ in self._poll.poll(timeout)]
+            readable = list(self._fds) + [self._wake_r]
+            return select.select(readable, [], [], timeout)[0]
+        except (select.error, IOError, OSError) as e:
+            if e.args[0] == errno.EINTR:
+                return []
+            raise
+
+    def run(self):
+        if self._more is not None:
+            self._more.notify(self._wake_w)
+        try:
+            self._fill()
+            # Once every test has been started from tests the loop waits for
+            # more, even with no test running
+            while self._count or not self._exhausted:
+                timeout = None
+                if self._reaping:
+                    timeout = self._executor.REAP_INTERVAL
+
+                for fd in self._wait(timeout):
+                    if fd == self._wake_r:
+                        os.read(fd, 512)
+                    else:
+                        self._read(fd)
+
+                self._collect_threads()
+                self._reap()
+                self._fill()
+        finally:
+            if self._more is not None:
+                self._more.unnotify(self._wake_w)
+            os.close(self._wake_r)
+            os.close(self._wake_w)
+
+    def _fill(self):
+        """ Start tests until jobs tests are running or none are left
+
+        No test is started while an exclusive test is waiting or running.
+
+        """
+        while self._exclusive_running is None:
+            if self._exclusive_waiting is not None:
+                if self._count:
+                    return
+                name, test = self._exclusive_waiting
+                self._exclusive_waiting = None
+                self._exclusive_running = test
+                self._start(name, test)
+                continue
+
+            if self._exhausted or self._count >= self._executor.jobs:
+                return
+            try:
+                pair = self._next()
+            except StopIteration:
+                self._exhausted = True
+                return
+            if pair is None:
+                return
+
+            name, test = pair
+            if self._exclusive(test):
+                self._exclusive_waiting = (name, test)
+            else:
+                self._start(name, test)
+
+    def _next(self):
+        """ Return the next (name, test) pair, or None if there is none yet
+
+        Raises StopIteration once there are no tests left.
+
+        """
+        if self._tests is not None:
+            try:
+                return next(self._tests)
+            except StopIteration:
+                self._tests = None
+        if self._more is None:
+            raise StopIteration
+        return self._more.get_nowait()
+
+    def _start(self, name, test):
+        self._count += 1
+        if test.has_steps():
+            running = _Running(
+                name, test, test.execute_steps(name, self._log.get(),
+                                               self._dmesg))
+            self._advance(running)
+        else:
+            thread = threading.Thread(target=self._threaded,
+                                      args=(name, test))
+            thread.daemon = True
+            thread.start()
+
+    def _finish(self, name, test):
+        self._count -= 1
+        if test is self._exclusive_running:
+            self._exclusive_running = None
+        self._callback(name, test)
+
+    def _threaded(self, name, test):
+        """ Thread target for tests that cannot be split into steps """
+        try:
+            test.execute(name, self._log.get(), self._dmesg)
+        finally:
+            self._done.put((name, test))
+            os.write(self._wake_w, 'x')
+
+    def _collect_threads(self):
+        while True:
+            try:
+                name, test = self._done.get_nowait()
+            except Queue.Empty:
+                return
+            self._finish(name, test)
+
+    def _advance(self, running):
+        """ Resume a test until it spawns its next process or finishes """
+        try:
+            process = next(running.steps)
+        except StopIteration:
+            self._finish(running.name, running.test)
+            return
+
+        running.process = process
+        running.streams = {}
+        for stream in [process.proc.stdout, process.proc.stderr]:
+            running.streams[stream.fileno()] = stream
+            self._fds[stream.fileno()] = running
+            self._register(stream.fileno())
+
+    def _read(self, fd):
+        running = self._fds[fd]
+        stream = running.streams[fd]
+        try:
+            data = os.read(fd, 65536)
+        except OSError as e:
+            if e.errno in [errno.EAGAIN, errno.EINTR]:
+                return
+            data = ''
+
+        if data:
+            running.process.feed(stream, data)
+            return
+
+        # EOF, this pipe has been closed by the process
+        self._unregister(fd)
+        del self._fds[fd]
+        del running.streams[fd]
+        stream.close()
+        if not running.streams:
+            self._reaping.append(running)
+
+    def _reap(self):
+        for running in list(self._reaping):
+            if running.process.reap(block=False) is None:
+                continue
+            self._reaping.remove(running)
+            running.process.close()
+            self._advance(running)
+
+
+def get_executor(executor):
+    """ Returns an executor class based on the string passed """
+    executors = {
+        'threads': ThreadExecutor,
+        'event-loop': EventLoopExecutor,
+    }
+
+    # Be sure that we're exporting the same list of executors that we actually
+    # have available
+    assert sorted(executors.keys()) == sorted(EXECUTORS)
+    return executors[executor]
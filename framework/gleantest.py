@@ -35,6 +35,8 @@ class GleanTest(Test):
     glean tests.
 
     """
+    __slots__ = []
+
     GLOBAL_PARAMS = []
     _EXECUTABLE = os.path.join(TEST_BIN_DIR, "glean")
 
@@ -21,13 +21,16 @@
 
 """ This module enables the running of GLSL parser tests. """
 
-from __future__ import print_function
 import os
 import os.path as path
 import re
-import sys
 
-from .exectest import PiglitTest
+from .exectest import PiglitTest, TEST_BIN_DIR
+from .test_index import INDEX
+from .matcher import may_contain
+
+# The file extensions of glslparser tests
+EXTENSIONS = ['vert', 'tesc', 'tese', 'geom', 'frag', 'comp']
 
 
 def add_glsl_parser_test(group, filepath, test_name):
@@ -35,12 +38,14 @@ def add_glsl_parser_test(group, filepath, test_name):
     group[test_name] = GLSLParserTest(filepath)
 
 
-def import_glsl_parser_tests(group, basepath, subdirectories):
+def import_glsl_parser_tests(group, basepath, subdirectories, prefix=None):
     """
     Recursively register each shader source file in the given
     ``subdirectories`` as a GLSLParserTest .
 
     :subdirectories: A list of subdirectories under the basepath.
+    :prefix: The name of group. If given, directories whose tests are all
+             filtered out of the run are skipped, see framework.matcher.
 
     The name with which each test is registered into the given group is
     the shader source file's path relative to ``basepath``. For example,
@@ -49,14 +54,27 @@ def import_glsl_parser_tests(group, basepath, subdirectories):
     is called and the file 'a/b1/c/d.frag' exists, then the test is
     registered into the group as ``group['b1/c/d.frag']``.
     """
+    def wanted(dirpath):
+        """ Return False if no test below dirpath can be run """
+        if prefix is None:
+            return True
+        name = os.path.relpath(dirpath, basepath).replace(os.path.sep, '/')
+        if name == '.':
+            return may_contain(prefix)
+        # The tests of the root group are named without a leading '/'
+        return may_contain(prefix + '/' + name if prefix else name)
+
     for d in subdirectories:
         walk_dir = path.join(basepath, d)
+        if not wanted(walk_dir):
+            continue
         for (dirpath, dirnames, filenames) in os.walk(walk_dir):
-            # Ignore dirnames.
+            dirnames[:] = [n for n in dirnames
+                           if wanted(path.join(dirpath, n))]
             for f in filenames:
                 # Add f as a test if its file extension is good.
                 ext = f.rsplit('.')[-1]
-                if ext in ['vert', 'tesc', 'tese', 'geom', 'frag', 'comp']:
+                if ext in EXTENSIONS:
                     filepath = path.join(dirpath, f)
                     # testname := filepath relative to
                     # basepath.
@@ -75,31 +93,47 @@ class GLSLParserTest(PiglitTest):
     be done with a funciton wrapper, making it a distinct class makes it easier
     to sort in the profile.
 
+    The file is not read until the command is first used, a
+    GLSLParserException is raised then if its config block is invalid, which
+    fails the test. If the file is in the test index it is not read at all.
+
     Arguments:
     filepath -- the path to a glsl_parser_test which must end in .vert,
                 .tesc, .tese, .geom or .frag
 
     """
+    __slots__ = ['__filepath', '__found_keys']
+
     _CONFIG_KEYS = frozenset(['expect_result', 'glsl_version',
                               'require_extensions', 'check_link'])
 
     def __init__(self, filepath):
-        os.stat(filepath)
+        self.__filepath = filepath
+        super(GLSLParserTest, self).__init__(None, run_concurrent=True)
+
+    def _create_command(self):
+        config = INDEX.lookup(self.__filepath)
+        if config is None:
+            config = self._read_config()
+        else:
+            config = dict((k, str(v)) for k, v in config.iteritems())
+
+        command = self.__get_command(config, self.__filepath)
+        command[0] = os.path.join(TEST_BIN_DIR, command[0])
+        return command
+
+    def _invocation(self):
+        return self.__filepath
 
+    def _read_config(self):
+        """ Read the test file and return its config block as a dict """
         # a set that stores a list of keys that have been found already
         self.__found_keys = set()
 
         # Parse the config file and get the config section, then write this
         # section to a StringIO and pass that to ConfigParser
-        with open(filepath, 'r') as testfile:
-            try:
-                config = self.__parser(testfile, filepath)
-            except GLSLParserException as e:
-                print(e.message, file=sys.stderr)
-                sys.exit(1)
-
-        command = self.__get_command(config, filepath)
-        super(GLSLParserTest, self).__init__(command, run_concurrent=True)
+        with open(self.__filepath, 'r') as testfile:
+            return self.__parser(testfile, self.__filepath)
 
     def __get_command(self, config, filepath):
         """ Create the command argument to pass to super()
@@ -0,0 +1,138 @@
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# This permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE AUTHOR(S) BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN
+# AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF
+# OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+""" Measure how long importing each module takes
+
+This is behind the --trace-startup option of the piglit wrapper. It replaces
+the builtin __import__, and times every import that loads new modules. The
+time of an import is split into the time spent in the imports it made itself,
+and its own time, which is charged to the modules it loaded.
+
+It only has to be cheap enough not to distort the startup it measures, it is
+not meant to be left on.
+
+"""
+
+from __future__ import print_function
+import sys
+import imp
+import time
+import __builtin__
+
+__all__ = [
+    'ImportTracer',
+]
+
+
+class ImportTracer(object):
+    """ Times the imports made while it is installed
+
+    Arguments:
+    clock -- a function returning the current time in seconds.
+             Default: time.time
+
+    """
+    def __init__(self, clock=time.time):
+        self._clock = clock
+        self._import = None
+        self._seen = set()
+        # One entry per running import
+        self._stack = []
+        # Maps module names to [self time, cumulative time]
+        self.times = {}
+
+    def install(self):
+        """ Start timing imports """
+        assert self._import is None
+        self._seen = set(sys.modules)
+        self._import = __builtin__.__import__
+        __builtin__.__import__ = self._traced
+
+    def uninstall(self):
+        """ Stop timing imports """
+        __builtin__.__import__ = self._import
+        self._import = None
+
+    def _traced(self, *args, **kwargs):
+        # The import lock is reentrant, holding it for the whole call keeps
+        # imports from other threads out of the book keeping
+        imp.acquire_lock()
+        try:
+            return self._timed(*args, **kwargs)
+        finally:
+            imp.release_lock()
+
+    def _new_modules(self):
+        """ Return the modules loaded since the last call, and mark them seen
+
+        Implicit relative imports leave None entries for the names they
+        tried, these are skipped.
+
+        """
+        new = [m for m, v in sys.modules.iteritems()
+               if v is not None and m not in self._seen]
+        self._seen.update(new)
+        return new
+
+    def _timed(self, *args, **kwargs):
+        # A module is put into sys.modules before its body runs, so the
+        # modules that are new when an import starts belong to the import
+        # whose module body is running
+        early = self._new_modules()
+        if self._stack:
+            self._stack[-1][1].extend(early)
+
+        # The time spent in nested imports, and the modules loaded
+        frame = [0.0, []]
+        self._stack.append(frame)
+        start = self._clock()
+        try:
+            return self._import(*args, **kwargs)
+        finally:
+            elapsed = self._clock() - start
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1][0] += elapsed
+
+            new = frame[1] + self._new_modules()
+            if new:
+                # A package is loaded along with its first submodule, charge
+                # the time to the deepest of them
+                name = max(new, key=lambda m: m.count('.'))
+                self.times[name] = [elapsed - frame[0], elapsed]
+
+    def report(self, out=sys.stderr, limit=30):
+        """ Print the slowest imports, by cumulative time
+
+        Arguments:
+        out -- the file to print to. Default: sys.stderr
+        limit -- the number of modules to print. Default: 30
+
+        """
+        rows = sorted(self.times.iteritems(), key=lambda x: -x[1][1])
+        print('import time:     self [ms] | cumulative [ms] | module',
+              file=out)
+        for name, (self_, cumulative) in rows[:limit]:
+            print('import time: {0:14.2f} | {1:15.2f} | {2}'.format(
+                self_ * 1000, cumulative * 1000, name), file=out)
+        print('import time: {0:14.2f} | {1:15} | total of {2} modules'.format(
+            sum(t[0] for t in self.times.itervalues()) * 1000, '',
+            len(self.times)), file=out)
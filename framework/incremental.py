@@ -0,0 +1,234 @@
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# This permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE AUTHOR(S) BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN
+# AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF
+# OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+""" Support for incremental runs
+
+Every test that is run gets a fingerprint of everything that goes into it:
+its command line, the modification time and size of every file named on that
+command line (the test binary, and input files like shader_tests), its
+environment, the variables of piglit's own environment that select or
+configure the driver (see DRIVER_ENV), and a fingerprint of the driver
+supplied by the user. When a run
+is given earlier results, tests with the same fingerprint as in those results
+are not run again, their earlier result is copied instead.
+
+"""
+
+import os
+import hashlib
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+import framework.results
+
+__all__ = [
+    'DRIVER_ENV',
+    'Fingerprinter',
+    'load_previous',
+    'reuse_results',
+    'split_reusable',
+]
+
+# Tests with these results are always run again, they depend on more than the
+# inputs of the test
+_NEVER_REUSE = ['timeout']
+
+# The variables of piglit's environment, which every test inherits, that
+# select the driver or change how it behaves. Names ending in '_' are
+# prefixes. Other variables, like HOME or TERM, are left out so that they
+# don't prevent reusing results.
+DRIVER_ENV = [
+    # Which libraries and which driver are loaded
+    'LD_LIBRARY_PATH',
+    'LD_PRELOAD',
+    'LIBGL_',
+    'GBM_',
+    'EGL_',
+    'WAFFLE_',
+    'VK_',
+    # The display server the tests run on
+    'DISPLAY',
+    'WAYLAND_DISPLAY',
+    # Driver options
+    'MESA_',
+    'GALLIUM_',
+    'LP_',
+    'SOFTPIPE_',
+    'ST_',
+    'INTEL_',
+    'RADEON_',
+    'R600_',
+    'AMD_',
+    'NOUVEAU_',
+    'NV_',
+    '__GL_',
+    'vblank_mode',
+]
+
+
+def _driver_env(environ):
+    """ Return the sorted (name, value) pairs of environ in DRIVER_ENV """
+    def wanted(name):
+        return any(name.startswith(e) if e.endswith('_') else name == e
+                   for e in DRIVER_ENV)
+    return sorted((k, v) for k, v in environ.iteritems() if wanted(k))
+
+
+class Fingerprinter(object):
+    """ Computes the fingerprints of tests
+
+    The stat() of each file is cached, since a few binaries like
+    shader_runner are shared by thousands of tests. This makes a Fingerprinter
+    cheap to use for every test of a profile, but means that it should not be
+    kept around between runs.
+
+    Arguments:
+    driver -- a string identifying the driver under test, like the hash of
+              the DRI driver. Default: ''
+    environ -- the environment the tests inherit. Default: os.environ
+
+    """
+    # Bump this when what goes into a fingerprint changes
+    VERSION = 2
+
+    def __init__(self, driver='', environ=None):
+        self.driver = driver
+        self._environ = _driver_env(os.environ if environ is None
+                                    else environ)
+        self._stamps = {}
+
+    def _stamp(self, path):
+        """ Return the (mtime, size) of a file, or None if it isn't one """
+        try:
+            return self._stamps[path]
+        except KeyError:
+            pass
+
+        try:
+            stat = os.stat(path)
+        except (OSError, ValueError, TypeError):
+            stamp = None
+        else:
+            stamp = (stat.st_mtime, stat.st_size)
+        self._stamps[path] = stamp
+        return stamp
+
+    def fingerprint(self, test):
+        """ Return the fingerprint of a test as a hex string """
+        command = test.command
+        files = []
+        for arg in command:
+            stamp = self._stamp(os.path.join(test.cwd or '', arg))
+            if stamp is not None:
+                files.append((arg, stamp))
+
+        data = json.dumps([self.VERSION,
+                           command,
+                           sorted(test.OPTS.env.iteritems()),
+                           sorted(test.env.iteritems()),
+                           self._environ,
+                           files,
+                           self.driver])
+        return hashlib.sha1(data).hexdigest()
+
+
+def load_previous(paths):
+    """ Load the fingerprinted results of earlier runs
+
+    Returns a dictionary mapping test names to results. Results without a
+    fingerprint, or that must always be run again, are left out. If a test is
+    in more than one of the results the last one wins.
+
+    Arguments:
+    paths -- a list of results files or directories, anything load_results
+             accepts
+
+    """
+    previous = {}
+    for path in paths:
+        results = framework.results.load_results(path)
+        for name, result in results.tests.iteritems():
+            if result.get('fingerprint') is None:
+                continue
+            if unicode(result['result']) in _NEVER_REUSE:
+                continue
+            previous[name] = result
+    return previous
+
+
+def split_reusable(tests, previous, fingerprinter):
+    """ Split tests into those that need to run and those that don't
+
+    Returns a dictionary of the (name: test) pairs that need to be run, and a
+    list of (name, result) pairs of the results that can be reused.
+
+    Arguments:
+    tests -- a dictionary mapping test names to tests
+    previous -- a dictionary as returned by load_previous()
+    fingerprinter -- a Fingerprinter instance
+
+    """
+    run = {}
+    reused = []
+    for name, test in tests.iteritems():
+        result = previous.get(name)
+        if (result is not None and
+                result['fingerprint'] == fingerprinter.fingerprint(test)):
+            reused.append((name, result))
+        else:
+            run[name] = test
+    return run, reused
+
+
+def reuse_results(tests, opts, backend, log, fingerprinter, previous=None):
+    """ Write the reusable results of the earlier runs in opts
+
+    The results of tests whose fingerprint matches those in
+    opts.reuse_results are written to the backend and logged, and the tests
+    that still need to be run are returned. Nothing is reused on dry runs.
+
+    Arguments:
+    tests -- a dictionary mapping test names to tests
+    opts -- a core.Options instance
+    backend -- a results.Backend derived instance
+    log -- a log.LogManager instance
+    fingerprinter -- a Fingerprinter instance
+
+    Keyword Arguments:
+    previous -- the results of opts.reuse_results as returned by
+                load_previous(), to avoid loading them again. Default: load
+                them
+
+    """
+    if not (opts.execute and opts.reuse_results):
+        return tests
+
+    if previous is None:
+        previous = load_previous(opts.reuse_results)
+    tests, reused = split_reusable(tests, previous, fingerprinter)
+    for name, result in reused:
+        reused_log = log.get()
+        reused_log.start(name)
+        backend.write_test(name, result)
+        reused_log.log(str(result['result']))
+    return tests
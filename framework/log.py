@@ -177,6 +177,22 @@ class QuietLog(BaseLog):
         # print extra whitespace if necissary
         self._state['lastlength'] = len(out)
 
+    @classmethod
+    def note(cls, state, message):
+        """ Print a message about the whole run on a line of its own
+
+        The line isn't overwritten by the status line printed after it.
+
+        """
+        with cls._LOCK:
+            pad = state['lastlength'] - len(message)
+            sys.stdout.write(message)
+            if pad > 0:
+                sys.stdout.write(' ' * pad)
+            sys.stdout.write('\n')
+            sys.stdout.flush()
+            state['lastlength'] = 0
+
 
 class VerboseLog(QuietLog):
     """ A more verbose version of the QuietLog
@@ -248,6 +264,10 @@ class DummyLog(BaseLog):
     def summary(self):
         pass
 
+    @classmethod
+    def note(cls, state, message):
+        pass
+
 
 class LogManager(object):
     """ Creates new log objects
@@ -287,3 +307,11 @@ class LogManager(object):
     def get(self):
         """ Return a new log instance """
         return self._log(self._state)
+
+    def add_tests(self, count):
+        """ Add count tests to the total, for tests found while running """
+        self._state['total'] += count
+
+    def note(self, message):
+        """ Log a message about the whole run, like statistics """
+        self._log.note(self._state, message)
@@ -0,0 +1,224 @@
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# This permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE AUTHOR(S) BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN
+# AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF
+# OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+""" Matching test names against the filters of a run
+
+A TestMatcher combines the include (-t) and exclude (-x) regular expressions
+of a run into one regular expression each, so that a name is searched at most
+twice however many filters are given.
+
+It can also tell whether a group can contain any matching test at all, which
+lets the helpers that discover tests, like add_shader_test_dir(), skip whole
+directories while a profile is loaded. This is conservative: a group is only
+skipped when the filters prove that none of its tests can match.
+
+"""
+
+import re
+import sre_parse
+import sre_constants
+
+__all__ = [
+    'TestMatcher',
+    'matches',
+    'may_contain',
+    'set_discovery_matcher',
+]
+
+# Positions that a regular expression can assert without looking at the rest
+# of the name
+_CONTEXT_FREE_AT = [sre_constants.AT_BEGINNING,
+                    sre_constants.AT_BEGINNING_STRING]
+
+
+def _compile(pattern):
+    if isinstance(pattern, basestring):
+        return re.compile(pattern)
+    return pattern
+
+
+def _combine(regexes):
+    """ Combine a list of compiled regular expressions into as few as possible
+
+    Expressions with flags or groups are kept apart, joining them would
+    change what they, or the others, match.
+
+    """
+    simple = [r.pattern for r in regexes if not (r.flags or r.groups)]
+    combined = [r for r in regexes if r.flags or r.groups]
+    if simple:
+        combined.insert(0, re.compile(
+            '|'.join('(?:{0})'.format(p) for p in simple)))
+    return combined
+
+
+def _ops(parsed):
+    """ Yield every (op, argument) pair of a parsed regular expression """
+    for op, av in parsed:
+        yield op, av
+        if op == sre_constants.BRANCH:
+            children = av[1]
+        elif op in [sre_constants.SUBPATTERN, sre_constants.ASSERT,
+                    sre_constants.ASSERT_NOT]:
+            children = [av[1]]
+        elif op in [sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT]:
+            children = [av[2]]
+        elif op == sre_constants.GROUPREF_EXISTS:
+            children = [c for c in av[1:] if c is not None]
+        else:
+            children = []
+        for child in children:
+            for pair in _ops(child):
+                yield pair
+
+
+def _context_free(regex):
+    """ Return True if a match of regex in a string is also one in any
+    string that starts with it
+
+    That is the case unless the expression looks at what follows its match,
+    with $, \\b or a lookahead.
+
+    """
+    for op, av in _ops(sre_parse.parse(regex.pattern, regex.flags)):
+        if op in [sre_constants.ASSERT, sre_constants.ASSERT_NOT]:
+            return False
+        if op == sre_constants.AT and av not in _CONTEXT_FREE_AT:
+            return False
+    return True
+
+
+def _anchored_prefix(regex):
+    """ Return the literal text a regex anchored with ^ must start with
+
+    Returns None if the expression is not anchored at the beginning, or it
+    ignores case.
+
+    """
+    if regex.flags & re.IGNORECASE:
+        return None
+
+    parsed = list(sre_parse.parse(regex.pattern, regex.flags))
+    if not parsed:
+        return None
+    op, av = parsed[0]
+    if op != sre_constants.AT or av not in _CONTEXT_FREE_AT:
+        return None
+
+    prefix = []
+    for op, av in parsed[1:]:
+        if op != sre_constants.LITERAL:
+            break
+        prefix.append(unichr(av) if av > 127 else chr(av))
+    return ''.join(prefix)
+
+
+class TestMatcher(object):
+    """ Decides which tests of a profile are run
+
+    A test is run if its name matches any of the include expressions, or if
+    there are none, and it doesn't match any of the exclude expressions.
+    Like everywhere else in piglit the expressions are searched for anywhere
+    in the name.
+
+    Arguments:
+    include -- a list of regular expressions, as strings or compiled
+    exclude -- a list of regular expressions, as strings or compiled
+
+    """
+    def __init__(self, include=None, exclude=None):
+        include = [_compile(p) for p in include or []]
+        exclude = [_compile(p) for p in exclude or []]
+
+        self._include = _combine(include)
+        self._exclude = _combine(exclude)
+
+        # Groups can only be ruled out by the include expressions if all of
+        # them are anchored, an unanchored one could match deep inside any
+        # group
+        self._include_prefixes = None
+        if include:
+            prefixes = [_anchored_prefix(r) for r in include]
+            if None not in prefixes:
+                self._include_prefixes = prefixes
+
+        # An exclude expression that matches the name of a group matches all
+        # of its tests, unless it depends on what follows the match
+        self._exclude_groups = _combine([r for r in exclude
+                                         if _context_free(r)])
+
+    def matches(self, name):
+        """ Return True if the test called name should be run """
+        if self._include and not any(r.search(name) for r in self._include):
+            return False
+        return not any(r.search(name) for r in self._exclude)
+
+    @property
+    def prunes(self):
+        """ True if may_contain() can rule any group out """
+        return bool(self._include_prefixes is not None or
+                    self._exclude_groups)
+
+    def may_contain(self, group):
+        """ Return False if no test in group can match
+
+        Arguments:
+        group -- the name of a group, without a trailing /
+
+        """
+        group += '/'
+        if any(r.search(group) for r in self._exclude_groups):
+            return False
+        if self._include_prefixes is not None:
+            return any(p.startswith(group) or group.startswith(p)
+                       for p in self._include_prefixes)
+        return True
+
+
+# The matcher the helpers that discover tests prune with while a profile is
+# loaded. By default nothing is pruned.
+_DISCOVERY = TestMatcher()
+
+
+def set_discovery_matcher(matcher):
+    """ Set the matcher that may_contain() asks, None to prune nothing """
+    global _DISCOVERY
+    _DISCOVERY = matcher or TestMatcher()
+
+
+def matches(name):
+    """ Return False if test discovery can skip the test called name
+
+    This is for the helpers that discover tests, it asks the matcher set with
+    set_discovery_matcher().
+
+    """
+    return _DISCOVERY.matches(name)
+
+
+def may_contain(group):
+    """ Return False if test discovery can skip the group called group
+
+    This is for the helpers that discover tests, it asks the matcher set with
+    set_discovery_matcher().
+
+    """
+    return _DISCOVERY.may_contain(group)
@@ -28,13 +28,29 @@ are represented by a TestProfile or a TestProfile derived object.
 
 from __future__ import print_function
 import os
+import gc
+import copy
 import sys
-import multiprocessing
-import multiprocessing.dummy
+import hashlib
+import tempfile
+import threading
 import importlib
-
+import ConfigParser
+import cPickle as pickle
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+from framework.core import PIGLIT_CONFIG
 from framework.dmesg import get_dmesg
 from framework.log import LogManager
+from framework.executor import get_executor, TestQueue
+from framework.scheduler import load_durations, order_by_duration, shard
+from framework.incremental import Fingerprinter, load_previous, reuse_results
+from framework.gleantest import GleanTest
+from framework.matcher import set_discovery_matcher
+from framework.subtests import SubtestLister, Splitter
 import framework.exectest
 
 __all__ = [
@@ -43,6 +59,12 @@ __all__ = [
     'merge_test_profiles'
 ]
 
+# The root of the piglit source tree
+_PIGLIT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Bump this when what is stored in the profile cache changes
+_CACHE_VERSION = 4
+
 
 class TestProfile(object):
     """ Class that holds a list of tests for execution
@@ -61,12 +83,27 @@ class TestProfile(object):
     execution of these tests off, and will flatten the nested group hierarchy
     of self.tests and merge it with self.test_list
 
+    Tests that take long to discover, like the subtests of an external suite
+    that has to be run to list them, can be added through add_test_source()
+    instead. These are discovered while the other tests already run.
+
+    The names of tests that have several subtests, which take long enough to
+    be worth running in parallel, can be added to split_tests. Each of their
+    subtests then runs in a process of its own, see framework.subtests.
+
+    load_test_profile() caches the loaded profile. Profiles whose tests depend
+    on more than the python modules and the test directories of piglit, like
+    those listing the tests of an external suite, must set cacheable to False.
+
     """
     def __init__(self):
         # Self.tests is deprecated, see above
         self.tests = {}
         self.test_list = {}
+        self.test_sources = []
+        self.split_tests = set()
         self.filters = []
+        self.cacheable = True
         # Sets a default of a Dummy
         self._dmesg = None
         self.dmesg = False
@@ -113,28 +150,36 @@ class TestProfile(object):
         # Clear out the old Group()
         self.tests = {}
 
-    def _prepare_test_list(self, opts):
-        """ Prepare tests for running
-
-        Flattens the nested group hierarchy into a flat dictionary using '/'
-        delimited groups by calling self.flatten_group_hierarchy(), then
-        runs it's own filters plus the filters in the self.filters name
+    def _iter_test_sources(self, matcher):
+        """ Yield the (name, test) pairs of every test source
 
-        Arguments:
-        opts - a core.Options instance
+        The sources can skip the groups that matcher rules out, like the
+        helpers of the profile modules do.
 
         """
-        self._flatten_group_hierarchy()
-
-        def matches_any_regexp(x, re_list):
-            return any(r.search(x) for r in re_list)
+        set_discovery_matcher(matcher if matcher.prunes else None)
+        try:
+            for source in self.test_sources:
+                for name, test in source():
+                    yield name, test
+        finally:
+            set_discovery_matcher(None)
+
+    def _add_test_sources(self, matcher):
+        """ Add the tests of every test source to the test list """
+        self.test_list.update(self._iter_test_sources(matcher))
+        self.test_sources = []
+
+    def _test_filter(self, opts):
+        """ Return a function that checks a (name, test) pair against the
+        filters of the profile and the user-specified restrictions in opts
+        """
+        matcher = opts.matcher()
 
         # The extra argument is needed to match check_all's API
         def test_matches(path, test):
             """Filter for user-specified restrictions"""
-            return ((not opts.filter or matches_any_regexp(path, opts.filter))
-                    and not path in opts.exclude_tests and
-                    not matches_any_regexp(path, opts.exclude_filter))
+            return matcher.matches(path)
 
         filters = self.filters + [test_matches]
         def check_all(item):
@@ -144,11 +189,47 @@ class TestProfile(object):
                 if not f(path, test):
                     return False
             return True
+        return check_all
+
+    def _prepare_test_list(self, opts, durations=None, stream=False):
+        """ Prepare tests for running
+
+        Flattens the nested group hierarchy into a flat dictionary using '/'
+        delimited groups by calling self.flatten_group_hierarchy(), then
+        runs it's own filters plus the filters in the self.filters name. If
+        opts.shard selects a shard only the tests of that shard are kept.
+
+        Unless stream is True the tests of the test sources are added to the
+        test list first. Sharding needs every test, so with opts.shard set
+        that is always done.
+
+        Arguments:
+        opts - a core.Options instance
+
+        Keyword Arguments:
+        durations -- a dictionary of test durations to balance shards with
+        stream -- leave the test sources for run() to stream
+
+        """
+        self._flatten_group_hierarchy()
+
+        if not stream or opts.shard != [1, 1]:
+            self._add_test_sources(opts.matcher())
+
+        check_all = self._test_filter(opts)
 
         # Filter out unwanted tests
         self.test_list = dict(item for item in self.test_list.iteritems()
                               if check_all(item))
 
+        # Shard before dropping the tests that have already been run, so that
+        # a resumed shard is split the same way as the original run was
+        if opts.shard != [1, 1]:
+            self.test_list = shard(self.test_list, *opts.shard,
+                                   durations=durations)
+        for path in opts.exclude_tests:
+            self.test_list.pop(path, None)
+
     def _pre_run_hook(self):
         """ Hook executed at the start of TestProfile.run
 
@@ -168,15 +249,27 @@ class TestProfile(object):
         pass
 
     def run(self, opts, logger, backend):
-        """ Runs all tests using Thread pool
+        """ Runs all tests using the executor selected in opts
 
         When called this method will flatten out self.tests into
         self.test_list, then will prepare a logger, pass opts to the Test
-        class, and begin executing tests through it's Thread pools.
+        class, and begin executing tests through an executor from
+        framework.executor.
 
         Based on the value of opts.concurrent it will either run all the tests
-        concurrently, all serially, or first the thread safe tests then the
-        serial tests.
+        concurrently, all serially, or run the thread safe tests concurrently
+        with the other tests interleaved, each of those running on its own.
+        If opts.history names earlier results the tests that took longest in
+        those are started first. If opts.shard selects a shard only the tests
+        of that shard are run. If opts.reuse_results names earlier results,
+        tests with the same fingerprint as in those are not run, their result
+        is copied instead. Tests that run exactly the same way as another test
+        are not run either, they get the result of that test. The tests in
+        split_tests are run as one process per subtest.
+
+        The test sources are run in a thread of their own, and each test they
+        find is filtered like the others and run once the tests of the test
+        list have been started.
 
         Finally it will print a final summary of the tests
 
@@ -189,46 +282,96 @@ class TestProfile(object):
 
         self._pre_run_hook()
         framework.exectest.Test.OPTS = opts
+        framework.exectest.SPAWNER.reset()
 
-        chunksize = 1
-
-        self._prepare_test_list(opts)
+        durations = load_durations(opts.history)
+        self._prepare_test_list(opts, durations, stream=True)
         log = LogManager(logger, len(self.test_list))
 
-        def test(pair):
-            """ Function to call test.execute from .map
-
-            Adds opts which are needed by Test.execute()
-
-            """
-            name, test = pair
-            test.execute(name, log.get(), self.dmesg)
+        fingerprinter = Fingerprinter(opts.driver_fingerprint)
+        previous = None
+        if opts.execute and opts.reuse_results:
+            previous = load_previous(opts.reuse_results)
+        testlist = reuse_results(self.test_list, opts, backend, log,
+                                 fingerprinter, previous)
+        testlist, duplicates = _group_duplicates(testlist)
+        if duplicates:
+            log.note('{0} tests run the same way as another test, and share '
+                     'its result'.format(
+                         sum(len(d) for d in duplicates.itervalues())))
+
+        splitter = None
+        if opts.execute and self.split_tests:
+            splitter = Splitter(SubtestLister(_subtest_cache_path()))
+            testlist = splitter.split(testlist, self.split_tests)
+            # Each part is logged as a test of its own
+            log.add_tests(splitter.added)
+
+        more = None
+        if self.test_sources:
+            more = TestQueue()
+            wanted = self._test_filter(opts)
+            exclude = frozenset(opts.exclude_tests)
+
+            def stream():
+                """ Thread target putting the tests of the sources in more """
+                try:
+                    for name, test in self._iter_test_sources(opts.matcher()):
+                        if name in exclude or not wanted((name, test)):
+                            continue
+                        log.add_tests(1)
+                        if reuse_results({name: test}, opts, backend, log,
+                                         fingerprinter, previous):
+                            more.put(name, test)
+                finally:
+                    more.close()
+
+            producer = threading.Thread(target=stream)
+            producer.daemon = True
+            producer.start()
+
+        def test(name, test):
+            """ Callback for the executor, called after each test finishes """
+            if splitter is not None:
+                finished = splitter.finished(name, test)
+                if finished is None:
+                    return
+                name, test = finished
+
+            if opts.execute:
+                test.result['fingerprint'] = fingerprinter.fingerprint(test)
             backend.write_test(name, test.result)
-
-        def run_threads(pool, testlist):
-            """ Open a pool, close it, and join it """
-            pool.imap(test, testlist, chunksize)
-            pool.close()
-            pool.join()
-
-        # Multiprocessing.dummy is a wrapper around Threading that provides a
-        # multiprocessing compatible API
-        #
-        # The default value of pool is the number of virtual processor cores
-        single = multiprocessing.dummy.Pool(1)
-        multi = multiprocessing.dummy.Pool()
+            for duplicate in duplicates.get(name, []):
+                duplicate_log = log.get()
+                duplicate_log.start(duplicate)
+                backend.write_test(duplicate, test.result)
+                duplicate_log.log(str(test.result['result'])
+                                  if opts.execute else 'dry-run')
+            # The log keeps the counts for the summary, nothing else needs
+            # the result once the backend has it
+            test.release()
+
+        def run_tests(executor, testlist, exclusive=None):
+            """ Run the tests with the executor, and wait for them to finish """
+            if durations:
+                testlist = order_by_duration(testlist, durations)
+            executor.run(testlist, log, self.dmesg, test, exclusive=exclusive,
+                         more=more)
+
+        # The default number of jobs is the number of virtual processor cores
+        executor = get_executor(opts.executor)
+        single = executor(1)
+        multi = executor()
 
         if opts.concurrent == "all":
-            run_threads(multi, self.test_list.iteritems())
+            run_tests(multi, testlist.iteritems())
         elif opts.concurrent == "none":
-            run_threads(single, self.test_list.iteritems())
+            run_tests(single, testlist.iteritems())
         else:
-            # Filter and return only thread safe tests to the threaded pool
-            run_threads(multi, (x for x in self.test_list.iteritems()
-                                if x[1].run_concurrent))
-            # Filter and return the non thread safe tests to the single pool
-            run_threads(single, (x for x in self.test_list.iteritems()
-                                 if not x[1].run_concurrent))
+            # Tests that are not thread safe take the exclusive slot, which
+            # drains the concurrent tests before each of them runs
+            run_tests(multi, testlist.iteritems(),
+                      exclusive=lambda t: not t.run_concurrent)
 
         log.get().summary()
 
@@ -244,6 +387,17 @@ class TestProfile(object):
         """
         self.filters.append(function)
 
+    def add_test_source(self, source):
+        """ Add a source of tests that are discovered while the profile runs
+
+        Arguments:
+        source -- a callable taking no arguments, returning an iterable of
+                  (name, test) pairs. It can use matcher.matches() and
+                  matcher.may_contain() to skip discovering unwanted tests.
+
+        """
+        self.test_sources.append(source)
+
     def update(self, *profiles):
         """ Updates the contents of this TestProfile instance with another
 
@@ -259,9 +413,163 @@ class TestProfile(object):
         for profile in profiles:
             self.tests.update(profile.tests)
             self.test_list.update(profile.test_list)
+            self.test_sources.extend(profile.test_sources)
+            self.split_tests.update(profile.split_tests)
+
+
+def _group_duplicates(tests):
+    """ Split off the tests that run the same way as another test
+
+    Returns a dictionary of the (name: test) pairs that need to run, one for
+    each distinct Test.invocation_key(), and a dictionary mapping the names
+    of those to the names of the tests that share their result. Of the tests
+    with the same key the one whose name sorts first runs.
+
+    Arguments:
+    tests -- a dictionary mapping test names to tests
+
+    """
+    groups = {}
+    for name in sorted(tests):
+        try:
+            key = tests[name].invocation_key()
+        except Exception:
+            # A test whose command is broken fails on its own when it runs
+            key = (None, name)
+        groups.setdefault(key, []).append(name)
+
+    run = {}
+    duplicates = {}
+    for names in groups.itervalues():
+        run[names[0]] = tests[names[0]]
+        if len(names) > 1:
+            duplicates[names[0]] = names[1:]
+    return run, duplicates
+
+
+def _cache_dir():
+    """ Return the directory piglit caches things in, or None
+
+    This is the directory set by profile_cache in the [core] section of
+    piglit.conf, by default $XDG_CACHE_HOME/piglit. An empty profile_cache
+    disables caching.
+
+    """
+    try:
+        directory = PIGLIT_CONFIG.get('core', 'profile_cache')
+    except (ConfigParser.NoOptionError, ConfigParser.NoSectionError):
+        directory = os.path.join(
+            os.environ.get('XDG_CACHE_HOME', os.path.expandvars('$HOME/.cache')),
+            'piglit')
+    return directory or None
+
+
+def _cache_path(name):
+    """ Return the path of the cache file of a profile, or None """
+    directory = _cache_dir()
+    if directory is None:
+        return None
+
+    # Every piglit tree gets cache files of its own
+    tree = hashlib.sha1(_PIGLIT_DIR).hexdigest()[:12]
+    return os.path.join(directory, 'profile-{0}-{1}.pickle'.format(name, tree))
 
 
-def load_test_profile(filename):
+def _subtest_cache_path():
+    """ Return the path of the cache of subtests, or None """
+    directory = _cache_dir()
+    if directory is None:
+        return None
+    return os.path.join(directory, 'subtests.json')
+
+
+def _cache_key(name):
+    """ Return a key that changes whenever the profile could change
+
+    This covers the mtime of the python modules of the profiles and of the
+    framework, PIGLIT_BUILD_DIR, and the names of the files in every
+    directory that is searched for tests, which change when a test file is
+    added or removed. The contents of test files like shader_tests don't need
+    to be covered, they are only read when the test runs.
+
+    Compiled python files are left out, importing a profile writes them, which
+    would otherwise change the key of the profile it has just cached.
+
+    """
+    stamp = []
+    for directory in ['tests', 'framework']:
+        directory = os.path.join(_PIGLIT_DIR, directory)
+        for entry in sorted(os.listdir(directory)):
+            if entry.endswith('.py'):
+                path = os.path.join(directory, entry)
+                stamp.append((path, os.path.getmtime(path)))
+
+    build_dir = os.environ.get('PIGLIT_BUILD_DIR')
+    for root in [os.path.join(_PIGLIT_DIR, 'tests'),
+                 os.path.join(build_dir or _PIGLIT_DIR, 'generated_tests')]:
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = sorted(d for d in dirnames if d != '__pycache__')
+            stamp.append((dirpath, sorted(
+                f for f in filenames if not f.endswith(('.pyc', '.pyo')))))
+
+    data = json.dumps([_CACHE_VERSION, name, sys.version, sys.platform,
+                       build_dir, stamp])
+    return hashlib.sha1(data).hexdigest()
+
+
+def _read_cached_profile(path, key):
+    """ Return the profile cached in path if it has key, or None """
+    # Unpickling creates tens of thousands of objects, none of them garbage,
+    # which would set off the cycle collector over and over again
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with open(path, 'rb') as f:
+            if pickle.load(f) != key:
+                return None
+            glean_params, profile = pickle.load(f)
+    # A cache file that is missing, truncated, or written by a piglit that
+    # is too different to load it, is simply rebuilt
+    except Exception:
+        return None
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    # Profiles like quick change the glean parameters when they are imported,
+    # which has to be repeated when that is skipped
+    for param in glean_params:
+        if param not in GleanTest.GLOBAL_PARAMS:
+            GleanTest.GLOBAL_PARAMS.append(param)
+    return profile
+
+
+def _write_cached_profile(path, key, profile):
+    """ Cache profile in path with key, if the profile can be pickled """
+    try:
+        data = pickle.dumps((GleanTest.GLOBAL_PARAMS, profile),
+                            pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, TypeError, AttributeError):
+        # Profiles with filters that are lambdas, for example
+        return
+
+    # Write to a temporary file and rename it, so that two piglits starting at
+    # the same time never read a half written cache
+    temp = None
+    try:
+        if not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        fd, temp = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(key, f, pickle.HIGHEST_PROTOCOL)
+            f.write(data)
+        os.rename(temp, path)
+    except (IOError, OSError):
+        if temp is not None and os.path.exists(temp):
+            os.unlink(temp)
+
+
+def load_test_profile(filename, matcher=None):
     """ Load a python module and return it's profile attribute
 
     All of the python test files provide a profile attribute which is a
@@ -272,22 +580,56 @@ def load_test_profile(filename):
     compatible with script wrapping piglit. 'tests/quick', 'tests/quick.tests',
     and 'tests/quick.py' are all equally valid for filename
 
+    The profile is flattened and cached on disk, and as long as none of the
+    files it was built from have changed later calls load it from the cache
+    instead of importing the module again.
+
     Arguments:
     filename -- the name of a python module to get a 'profile' from
 
+    Keyword Arguments:
+    matcher -- a matcher.TestMatcher of the tests that will be run. When the
+               profile has to be imported the helpers that discover tests skip
+               the groups it rules out. Such a profile is incomplete, so it is
+               not cached.
+
     """
-    mod = importlib.import_module('tests.{0}'.format(
-        os.path.splitext(os.path.basename(filename))[0]))
+    name = os.path.splitext(os.path.basename(filename))[0]
+
+    # The key is taken before the import, so that a file changed while the
+    # profile is being imported makes the key of the cache stale
+    cache = _cache_path(name)
+    if cache is not None:
+        key = _cache_key(name)
+        profile = _read_cached_profile(cache, key)
+        if profile is not None:
+            return profile
+
+    prune = matcher is not None and matcher.prunes
+    set_discovery_matcher(matcher if prune else None)
+    try:
+        mod = importlib.import_module('tests.{0}'.format(name))
+    finally:
+        set_discovery_matcher(None)
 
     try:
-        return mod.profile
+        profile = mod.profile
     except AttributeError:
         print("Error: There is not profile attribute in module {0}."
               "Did you specify the right file?".format(filename))
         sys.exit(1)
 
+    if cache is not None and profile.cacheable and not prune:
+        # Profiles like quick import and change the profile of another
+        # module, which has to be left the way that module built it
+        flat = copy.copy(profile)
+        flat.test_list = dict(profile.test_list)
+        flat._flatten_group_hierarchy()
+        _write_cached_profile(cache, key, flat)
+    return profile
+
 
-def merge_test_profiles(profiles):
+def merge_test_profiles(profiles, matcher=None):
     """ Helper for loading and merging TestProfile instances
 
     Takes paths to test profiles as arguments and returns a single merged
@@ -296,8 +638,11 @@ def merge_test_profiles(profiles):
     Arguments:
     profiles -- a list of one or more paths to profile files.
 
+    Keyword Arguments:
+    matcher -- passed to load_test_profile()
+
     """
-    profile = load_test_profile(profiles.pop())
+    profile = load_test_profile(profiles.pop(), matcher)
     for p in profiles:
-        profile.update(load_test_profile(p))
+        profile.update(load_test_profile(p, matcher))
     return profile
@@ -26,18 +26,27 @@ import sys
 import os
 import os.path as path
 import time
+import threading
+import contextlib
 import ConfigParser
 
 import framework.core as core
 import framework.results
 import framework.profile
+import framework.executor
+import framework.exectest
+from framework.log import LogManager
+from framework.scheduler import load_durations, order_by_duration
+from framework.incremental import Fingerprinter, reuse_results
 
 __all__ = ['run',
-           'resume']
+           'resume',
+           'coordinator',
+           'worker']
 
 
 _PLATFORMS = ["glx", "x11_egl", "wayland", "gbm", "mixed_glx_egl"]
-_BACKENDS = ['json', 'junit']
+_BACKENDS = ['json', 'jsonl', 'junit']
 
 
 def _default_platform():
@@ -90,8 +99,26 @@ def _default_backend():
         return 'json'
 
 
-def _run_parser(input_):
-    """ Parser for piglit run command """
+def _shard(value):
+    """ argparse type for --shard, converts K/N into [K, N] """
+    try:
+        index, count = [int(x) for x in value.split('/')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            'shard must be K/N, like 1/4, not {}'.format(value))
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(
+            'shard K/N must have 1 <= K <= N, not {}'.format(value))
+    return [index, count]
+
+
+def _run_parser(input_, coordinator=False):
+    """ Parser for piglit run command
+
+    With coordinator the parser also takes the address to listen on for
+    piglit coordinator.
+
+    """
     # Parse the config file before any other options, this allows the config
     # file to be used to sete default values for the parser.
     parser = argparse.ArgumentParser(add_help=False)
@@ -144,6 +171,46 @@ def _run_parser(input_):
                              const="none",
                              dest="concurrency",
                              help="Disable concurrent test runs")
+    parser.add_argument("--executor",
+                        default='threads',
+                        choices=framework.executor.EXECUTORS,
+                        help="Select how test processes are supervised. "
+                             "'threads' blocks a thread per running test, "
+                             "'event-loop' supervises all of them from a "
+                             "single thread")
+    parser.add_argument("--history",
+                        default=[],
+                        action="append",
+                        type=path.realpath,
+                        metavar="<Results Path>",
+                        help="Earlier results to take test durations from. "
+                             "The longest running tests are started first "
+                             "(can be used more than once)")
+    parser.add_argument("--reuse-results",
+                        default=[],
+                        action="append",
+                        type=path.realpath,
+                        metavar="<Results Path>",
+                        help="Earlier results to reuse. Tests whose command, "
+                             "files, environment and driver fingerprint are "
+                             "unchanged are not run again, their earlier "
+                             "result is copied (can be used more than once)")
+    parser.add_argument("--driver-fingerprint",
+                        default="",
+                        metavar="<string>",
+                        help="A string identifying the driver under test, "
+                             "like the hash of the DRI driver. Results are "
+                             "only reused with --reuse-results if it is the "
+                             "same as in the earlier run")
+    parser.add_argument("--shard",
+                        type=_shard,
+                        default=[1, 1],
+                        metavar="<K/N>",
+                        help="Split the tests into N shards and only run "
+                             "shard K. The split is the same on every "
+                             "machine, and balanced by the durations in "
+                             "--history if given. The results of the shards "
+                             "can be merged with piglit-merge-results.py")
     parser.add_argument("-p", "--platform",
                         choices=_PLATFORMS,
                         default=_default_platform(),
@@ -157,7 +224,9 @@ def _run_parser(input_):
                              "after each test. Implies -1/--no-concurrency")
     parser.add_argument("-s", "--sync",
                         action="store_true",
-                        help="Sync results to disk after every test")
+                        help="Sync results to disk in batches while the "
+                             "tests run, see sync_interval and sync_records "
+                             "in piglit.conf")
     parser.add_argument("--junit_suffix",
                         type=str,
                         default="",
@@ -182,6 +251,16 @@ def _run_parser(input_):
                             choices=['quiet', 'verbose', 'dummy'],
                             default='quiet',
                             help="Set the logger verbosity level")
+    if coordinator:
+        # Only the distributed commands import this
+        from framework.distributed import parse_address
+        parser.add_argument("--listen",
+                            type=parse_address,
+                            default="localhost:7654",
+                            metavar="<host:port>",
+                            help="Address to wait for workers on, an empty "
+                                 "host listens on every interface. "
+                                 "Default: localhost:7654")
     parser.add_argument("test_profile",
                         metavar="<Path to one or more test profile(s)>",
                         nargs='+',
@@ -193,16 +272,158 @@ def _run_parser(input_):
     return parser.parse_args(unparsed)
 
 
-def run(input_):
-    """ Function for piglit run command
+def _create_options(args):
+    """ Create the core.Options of a run from the parsed arguments """
+    # If dmesg is requested we must have serial run, this is becasue dmesg
+    # isn't reliable with threaded run
+    if args.dmesg:
+        args.concurrency = "none"
 
-    This is a function because it allows it to be shared between piglit-run.py
-    and piglit run
+    # Pass arguments into Options
+    opts = core.Options(concurrent=args.concurrency,
+                        exclude_filter=args.exclude_tests,
+                        include_filter=args.include_tests,
+                        execute=args.execute,
+                        valgrind=args.valgrind,
+                        dmesg=args.dmesg,
+                        sync=args.sync,
+                        executor=args.executor,
+                        history=args.history,
+                        reuse_results=args.reuse_results,
+                        driver_fingerprint=args.driver_fingerprint,
+                        shard=args.shard)
+
+    # Set the platform to pass to waffle
+    opts.env['PIGLIT_PLATFORM'] = args.platform
+    return opts
+
+
+def _options_from_metadata(options):
+    """ Recreate the core.Options of a run from the options in its metadata
+
+    Used to resume a run, and by workers to run the tests of a coordinator.
 
     """
-    args = _run_parser(input_)
+    opts = core.Options(concurrent=options['concurrent'],
+                        exclude_filter=options['exclude_filter'],
+                        include_filter=options['filter'],
+                        execute=options['execute'],
+                        valgrind=options['valgrind'],
+                        dmesg=options['dmesg'],
+                        sync=options['sync'],
+                        executor=options.get('executor', 'threads'),
+                        history=options.get('history'),
+                        reuse_results=options.get('reuse_results'),
+                        driver_fingerprint=options.get(
+                            'driver_fingerprint', ''),
+                        shard=options.get('shard'))
+    opts.env['PIGLIT_PLATFORM'] = options['platform']
+    return opts
+
+
+def _collect_system_info():
+    """ Start collecting the system information in a thread
+
+    Running glxinfo and friends takes a while, this allows loading the
+    profiles and running the tests at the same time. The system information
+    is written to the results when the backend is finalized. Returns a
+    function that waits for the thread and returns what
+    core.collect_system_info() returned, or raises what it raised. Called
+    with wait=False it returns an empty dictionary instead of waiting, or if
+    collecting failed.
+
+    """
+    result = {}
+    error = []
+
+    def collect():
+        """ Thread target """
+        try:
+            result.update(core.collect_system_info())
+        except Exception:
+            error.append(sys.exc_info())
+
+    thread = threading.Thread(target=collect)
+    thread.daemon = True
+    thread.start()
+
+    def get(wait=True):
+        """ Wait for the system information and return it """
+        if not wait:
+            return {} if thread.is_alive() or error else result
+        thread.join()
+        if error:
+            raise error[0][0], error[0][1], error[0][2]
+        return result
+    return get
+
+
+def _create_metadata(args, opts, name, env=None):
+    """ Create the metadata dictionary the backend is initialized with
+
+    Arguments:
+    args -- the parsed command line
+    opts -- a core.Options instance
+    name -- the name of the run
+
+    Keyword Arguments:
+    env -- the system information written at the start of the results, by
+           default it is collected here. Pass an empty dictionary to write it
+           when the backend is finalized instead.
 
-    # Disable Windows error message boxes for this and all child processes.
+    """
+    # Create a dictionary to pass to initialize json, it needs the contents of
+    # the env dictionary and profile and platform information
+    options = {'profile': args.test_profile}
+    for key, value in opts:
+        options[key] = value
+    if args.platform:
+        options['platform'] = args.platform
+    options['name'] = name
+    options['env'] = env if env is not None else core.collect_system_info()
+    # FIXME: this should be the actual count, but profile needs to be
+    # refactored to make that possible because of the flattening pass that is
+    # part of profile.run
+    options['test_count'] = 0
+    options['test_suffix'] = args.junit_suffix
+    options['log_level'] = args.log_level
+    options['backend'] = args.backend
+    return options
+
+
+def _create_backend(name, results_path, metadata, opts):
+    """ Create the backend the results of a run are written to
+
+    The results are written from a thread of their own, so that the tests
+    don't wait for them to be encoded and written.
+
+    """
+    backend = framework.results.get_backend(name)(results_path, metadata,
+                                                  file_fsync=opts.sync)
+    return framework.results.WriterThread(backend)
+
+
+@contextlib.contextmanager
+def _finalize_on_error(backend, system_info=None):
+    """ Finalize the backend if the run fails or is interrupted
+
+    The writer thread of the backend can still hold the results of tests that
+    have finished, writing them keeps resume from running those tests again.
+    The system information is written too if system_info, a function returned
+    by _collect_system_info(), has it already.
+
+    """
+    try:
+        yield
+    except BaseException:
+        # Don't hold up an interrupt waiting for glxinfo and friends
+        backend.finalize(system_info(wait=False) if system_info else None)
+        raise
+
+
+def _disable_error_boxes():
+    """ Disable Windows error message boxes for this and all child processes
+    """
     if sys.platform == 'win32':
         # This disables messages boxes for uncaught exceptions, but it will not
         # disable the message boxes for assertion failures or abort().  Those
@@ -220,27 +441,26 @@ def run(input_):
               |  SEM_NOOPENFILEERRORBOX
         ctypes.windll.kernel32.SetErrorMode(uMode)
 
-    # If dmesg is requested we must have serial run, this is becasue dmesg
-    # isn't reliable with threaded run
-    if args.dmesg:
-        args.concurrency = "none"
 
-    # Pass arguments into Options
-    opts = core.Options(concurrent=args.concurrency,
-                        exclude_filter=args.exclude_tests,
-                        include_filter=args.include_tests,
-                        execute=args.execute,
-                        valgrind=args.valgrind,
-                        dmesg=args.dmesg,
-                        sync=args.sync)
+def _piglit_dir():
+    """ Change working directory to the root of the piglit directory """
+    os.chdir(path.dirname(path.realpath(sys.argv[0])))
 
-    # Set the platform to pass to waffle
-    opts.env['PIGLIT_PLATFORM'] = args.platform
 
-    # Change working directory to the root of the piglit directory
-    piglit_dir = path.dirname(path.realpath(sys.argv[0]))
-    os.chdir(piglit_dir)
+def run(input_):
+    """ Function for piglit run command
+
+    This is a function because it allows it to be shared between piglit-run.py
+    and piglit run
+
+    """
+    args = _run_parser(input_)
+    _disable_error_boxes()
+    opts = _create_options(args)
+
+    _piglit_dir()
     core.checkDir(args.results_path, False)
+    system_info = _collect_system_info()
 
     results = framework.results.TestrunResult()
 
@@ -250,40 +470,29 @@ def run(input_):
     else:
         results.name = path.basename(args.results_path)
 
-    # Create a dictionary to pass to initialize json, it needs the contents of
-    # the env dictionary and profile and platform information
-    options = {'profile': args.test_profile}
-    for key, value in opts:
-        options[key] = value
-    if args.platform:
-        options['platform'] = args.platform
-    options['name'] = results.name
-    options['env'] = core.collect_system_info()
-    # FIXME: this should be the actual count, but profile needs to be
-    # refactored to make that possible because of the flattening pass that is
-    # part of profile.run
-    options['test_count'] = 0
-    options['test_suffix'] = args.junit_suffix
-    options['log_level'] = args.log_level
+    profile = framework.profile.merge_test_profiles(list(args.test_profile),
+                                                    opts.matcher())
+    profile.results_dir = args.results_path
 
-    # Begin json.
-    backend = framework.results.get_backend(args.backend)(
-        args.results_path,
-        options,
-        file_fsync=opts.sync)
+    # The tests don't wait for the system information, it is written when
+    # the backend is finalized
+    options = _create_metadata(args, opts, results.name, {})
 
-    profile = framework.profile.merge_test_profiles(args.test_profile)
-    profile.results_dir = args.results_path
+    # Begin json.
+    backend = _create_backend(args.backend, args.results_path, options, opts)
 
     time_start = time.time()
     # Set the dmesg type
     if args.dmesg:
         profile.dmesg = args.dmesg
-    profile.run(opts, args.log_level, backend)
+    with _finalize_on_error(backend, system_info):
+        profile.run(opts, args.log_level, backend)
     time_end = time.time()
 
     results.time_elapsed = time_end - time_start
-    backend.finalize({'time_elapsed': results.time_elapsed})
+    metadata = dict(system_info())
+    metadata['time_elapsed'] = results.time_elapsed
+    backend.finalize(metadata)
 
     print('Thank you for running Piglit!\n'
           'Results have been written to ' + args.results_path)
@@ -301,42 +510,157 @@ def resume(input_):
                         help="Optionally specify a piglit config file to use. "
                              "Default is piglit.conf")
     args = parser.parse_args(input_)
+    system_info = _collect_system_info()
 
     results = framework.results.load_results(args.results_path)
-    opts = core.Options(concurrent=results.options['concurrent'],
-                        exclude_filter=results.options['exclude_filter'],
-                        include_filter=results.options['filter'],
-                        execute=results.options['execute'],
-                        valgrind=results.options['valgrind'],
-                        dmesg=results.options['dmesg'],
-                        sync=results.options['sync'])
+    opts = _options_from_metadata(results.options)
 
     core.get_config(args.config_file)
 
-    opts.env['PIGLIT_PLATFORM'] = results.options['platform']
-
-    results.options['env'] = core.collect_system_info()
+    # The system information is written when the backend is finalized
+    results.options['env'] = {}
     results.options['name'] = results.name
 
-    # Resume only works with the JSON backend
-    backend = framework.results.get_backend('json')(
-        args.results_path,
-        results.options,
-        file_fsync=opts.sync)
+    # Resume only works with the backends that can be loaded, results written
+    # before the backend was recorded are json
+    backend = _create_backend(results.options.get('backend', 'json'),
+                              args.results_path, results.options, opts)
 
-    for key, value in results.tests.iteritems():
-        backend.write_test(key, value)
-        opts.exclude_tests.add(key)
+    with _finalize_on_error(backend, system_info):
+        for key, value in results.tests.iteritems():
+            backend.write_test(key, value)
+            opts.exclude_tests.add(key)
 
-    profile = framework.profile.merge_test_profiles(results.options['profile'])
-    profile.results_dir = args.results_path
-    if opts.dmesg:
-        profile.dmesg = opts.dmesg
+        profile = framework.profile.merge_test_profiles(
+            results.options['profile'], opts.matcher())
+        profile.results_dir = args.results_path
+        if opts.dmesg:
+            profile.dmesg = opts.dmesg
 
-    # This is resumed, don't bother with time since it wont be accurate anyway
-    profile.run(opts, results.options['log_level'], backend)
+        # This is resumed, don't bother with time since it wont be accurate
+        # anyway
+        profile.run(opts, results.options['log_level'], backend)
 
-    backend.finalize()
+    backend.finalize(system_info())
 
     print("Thank you for running Piglit!\n"
           "Results have been written to {0}".format(args.results_path))
+
+
+def coordinator(input_):
+    """ Function for piglit coordinator command
+
+    Takes the same arguments as piglit run, but rather than running the tests
+    itself it waits for piglit worker processes to connect and hands the tests
+    out to them. Their results are written to a single backend.
+
+    """
+    args = _run_parser(input_, coordinator=True)
+    opts = _create_options(args)
+
+    _piglit_dir()
+    core.checkDir(args.results_path, False)
+    system_info = _collect_system_info()
+
+    profile = framework.profile.merge_test_profiles(list(args.test_profile),
+                                                    opts.matcher())
+
+    name = args.name or path.basename(args.results_path)
+    options = _create_metadata(args, opts, name, {})
+    backend = _create_backend(args.backend, args.results_path, options, opts)
+
+    # Workers need everything but the system information to load the tests
+    setup = dict((k, v) for k, v in options.iteritems() if k != 'env')
+    setup['profile'] = list(args.test_profile)
+
+    framework.exectest.Test.OPTS = opts
+    durations = load_durations(opts.history)
+    profile._prepare_test_list(opts, durations)
+
+    log = LogManager(args.log_level, len(profile.test_list))
+    with _finalize_on_error(backend, system_info):
+        tests = reuse_results(profile.test_list, opts, backend, log,
+                              Fingerprinter(opts.driver_fingerprint))
+        if durations:
+            names = [n for n, _ in order_by_duration(tests.iteritems(),
+                                                     durations)]
+        else:
+            names = sorted(tests)
+
+        from framework.distributed import Coordinator
+        coordinator_ = Coordinator(names, setup, backend, log, args.listen)
+        print('Waiting for workers on {0}:{1}'.format(*coordinator_.address))
+
+        time_start = time.time()
+        coordinator_.run()
+    time_end = time.time()
+    log.get().summary()
+
+    metadata = dict(system_info())
+    metadata['time_elapsed'] = time_end - time_start
+    backend.finalize(metadata)
+
+    print('Thank you for running Piglit!\n'
+          'Results have been written to ' + args.results_path)
+
+
+def _load_worker_setup(setup):
+    """ Load the tests of a coordinator from the setup it sent """
+    opts = _options_from_metadata(setup)
+    framework.exectest.Test.OPTS = opts
+    framework.exectest.SPAWNER.reset()
+
+    profile = framework.profile.merge_test_profiles(list(setup['profile']),
+                                                    opts.matcher())
+    profile._flatten_group_hierarchy()
+    profile._add_test_sources(opts.matcher())
+    if opts.dmesg:
+        profile.dmesg = opts.dmesg
+    return profile.test_list, opts, profile.dmesg
+
+
+def worker(input_):
+    """ Function for piglit worker command
+
+    Connects to a piglit coordinator and runs the tests it hands out. The
+    worker must have the same piglit tree, and the same test binaries, as the
+    coordinator expects.
+
+    """
+    # Only the distributed commands import this
+    from framework.distributed import Worker, parse_address
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-j", "--jobs",
+                        type=int,
+                        default=None,
+                        help="Number of tests to run at once. "
+                             "Default: the number of processor cores")
+    parser.add_argument("-f", "--config",
+                        dest="config_file",
+                        type=argparse.FileType("r"),
+                        help="Optionally specify a piglit config file to use. "
+                             "Default is piglit.conf")
+    parser.add_argument("-l", "--log-level",
+                        dest="log_level",
+                        action="store",
+                        choices=['quiet', 'verbose', 'dummy'],
+                        default='dummy',
+                        help="Set the logger verbosity level")
+    parser.add_argument("address",
+                        type=parse_address,
+                        metavar="<host:port>",
+                        help="Address of the coordinator")
+    args = parser.parse_args(input_)
+
+    core.get_config(args.config_file)
+    _disable_error_boxes()
+    _piglit_dir()
+
+    worker_ = Worker(
+        args.address, _load_worker_setup, LogManager(args.log_level, 0),
+        jobs=args.jobs)
+    worker_.run()
+
+    print('Ran {0} tests for the coordinator at {1}:{2}'.format(
+        worker_.completed, *args.address))
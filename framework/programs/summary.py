@@ -107,12 +107,12 @@ class _Writer:
         self.path = []
 
     def write(self, arg):
-        testrun = framework.results.load_results(arg)
+        testrun = framework.results.TestrunReader(arg)
 
         self.report.start()
         self.report.startSuite('piglit')
         try:
-            for name, result in testrun.tests.iteritems():
+            for name, result in testrun.iter_tests():
                 self.write_test(testrun, name, result)
         finally:
             self.enter_path([])
@@ -261,13 +261,17 @@ def csv(input_):
                         help="JSON results file to be converted")
     args = parser.parse_args(input_)
 
-    testrun = framework.results.load_results(args.testResults)
+    testrun = framework.results.TestrunReader(args.testResults)
 
     def write_results(output):
-        for name, result in testrun.tests.iteritems():
-            output.write("{},{},{},{}\n".format(name, result['time'],
-                                                result['returncode'],
-                                                result['result']))
+        for name, result in testrun.iter_tests():
+            # CPU time and peak memory are left empty for tests that don't
+            # have them, like results from older versions of piglit
+            rusage = result.get('rusage', {})
+            output.write("{},{},{},{},{},{},{}\n".format(
+                name, result['time'], result['returncode'], result['result'],
+                rusage.get('utime', ''), rusage.get('stime', ''),
+                rusage.get('maxrss', '')))
 
     if args.output != "stdout":
         with open(args.output, 'w') as output:
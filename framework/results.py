@@ -26,37 +26,51 @@ import os
 import re
 import sys
 import abc
+import time
+import Queue
 import threading
 import posixpath
-from cStringIO import StringIO
+import ConfigParser
 
 try:
     import simplejson as json
 except ImportError:
     import json
-try:
-    from lxml import etree
-except ImportError:
-    import xml.etree.cElementTree as etree
 
 from framework.core import PIGLIT_CONFIG
 import framework.status as status
 
 __all__ = [
     'TestrunResult',
+    'TestrunReader',
     'TestResult',
+    'write_results',
     'load_results',
     'get_backend',
     'BACKENDS',
 ]
 
 # A list of available backends
-BACKENDS = ['json', 'junit']
+BACKENDS = ['json', 'jsonl', 'junit']
 
 # The current version of the JSON results
 CURRENT_JSON_VERSION = 1
 
 
+def _etree():
+    """ Return the ElementTree implementation for the JUnit backend
+
+    lxml takes a while to import, which every piglit command would pay for if
+    it was imported with this module.
+
+    """
+    try:
+        from lxml import etree
+    except ImportError:
+        import xml.etree.cElementTree as etree
+    return etree
+
+
 def _piglit_encoder(obj):
     """ Encoder for piglit that can transform additional classes into json
 
@@ -70,27 +84,112 @@ def _piglit_encoder(obj):
     return obj
 
 
+def _sync_option(name, type_, default):
+    """ Return an option of the [core] section of piglit.conf, or default """
+    try:
+        return type_(PIGLIT_CONFIG.get('core', name))
+    except (ConfigParser.NoOptionError, ConfigParser.NoSectionError):
+        return default
+
+
 class FSyncMixin(object):
     """ Mixin class that adds fsync support
 
     This class provides an init method that sets self._file_sync from a keyword
-    arugment file_fsync, and then provides an _fsync() method that does an
-    fsync if self._file_sync is truthy
+    arugment file_fsync, and then provides an _fsync() method to be called
+    after each complete record is written, and a _close() method that closes
+    the file.
+
+    If self._file_sync is truthy the syncs are group committed: a flusher
+    thread syncs self._file to disk once file_sync_records records are
+    pending, or file_sync_interval seconds after the first of them was
+    written, whichever comes first. Writers never wait for the disk, and every
+    record is on disk once the batch it is part of has been synced. _close()
+    syncs whatever is still pending, and whatever was written after it.
+
+    The defaults for file_sync_interval and file_sync_records are read from
+    sync_interval and sync_records in the [core] section of piglit.conf.
 
     """
-    def __init__(self, file_fsync=False, **options):
+    DEFAULT_SYNC_INTERVAL = 1.0
+    DEFAULT_SYNC_RECORDS = 100
+
+    def __init__(self, file_fsync=False, file_sync_interval=None,
+                 file_sync_records=None, **options):
         self._file_sync = file_fsync
         assert self._file
 
+        self._sync_interval = file_sync_interval or _sync_option(
+            'sync_interval', float, self.DEFAULT_SYNC_INTERVAL)
+        self._sync_records = file_sync_records or _sync_option(
+            'sync_records', int, self.DEFAULT_SYNC_RECORDS)
+        self._sync_cond = threading.Condition()
+        self._sync_pending = 0
+        self._sync_closing = False
+        self._flusher = None
+        if self._file_sync:
+            self._flusher = threading.Thread(target=self._flush_loop)
+            self._flusher.daemon = True
+            self._flusher.start()
+
     def _fsync(self):
-        """ Sync the file to disk
+        """ Mark a record as written
 
-        If self._fsync is truthy this will sync self._file to disk
+        If self._file_sync is truthy the record will be synced to disk with
+        the rest of its batch.
 
         """
         if self._file_sync:
-            self._file.flush()
-            os.fsync(self._file.fileno())
+            with self._sync_cond:
+                self._sync_pending += 1
+                # Wake the flusher to start the interval of a new batch, or
+                # to sync a full one
+                if self._sync_pending in [1, self._sync_records]:
+                    self._sync_cond.notify()
+
+    def _flush_loop(self):
+        """ Body of the flusher thread, syncs the pending records in batches
+        """
+        with self._sync_cond:
+            while True:
+                while not (self._sync_pending or self._sync_closing):
+                    self._sync_cond.wait()
+                if not self._sync_pending:
+                    return
+
+                deadline = time.time() + self._sync_interval
+                while (self._sync_pending < self._sync_records and
+                       not self._sync_closing):
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    self._sync_cond.wait(remaining)
+
+                # Everything written so far is synced, records written while
+                # syncing are part of the next batch
+                self._sync_pending = 0
+                self._sync_cond.release()
+                try:
+                    self._sync_file()
+                finally:
+                    self._sync_cond.acquire()
+
+    def _sync_file(self):
+        """ Sync self._file to disk """
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _close(self):
+        """ Sync any pending records and close the file """
+        if self._flusher is not None:
+            with self._sync_cond:
+                # Whatever was written after the last record, like the end of
+                # the file, is synced with the last batch
+                self._sync_pending += 1
+                self._sync_closing = True
+                self._sync_cond.notify()
+            self._flusher.join()
+        self._file.close()
 
 
 class Backend(object):
@@ -282,6 +381,7 @@ class JSONBackend(FSyncMixin, Backend):
             # Open the tests dictinoary so that tests can be written
             self._write_dict_key('tests')
             self._open_dict()
+            self._fsync()
 
     def finalize(self, metadata=None):
         """ End json serialization and cleanup
@@ -306,7 +406,7 @@ class JSONBackend(FSyncMixin, Backend):
             # Close the file.
             assert self._open_containers == [], \
                 "containers stack: {0}".format(self._open_containers)
-            self._file.close()
+            self._close()
 
     def __write_indent(self):
         if self.__inhibit_next_indent:
@@ -332,7 +432,6 @@ class JSONBackend(FSyncMixin, Backend):
         self.__indent_level += 1
         self.__is_collection_empty.append(True)
         self._open_containers.append('dict')
-        self._fsync()
 
     def _close_dict(self):
         self.__indent_level -= 1
@@ -343,7 +442,6 @@ class JSONBackend(FSyncMixin, Backend):
         self._file.write('}')
         assert self._open_containers[-1] == 'dict'
         self._open_containers.pop()
-        self._fsync()
 
     def _write_dict_item(self, key, value):
         # Write key.
@@ -352,8 +450,6 @@ class JSONBackend(FSyncMixin, Backend):
         # Write value.
         self.__write(value)
 
-        self._fsync()
-
     def _write_dict_key(self, key):
         # Write comma if this is not the initial item in the dict.
         if self.__is_collection_empty[-1]:
@@ -366,12 +462,109 @@ class JSONBackend(FSyncMixin, Backend):
         self._file.write(': ')
 
         self.__inhibit_next_indent = True
-        self._fsync()
 
     def write_test(self, name, data):
         """ Write a test into the JSON tests dictionary """
         with self._LOCK:
             self._write_dict_item(name, data)
+        self._fsync()
+
+
+class JSONLBackend(FSyncMixin, Backend):
+    """ Writes to a JSON Lines file, one record per line
+
+    Every line is a complete, compact json object: a header record holding the
+    metadata, one record per test, and a footer record written by finalize().
+    A line is only written once it is complete, so if a run is interrupted
+    all that can be lost is the last, partially written line, which the
+    loader drops.
+
+    A record is a dictionary with a 'type' key of 'header', 'test' or
+    'footer'. The header holds the same keys as the top level of a
+    results.json file, less 'tests'. Test records hold the 'name' and 'data'
+    of a test, and the footer holds the final metadata.
+
+    """
+    def __init__(self, dest, metadata, **options):
+        self._file = open(os.path.join(dest, 'results.jsonl'), 'w')
+        FSyncMixin.__init__(self, **options)
+        self._lock = threading.Lock()
+        self._encoder = json.JSONEncoder(separators=(',', ':'),
+                                         default=_piglit_encoder)
+
+        header = {'type': 'header',
+                  'results_version': CURRENT_JSON_VERSION,
+                  'name': metadata['name'],
+                  'options': {}}
+        for key, value in metadata.iteritems():
+            # Dont' write env or name into the options dictionary
+            if key in ['env', 'name']:
+                continue
+
+            # Loading a NoneType will break resume, and are a bug
+            assert value is not None, "Value {} is NoneType".format(key)
+            header['options'][key] = value
+        header.update(metadata['env'])
+        self._write_record(header)
+
+    def _write_record(self, record):
+        """ Encode a record and write it as a single line """
+        # Encoding doesn't need the lock, only the write does
+        line = self._encoder.encode(record) + '\n'
+        with self._lock:
+            self._file.write(line)
+        self._fsync()
+
+    def finalize(self, metadata=None):
+        """ Write the footer record and close the file """
+        footer = {'type': 'footer'}
+        if metadata:
+            footer.update(metadata)
+        self._write_record(footer)
+        with self._lock:
+            self._close()
+
+    def write_test(self, name, data):
+        """ Write a test as a single record """
+        self._write_record({'type': 'test', 'name': name, 'data': data})
+
+
+def _iter_jsonl(lines):
+    """ Decode the records in the lines of a file written by JSONLBackend
+
+    If the last line is not a complete record it was being written when the
+    run was interrupted, and is dropped. A broken record anywhere else is an
+    error.
+
+    """
+    broken = None
+    for line in lines:
+        if broken is not None:
+            raise Exception('corrupt record in result file: ' + broken)
+        try:
+            record = json.loads(line)
+        except ValueError:
+            broken = line
+            continue
+        yield record
+
+
+def _load_jsonl(header, lines):
+    """ Build the dictionary a results.json file holds from JSON Lines records
+
+    Takes the decoded header record and an iterable of the remaining lines of
+    a file written by JSONLBackend.
+
+    """
+    raw_dict = {'tests': {}}
+    raw_dict.update((k, v) for k, v in header.iteritems() if k != 'type')
+    for record in _iter_jsonl(lines):
+        kind = record.pop('type')
+        if kind == 'test':
+            raw_dict['tests'][record['name']] = record['data']
+        else:
+            raw_dict.update(record)
+    return raw_dict
 
 
 class JUnitBackend(FSyncMixin, Backend):
@@ -410,7 +603,7 @@ class JUnitBackend(FSyncMixin, Backend):
     def finalize(self, metadata=None):
         self._file.write('</testsuite>\n')
         self._file.write('</testsuites>\n')
-        self._file.close()
+        self._close()
 
     def write_test(self, name, data):
         # Split the name of the test and the group (what junit refers to as
@@ -443,6 +636,8 @@ class JUnitBackend(FSyncMixin, Backend):
         if lname in self._expected_crashes:
             expected_result = "error"
 
+        etree = _etree()
+
         # Create the root element
         element = etree.Element('testcase', name=testname + self._test_suffix,
                                 classname=classname,
@@ -457,6 +652,13 @@ class JUnitBackend(FSyncMixin, Backend):
         err = etree.SubElement(element, 'system-err')
         err.text = data['err']
 
+        # JUnit has no place for the resources used by the test process, so
+        # they are added to stderr if they were recorded
+        if data.get('rusage'):
+            err.text += '\n\nrusage: {}'.format(', '.join(
+                '{}={}'.format(k, v)
+                for k, v in sorted(data['rusage'].iteritems())))
+
         # Add relevant result value, if the result is pass then it doesn't need
         # one of these statuses
         if data['result'] == 'skip':
@@ -481,6 +683,71 @@ class JUnitBackend(FSyncMixin, Backend):
 
         self._file.write(etree.tostring(element))
         self._file.write('\n')
+        self._fsync()
+
+
+class WriterThread(Backend):
+    """ Writes the tests of another backend from a thread of its own
+
+    write_test() only puts the test into a queue, the wrapped backend encodes
+    and writes it in the writer thread while the tests keep running. The queue
+    is bounded, once it is full write_test() waits for the writer to catch
+    up. finalize() waits for every queued test to be written before
+    finalizing the wrapped backend.
+
+    If writing a test fails the remaining tests are dropped, and the error is
+    raised again by the next call to write_test() or finalize(). Tests
+    written after finalize() was called, by workers still running when a run
+    is interrupted, are dropped.
+
+    Arguments:
+    backend -- a Backend derived instance to write the tests with
+
+    Keyword Arguments:
+    queue_size -- the number of tests that can be waiting to be written.
+                  Default: 100
+
+    """
+    _DONE = object()
+
+    def __init__(self, backend, queue_size=100):
+        self._backend = backend
+        self._queue = Queue.Queue(queue_size)
+        self._error = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._write_loop)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _write_loop(self):
+        """ Body of the writer thread """
+        while True:
+            item = self._queue.get()
+            if item is self._DONE:
+                return
+            if self._error is None:
+                try:
+                    self._backend.write_test(*item)
+                except Exception:
+                    self._error = sys.exc_info()
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise self._error[0], self._error[1], self._error[2]
+
+    def write_test(self, name, data):
+        """ Queue a test to be written by the wrapped backend """
+        self._raise_error()
+        if not self._closed:
+            self._queue.put((name, data))
+
+    def finalize(self, metadata=None):
+        """ Write the queued tests, and finalize the wrapped backend """
+        self._closed = True
+        self._queue.put(self._DONE)
+        self._thread.join()
+        self._raise_error()
+        self._backend.finalize(metadata)
 
 
 class TestResult(dict):
@@ -530,6 +797,61 @@ class TestResult(dict):
         update(self, dictionary, False)
 
 
+def _rfind(file_, pattern, block=1 << 16):
+    """ Return the offset of the last occurence of pattern in a file
+
+    The file is read backwards from its end in blocks, so finding something
+    near the end of a large file is cheap. Returns None if pattern is not in
+    the file.
+
+    """
+    file_.seek(0, os.SEEK_END)
+    end = file_.tell()
+    # The start of the block after the current one, in case pattern spans
+    # both blocks
+    overlap = ''
+    while end > 0:
+        start = max(0, end - block)
+        file_.seek(start)
+        data = file_.read(end - start) + overlap
+        index = data.rfind(pattern)
+        if index != -1:
+            return start + index
+        overlap = data[:len(pattern) - 1]
+        end = start
+    return None
+
+
+class _RepairedFile(object):
+    """ A read only file-like object of the start of a file and a suffix
+
+    This reads the first length bytes of a file, followed by suffix, without
+    copying the file.
+
+    """
+    def __init__(self, file_, length, suffix):
+        self._file = file_
+        self._remaining = length
+        self._suffix = suffix
+        self._file.seek(0)
+
+    def read(self, size=-1):
+        if size < 0:
+            size = self._remaining + len(self._suffix)
+
+        data = ''
+        if self._remaining:
+            data = self._file.read(min(size, self._remaining))
+            if not data:
+                raise Exception('result file was truncated while reading')
+            self._remaining -= len(data)
+        if not self._remaining:
+            suffix = self._suffix[:size - len(data)]
+            self._suffix = self._suffix[len(suffix):]
+            data += suffix
+        return data
+
+
 class TestrunResult(object):
     def __init__(self, resultfile=None):
         self.serialized_keys = ['options',
@@ -551,12 +873,23 @@ class TestrunResult(object):
         self.tests = {}
 
         if resultfile:
-            # Attempt to open the json file normally, if it fails then attempt
-            # to repair it.
+            # Files written by the jsonl backend start with a header record on
+            # a line of its own. An indented results.json starts with a lone
+            # '{', which doesn't decode, a compact one is all on the first
+            # line.
+            first = resultfile.readline()
             try:
-                raw_dict = json.load(resultfile)
+                raw_dict = json.loads(first)
             except ValueError:
-                raw_dict = json.load(self.__repair_file(resultfile))
+                # Attempt to open the json file normally, if it fails then
+                # attempt to repair it.
+                try:
+                    raw_dict = json.loads(first + resultfile.read())
+                except ValueError:
+                    raw_dict = json.load(self.__repair_file(resultfile))
+            else:
+                if raw_dict.get('type') == 'header':
+                    raw_dict = _load_jsonl(raw_dict, resultfile)
 
             # If there is no results version in the json, put set it to zero
             self.results_version = getattr(raw_dict, 'results_version', 0)
@@ -582,65 +915,343 @@ class TestrunResult(object):
         discarding the trailing, incomplete item and appending braces
         to the file to close the JSON object.
 
-        The repair is performed on a string buffer, and the given file
-        is never written to. This allows the file to be safely read
+        The file is searched backwards from its end for the last
+        complete test result, so only its tail is read. The given file
+        is never written to, this allows the file to be safely read
         during a test run.
 
-        :return: If no repair occured, then ``file`` is returned.
-                Otherwise, a new file object containing the repaired JSON
-                is returned.
+        :return: A file-like object reading the part of ``file`` up to
+                 the end of the last complete test result, followed by
+                 the braces closing the JSON object.
         '''
-
-        file_.seek(0)
-        lines = file_.readlines()
-
-        # JSON object was not closed properly.
-        #
-        # To repair the file, we execute these steps:
-        #   1. Find the closing brace of the last, properly written
-        #      test result.
-        #   2. Discard all subsequent lines.
-        #   3. Remove the trailing comma of that test result.
-        #   4. Append enough closing braces to close the json object.
-        #   5. Return a file object containing the repaired JSON.
-
         # Each non-terminal test result ends with this line:
         safe_line = 2 * JSONBackend.INDENT * ' ' + '},\n'
 
         # Search for the last occurence of safe_line.
-        safe_line_num = None
-        for i in range(-1, - len(lines), -1):
-            if lines[i] == safe_line:
-                safe_line_num = i
-                break
-
-        if safe_line_num is None:
+        offset = _rfind(file_, '\n' + safe_line)
+        if offset is None:
             raise Exception('failed to repair corrupt result file: ' +
                             file_.name)
 
-        # Remove corrupt lines.
-        lines = lines[0:(safe_line_num + 1)]
+        # Keep everything up to the closing brace of that test result,
+        # dropping the trailing comma and the corrupt lines after it, and
+        # close the json object.
+        return _RepairedFile(file_, offset + len(safe_line) - 1,
+                             '\n' + JSONBackend.INDENT * ' ' + '}\n}')
 
-        # Remove trailing comma.
-        lines[-1] = 2 * JSONBackend.INDENT * ' ' + '}\n'
-
-        # Close json object.
-        lines.append(JSONBackend.INDENT * ' ' + '}\n')
-        lines.append('}')
+    def write(self, file_):
+        """ Write only values of the serialized_keys out to file
 
-        # Return new file object containing the repaired JSON.
-        new_file = StringIO()
-        new_file.writelines(lines)
-        new_file.flush()
-        new_file.seek(0)
-        return new_file
+        Arguments:
+        file_ -- the name of the file to write, or a file object
 
-    def write(self, file_):
-        """ Write only values of the serialized_keys out to file """
+        """
+        if not isinstance(file_, basestring):
+            self.__write(file_)
+            return
         with open(file_, 'w') as f:
-            json.dump(dict((k, v) for k, v in self.__dict__.iteritems()
-                           if k in self.serialized_keys),
-                      f, default=_piglit_encoder, indent=JSONBackend.INDENT)
+            self.__write(f)
+
+    def __write(self, f):
+        json.dump(dict((k, v) for k, v in self.__dict__.iteritems()
+                       if k in self.serialized_keys),
+                  f, default=_piglit_encoder, indent=JSONBackend.INDENT)
+
+
+class _Truncated(ValueError):
+    """ Raised when a json document ends before it is complete """
+
+
+class _JSONStream(object):
+    """ Decodes a json document from a file one value at a time
+
+    Only as much of the file is read as is needed to decode the next value,
+    so decoding a large document doesn't need memory for all of it. The end
+    of each value is found by scanning its strings and brackets before it is
+    decoded, so a value that isn't valid json is an error, while a value
+    that is cut short by the end of the file is a truncated document.
+
+    """
+    CHUNK = 1 << 16
+    # No single value is allowed to be longer than this, so that a broken
+    # value can't make the whole file be read into memory
+    MAX_VALUE = 1 << 26
+    _WHITESPACE = re.compile(r'[ \t\n\r]*')
+    _STRING_SPECIAL = re.compile(r'["\\]')
+    _VALUE_SPECIAL = re.compile(r'["{}\[\],: \t\n\r]')
+
+    def __init__(self, file_):
+        self._file = file_
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self):
+        """ Read more of the file, returns False at the end of it """
+        if self._eof:
+            return False
+        # Read at least as much as is buffered, so that decoding a value
+        # longer than a chunk takes a logarithmic number of tries
+        data = self._file.read(max(self.CHUNK, len(self._buf) - self._pos))
+        if not data:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos:] + data
+        self._pos = 0
+        return True
+
+    def peek(self):
+        """ Return the next character that is not whitespace, '' at the end
+        """
+        while True:
+            self._pos = self._WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, chars):
+        """ Consume the next character, which must be one of chars """
+        char = self.peek()
+        if not char:
+            raise _Truncated()
+        if char not in chars:
+            raise ValueError('expected one of {!r}, not {!r}'.format(chars,
+                                                                      char))
+        self._pos += 1
+        return char
+
+    def _scan(self):
+        """ Return the index in the buffer of the end of the next value
+
+        Raises _Truncated if the file ends before the value does.
+
+        """
+        # The offset from self._pos, which is moved by _fill()
+        offset = 0
+        depth = 0
+        in_string = False
+        while True:
+            if offset > self.MAX_VALUE:
+                raise ValueError('value longer than {} bytes'.format(
+                    self.MAX_VALUE))
+
+            index = self._pos + offset
+            if in_string:
+                match = self._STRING_SPECIAL.search(self._buf, index)
+                # An escape needs the character after it too
+                if match and (match.group() == '"' or
+                              match.end() < len(self._buf)):
+                    if match.group() == '\\':
+                        offset = match.end() + 1 - self._pos
+                        continue
+                    in_string = False
+                    if depth == 0:
+                        return match.end()
+                    offset = match.end() - self._pos
+                    continue
+                if match:
+                    offset = match.start() - self._pos
+            else:
+                match = self._VALUE_SPECIAL.search(self._buf, index)
+                if match:
+                    char = match.group()
+                    offset = match.end() - self._pos
+                    if char == '"':
+                        in_string = True
+                    elif char in '{[':
+                        depth += 1
+                    elif depth == 0:
+                        # The end of a number or literal
+                        return match.start()
+                    elif char in '}]':
+                        depth -= 1
+                        if depth == 0:
+                            return match.end()
+                    continue
+
+            if match is None:
+                offset = len(self._buf) - self._pos
+            if not self._fill():
+                raise _Truncated()
+
+    def value(self):
+        """ Decode the next value """
+        self.peek()
+        end = self._scan()
+        value, decoded = self._decoder.raw_decode(self._buf, self._pos)
+        if decoded != end:
+            raise ValueError('invalid json value: {!r}'.format(
+                self._buf[self._pos:end]))
+        self._pos = end
+        return value
+
+
+def _iter_json_records(file_):
+    """ Decode a results.json file one key at a time
+
+    Yields ('test', name, data) for each test, and ('meta', key, value) for
+    each of the other keys, in the order they are in the file. If the file
+    ends early the test that was being written when the run was interrupted,
+    and everything after it, is dropped.
+
+    """
+    stream = _JSONStream(file_)
+    try:
+        stream.expect('{')
+        if stream.peek() == '}':
+            return
+        while True:
+            key = stream.value()
+            stream.expect(':')
+            if key != 'tests':
+                yield 'meta', key, stream.value()
+            else:
+                stream.expect('{')
+                if stream.peek() == '}':
+                    stream.expect('}')
+                else:
+                    while True:
+                        name = stream.value()
+                        stream.expect(':')
+                        yield 'test', name, stream.value()
+                        if stream.expect(',}') == '}':
+                            break
+            if stream.expect(',}') == '}':
+                return
+    except _Truncated:
+        return
+
+
+def _iter_jsonl_records(file_):
+    """ Decode a file written by JSONLBackend one record at a time
+
+    Yields the same tuples as _iter_json_records().
+
+    """
+    for record in _iter_jsonl(file_):
+        kind = record.pop('type')
+        if kind == 'test':
+            yield 'test', record['name'], record['data']
+        else:
+            for key, value in record.iteritems():
+                yield 'meta', key, value
+
+
+class TestrunReader(object):
+    """ Reads a results file one test at a time
+
+    Unlike a TestrunResult this never holds more than one test of the run in
+    memory, which makes it suitable for very large results. The tests are
+    read with iter_tests(), which can be called more than once. The other
+    keys of the results are read the first time metadata is used. Keys after
+    the tests, like time_elapsed, are only known once the tests have been
+    read, if they haven't been metadata reads past them.
+
+    Results written by older versions of piglit have to be updated as a
+    whole, these are loaded with load_results() instead.
+
+    Arguments:
+    filename -- a results file or folder, anything load_results accepts
+
+    """
+    def __init__(self, filename):
+        self._path = _results_path(filename)
+        self._metadata = None
+
+    def _records(self):
+        """ Iterate over the records of the file, from the start """
+        with open(self._path, 'r') as f:
+            # Files written by the jsonl backend start with a header record,
+            # see TestrunResult
+            first = f.readline()
+            try:
+                header = json.loads(first)
+            except ValueError:
+                header = None
+            if isinstance(header, dict) and header.get('type') == 'header':
+                f.seek(0)
+                for record in _iter_jsonl_records(f):
+                    yield record
+            else:
+                f.seek(0)
+                for record in _iter_json_records(f):
+                    yield record
+
+    def _version(self):
+        """ Return the results version of the file
+
+        This is usually one of the first keys, but results written by
+        TestrunResult.write() can have it anywhere.
+
+        """
+        for kind, key, value in self._records():
+            if kind == 'test':
+                break
+            if key == 'results_version':
+                return value
+        return self.metadata.get('results_version', 0)
+
+    def iter_tests(self):
+        """ Yield the (name, TestResult) pairs of the tests in the file """
+        if self._version() != CURRENT_JSON_VERSION:
+            results = load_results(self._path)
+            self._metadata = dict(
+                (k, v) for k, v in results.__dict__.iteritems()
+                if k in results.serialized_keys and k != 'tests')
+            for name, result in results.tests.iteritems():
+                yield name, result
+            return
+
+        metadata = {}
+        for kind, key, value in self._records():
+            if kind == 'test':
+                yield key, TestResult(value)
+            else:
+                metadata[key] = value
+        self._metadata = metadata
+
+    @property
+    def metadata(self):
+        """ A dictionary of everything but the tests in the file """
+        if self._metadata is None:
+            self._metadata = dict((key, value)
+                                  for kind, key, value in self._records()
+                                  if kind == 'meta')
+        return self._metadata
+
+
+def write_results(file_, metadata, tests):
+    """ Write results to a file one test at a time
+
+    The file is laid out the way JSONBackend lays it out, so it can be read
+    with a TestrunReader without holding all of it in memory.
+
+    Arguments:
+    file_ -- a file object to write to
+    metadata -- a dictionary of the keys of the results other than the tests
+    tests -- an iterable of (name, TestResult) pairs
+
+    """
+    def encode(value, level):
+        return json.dumps(value, default=_piglit_encoder,
+                          indent=JSONBackend.INDENT).replace(
+                              '\n', '\n' + ' ' * JSONBackend.INDENT * level)
+
+    indent = ' ' * JSONBackend.INDENT
+    file_.write('{')
+    for key, value in sorted(metadata.iteritems()):
+        file_.write('\n{}{}: {},'.format(indent, json.dumps(key),
+                                         encode(value, 1)))
+    file_.write('\n{}"tests": {{'.format(indent))
+    separator = ''
+    for name, result in tests:
+        file_.write('{}\n{}{}: {}'.format(separator, indent * 2,
+                                          json.dumps(name),
+                                          encode(result, 2)))
+        separator = ','
+    file_.write('\n{}}}\n}}\n'.format(indent))
 
 
 def load_results(filename):
@@ -653,27 +1264,30 @@ def load_results(filename):
     "main"
 
     """
-    # This will load any file or file-like thing. That would include pipes and
-    # file descriptors
-    if not os.path.isdir(filename):
-        filepath = filename
-    else:
-        # If there are both old and new results in a directory pick the new
-        # ones first
-        if os.path.exists(os.path.join(filename, 'results.json')):
-            filepath = os.path.join(filename, 'results.json')
-        # Version 0 results are called 'main'
-        elif os.path.exists(os.path.join(filename, 'main')):
-            filepath = os.path.join(filename, 'main')
-        else:
-            raise Exception("No results found")
-
+    filepath = _results_path(filename)
     with open(filepath, 'r') as f:
         testrun = TestrunResult(f)
 
     return update_results(testrun, filepath)
 
 
+def _results_path(filename):
+    """ Return the results file to load for a file or folder """
+    # This will load any file or file-like thing. That would include pipes and
+    # file descriptors
+    if not os.path.isdir(filename):
+        return filename
+
+    # If there are both old and new results in a directory pick the new ones
+    # first
+    for name in ['results.jsonl', 'results.json',
+                 # Version 0 results are called 'main'
+                 'main']:
+        if os.path.exists(os.path.join(filename, name)):
+            return os.path.join(filename, name)
+    raise Exception("No results found")
+
+
 def update_results(results, filepath):
     """ Update results to the lastest version
 
@@ -723,12 +1337,13 @@ def get_backend(backend):
     """ Returns a BackendInstance based on the string passed """
     backends = {
         'json': JSONBackend,
+        'jsonl': JSONLBackend,
         'junit': JUnitBackend,
     }
 
     # Be sure that we're exporting the same list of backends that we actually
     # have available
-    assert backends.keys() == BACKENDS
+    assert set(backends) == set(BACKENDS)
     return backends[backend]
 
 
@@ -0,0 +1,144 @@
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# This permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE AUTHOR(S) BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN
+# AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF
+# OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+""" Helpers for deciding the order tests are run in
+
+These use the durations recorded in earlier results to hand the longest tests
+out first, so that a long test doesn't start at the end of a run while every
+other worker sits idle, and to split a profile into shards of about the same
+run time, to be run on different machines.
+
+"""
+
+import framework.results
+
+__all__ = [
+    'load_durations',
+    'order_by_duration',
+    'shard',
+]
+
+
+def load_durations(paths):
+    """ Load the duration of each test from earlier results
+
+    Returns a dictionary mapping test names to the time they took to run. If
+    a test is in more than one of the results the last one wins.
+
+    Arguments:
+    paths -- a list of results files or directories, anything load_results
+             accepts
+
+    """
+    durations = {}
+    for path in paths:
+        results = framework.results.load_results(path)
+        for name, result in results.tests.iteritems():
+            if result.get('time') is not None:
+                durations[name] = float(result['time'])
+    return durations
+
+
+def _median(values):
+    """ Return the median of a list of numbers, or 0 if it is empty """
+    values = sorted(values)
+    if not values:
+        return 0.0
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2.0
+
+
+def order_by_duration(tests, durations, default=None):
+    """ Sort (name, test) pairs so the longest running tests come first
+
+    Tests that are not in durations (new tests, or tests that were filtered
+    out of the earlier run) are assumed to take the median duration of the
+    known tests, unless a default is given. Ties are broken by name, so the
+    order is the same from run to run.
+
+    Arguments:
+    tests -- an iterable of (name, test) pairs
+    durations -- a dictionary mapping test names to durations in seconds
+
+    Keyword Arguments:
+    default -- the duration to assume for unknown tests
+
+    """
+    if default is None:
+        default = _median(durations.itervalues())
+
+    return sorted(tests, key=lambda x: (-durations.get(x[0], default), x[0]))
+
+
+def _partition(names, count, durations):
+    """ Split a list of names into count lists with about equal durations
+
+    Names are handed out longest first, each to the partition with the least
+    total duration so far, the lowest index winning ties. Without durations
+    every name counts the same, which hands them out round robin.
+
+    """
+    default = _median(durations.itervalues()) or 1.0
+    partitions = [[] for _ in xrange(count)]
+    loads = [0.0] * count
+
+    for name in sorted(names, key=lambda n: (-durations.get(n, default), n)):
+        index = min(xrange(count), key=lambda i: (loads[i], i))
+        partitions[index].append(name)
+        loads[index] += durations.get(name, default)
+    return partitions
+
+
+def shard(tests, index, count, durations=None):
+    """ Return the part of a dictionary of tests belonging to one shard
+
+    The tests are split into count shards, and the tests of shard index
+    (counting from 1) are returned. The split only depends on the names of the
+    tests and the durations, so every machine running a shard of the same
+    test list gets a different part of it, and the shards together cover
+    every test exactly once.
+
+    Tests that run concurrently and those that don't are split separately,
+    since the latter run one at a time and are much more expensive for the
+    same duration. With durations each shard gets about the same amount of
+    both kinds of work, without them about the same number of tests.
+
+    Arguments:
+    tests -- a dictionary mapping test names to tests
+    index -- the shard to return, from 1 to count
+    count -- the number of shards
+
+    Keyword Arguments:
+    durations -- a dictionary mapping test names to durations in seconds
+
+    """
+    assert 1 <= index <= count
+    durations = durations or {}
+
+    selected = {}
+    for concurrent in [True, False]:
+        names = [n for n, t in tests.iteritems()
+                 if bool(t.run_concurrent) is concurrent]
+        for name in _partition(names, count, durations)[index - 1]:
+            selected[name] = tests[name]
+    return selected
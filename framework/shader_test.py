@@ -27,7 +27,9 @@ import os
 import os.path as path
 import re
 
-from .exectest import PiglitTest
+from .exectest import PiglitTest, TEST_BIN_DIR
+from .test_index import INDEX
+from .matcher import may_contain
 
 __all__ = ['add_shader_test', 'add_shader_test_dir']
 
@@ -38,15 +40,36 @@ class ShaderTest(PiglitTest):
     This function parses a shader test to determine if it's a GL, GLES2 or
     GLES3 test, and then returns a PiglitTest setup properly.
 
+    The file is not read until the command is first used, a
+    ShaderTestParserException is raised then if it cannot be parsed. If the
+    file is in the test index it is not read at all.
+
     """
+    __slots__ = ['__filepath']
+
     def __init__(self, arguments):
+        self.__filepath = arguments
+        super(ShaderTest, self).__init__(None, run_concurrent=True)
+
+    def _create_command(self):
+        prog = INDEX.lookup(self.__filepath)
+        if prog is None:
+            prog = self._read_runner()
+        return [os.path.join(TEST_BIN_DIR, str(prog)), self.__filepath,
+                '-auto']
+
+    def _invocation(self):
+        return self.__filepath
+
+    def _read_runner(self):
+        """ Read the test file and return the shader_runner it needs """
         is_gl = re.compile(r'GL (<|<=|=|>=|>) \d\.\d')
         # Iterate over the lines in shader file looking for the config section.
         # By using a generator this can be split into two for loops at minimal
         # cost. The first one looks for the start of the config block or raises
         # an exception. The second looks for the GL version or raises an
         # exception
-        with open(arguments, 'r') as shader_file:
+        with open(self.__filepath, 'r') as shader_file:
             lines = (l for l in shader_file)
 
             # Find the config section
@@ -82,8 +105,7 @@ class ShaderTest(PiglitTest):
             else:
                 raise ShaderTestParserException("No GL version set")
 
-        super(ShaderTest, self).__init__([prog, arguments, '-auto'],
-                                         run_concurrent=True)
+        return prog
 
 
 class ShaderTestParserException(Exception):
@@ -103,8 +125,16 @@ def add_shader_test(group, testname, filepath):
     group[testname] = ShaderTest(filepath)
 
 
-def add_shader_test_dir(group, dirpath, recursive=False):
-    """Add all shader tests in a directory to the given group."""
+def add_shader_test_dir(group, dirpath, recursive=False, prefix=None):
+    """Add all shader tests in a directory to the given group.
+
+    If prefix, the name of group, is given, directories whose tests are all
+    filtered out of the run are not listed, see framework.matcher.
+
+    """
+    if prefix is not None and not may_contain(prefix):
+        return
+
     for filename in os.listdir(dirpath):
         filepath = path.join(dirpath, filename)
         if path.isdir(filepath):
@@ -112,7 +142,12 @@ def add_shader_test_dir(group, dirpath, recursive=False):
                 continue
             if not filename in group:
                 group[filename] = {}
-            add_shader_test_dir(group[filename], filepath, recursive)
+            subprefix = None
+            if prefix is not None:
+                subprefix = ('{0}/{1}'.format(prefix, filename) if prefix
+                             else filename)
+            add_shader_test_dir(group[filename], filepath, recursive,
+                                subprefix)
         else:
             ext = filename.rsplit('.')[-1]
             if ext != 'shader_test':
@@ -0,0 +1,299 @@
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# This permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE AUTHOR(S) BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN
+# AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF
+# OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+""" Run the subtests of a test as tests of their own
+
+Tests using the subtest support of piglit-util print their subtests with
+-list-subtests, one 'option: name' line each, and run only the subtests given
+with -subtest option. The tests a profile names in TestProfile.split_tests
+are split into one part per subtest, the parts run in parallel like any other
+test, and their results are merged back into the result of the test.
+
+The subtests of each test are cached, keyed by the mtime and size of its
+binary, so that a binary is only asked for them again once it was rebuilt.
+
+"""
+
+import os
+import copy
+import tempfile
+import threading
+import subprocess
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+import framework.status as status
+from framework.results import TestResult
+
+__all__ = [
+    'Splitter',
+    'SubtestLister',
+    'merge',
+    'split',
+]
+
+# Bump this when what is cached changes
+_CACHE_VERSION = 1
+
+
+class SubtestLister(object):
+    """ Lists the subtests of tests, with a cache on disk
+
+    Arguments:
+    path -- the file to cache the subtests in, or None to not cache them
+
+    """
+    def __init__(self, path=None):
+        self._path = path
+        self._lock = threading.Lock()
+        self._cache = None
+        self._dirty = False
+
+    def _load(self):
+        self._cache = {}
+        if self._path is None:
+            return
+        try:
+            with open(self._path, 'r') as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError):
+            return
+        if data.get('version') == _CACHE_VERSION:
+            self._cache = data['subtests']
+
+    def list(self, test):
+        """ Return the (option, name) pairs of the subtests of a test
+
+        Returns an empty list for tests that have no subtests, or cannot list
+        them.
+
+        """
+        command = test.command
+        try:
+            stat = os.stat(os.path.join(test.cwd or '', command[0]))
+        except OSError:
+            return []
+        stamp = [stat.st_mtime, stat.st_size]
+        key = json.dumps(command)
+
+        with self._lock:
+            if self._cache is None:
+                self._load()
+            cached = self._cache.get(key)
+        if cached is not None and cached[0] == stamp:
+            return [tuple(s) for s in cached[1]]
+
+        subtests = []
+        try:
+            proc = subprocess.Popen(command + ['-list-subtests'],
+                                    stdout=subprocess.PIPE,
+                                    stderr=subprocess.PIPE,
+                                    cwd=test.cwd)
+            out = proc.communicate()[0]
+        except OSError:
+            return []
+        if proc.returncode == 0:
+            for line in out.splitlines():
+                option, sep, name = line.partition(':')
+                if sep:
+                    subtests.append((option.strip(), name.strip()))
+
+        with self._lock:
+            self._cache[key] = [stamp, subtests]
+            self._dirty = True
+        return subtests
+
+    def save(self):
+        """ Write the cache, if anything was added to it """
+        with self._lock:
+            if self._path is None or not self._dirty:
+                return
+            data = json.dumps({'version': _CACHE_VERSION,
+                               'subtests': self._cache})
+            self._dirty = False
+
+        # Write to a temporary file and rename it, like the profile cache
+        temp = None
+        try:
+            directory = os.path.dirname(self._path)
+            if not os.path.exists(directory):
+                os.makedirs(directory)
+            fd, temp = tempfile.mkstemp(dir=directory)
+            with os.fdopen(fd, 'w') as f:
+                f.write(data)
+            os.rename(temp, self._path)
+        except (IOError, OSError):
+            if temp is not None and os.path.exists(temp):
+                os.unlink(temp)
+
+
+def split(name, test, subtests):
+    """ Split a test into one part per subtest
+
+    Returns a list of (name, test) pairs, the name of each part is the name of
+    the test followed by the option of the subtest.
+
+    Arguments:
+    name -- the name of the test
+    test -- the test to split, its command must have been created
+    subtests -- the (option, name) pairs returned by SubtestLister.list()
+
+    """
+    parts = []
+    for option, _ in subtests:
+        part = copy.copy(test)
+        part.result = None
+        # _command, since command adds the valgrind options of the run
+        part.command = test._command + ['-subtest', option]
+        parts.append(('{0}/{1}'.format(name, option), part))
+    return parts
+
+
+def merge(test, subtests, results):
+    """ Merge the results of the parts of a split test into one result
+
+    The result is the worst result of the parts, ignoring skips unless every
+    part was skipped, as the test itself would have reported it. The output
+    of each part is kept under a header naming its subtest. A part that
+    didn't report its subtest, because it crashed for example, gets its own
+    result for it.
+
+    Arguments:
+    test -- the test that was split
+    subtests -- the (option, name) pairs the test was split by
+    results -- the results of the parts, in the order of subtests
+
+    """
+    merged = TestResult({'result': 'skip'})
+    merged['subtest'] = {}
+    merged['command'] = ' '.join(test.command)
+    merged['returncode'] = 0
+    merged['time'] = 0.0
+    for key in ['out', 'err', 'dmesg']:
+        merged[key] = ''
+
+    worst = None
+    for (option, name), result in zip(subtests, results):
+        current = status.status_lookup(str(result['result']))
+        if current is not status.SKIP and (worst is None or current > worst):
+            worst = current
+
+        reported = result.get('subtest') or {name: str(result['result'])}
+        merged['subtest'].update(reported)
+
+        header = '==> -subtest {0} <==\n'.format(option)
+        for key in ['out', 'err', 'dmesg']:
+            if result.get(key):
+                merged[key] += header + result[key]
+        if result.get('returncode') and not merged['returncode']:
+            merged['returncode'] = result['returncode']
+        merged['time'] = max(merged['time'], result.get('time', 0.0))
+        for key in ['exception', 'traceback']:
+            if key in result and key not in merged:
+                merged[key] = result[key]
+
+    if worst is not None:
+        merged['result'] = worst
+    if not merged['dmesg']:
+        del merged['dmesg']
+    return merged
+
+
+class Splitter(object):
+    """ Splits the tests of a run, and merges the results of their parts
+
+    Arguments:
+    lister -- a SubtestLister instance
+
+    """
+    def __init__(self, lister):
+        self._lister = lister
+        self._lock = threading.Lock()
+        # Maps the name of each part to the name of its test and its index
+        self._parts = {}
+        # Maps the name of each split test to the test, its subtests, the
+        # results of its parts, and the number of parts still running
+        self._split = {}
+        # The number of tests the splitting added
+        self.added = 0
+
+    def split(self, tests, names):
+        """ Return tests, with the tests in names split into their subtests
+
+        Tests with fewer than two subtests are left alone.
+
+        Arguments:
+        tests -- a dictionary mapping test names to tests
+        names -- the names of the tests to split
+
+        """
+        tests = dict(tests)
+        for name in names:
+            test = tests.get(name)
+            if test is None:
+                continue
+            subtests = self._lister.list(test)
+            if len(subtests) < 2:
+                continue
+
+            parts = split(name, test, subtests)
+            del tests[name]
+            self._split[name] = [test, subtests, [None] * len(parts),
+                                 len(parts)]
+            for index, (part_name, part) in enumerate(parts):
+                self._parts[part_name] = (name, index)
+                tests[part_name] = part
+            self.added += len(parts) - 1
+
+        self._lister.save()
+        return tests
+
+    def finished(self, name, test):
+        """ Record a test that has finished
+
+        Returns the (name, test) pair to write the result of: the pair that
+        was passed in for tests that were not split, the split test with the
+        merged result once its last part has finished, and None for the other
+        parts. The results of the parts are kept until they are merged, and
+        released from the parts themselves.
+
+        """
+        try:
+            parent, index = self._parts[name]
+        except KeyError:
+            return name, test
+
+        with self._lock:
+            entry = self._split[parent]
+            entry[2][index] = test.result
+            entry[3] -= 1
+            done = not entry[3]
+            if done:
+                del self._split[parent]
+        test.release()
+        if not done:
+            return None
+
+        parent_test, subtests, results, _ = entry
+        parent_test.result = merge(parent_test, subtests, results)
+        return parent, parent_test
@@ -29,7 +29,6 @@ import collections
 import tempfile
 import datetime
 import re
-from mako.template import Template
 
 # a local variable status exists, prevent accidental overloading by renaming
 # the module
@@ -291,8 +290,12 @@ class Summary:
         """
 
         # Create a Result object for each piglit result and append it to the
-        # results list
-        self.results = [framework.results.load_results(i) for i in resultfiles]
+        # results list. Only what the summary pages need to compare the runs
+        # is kept, the pages of the individual tests are written from the
+        # readers
+        self._readers = [framework.results.TestrunReader(i)
+                         for i in resultfiles]
+        self.results = [self.__load_statuses(r) for r in self._readers]
 
         self.status = {}
         self.fractions = {}
@@ -415,6 +418,26 @@ class Summary:
                     self.tests['fixes'].add(test)
                     self.tests['changes'].add(test)
 
+    @staticmethod
+    def __load_statuses(reader):
+        """ Load the results of a run without the output of the tests
+
+        Returns a TestrunResult holding the metadata of the run, and the result
+        and subtests of each test.
+
+        """
+        results = framework.results.TestrunResult()
+        for name, value in reader.iter_tests():
+            result = results.tests[name] = framework.results.TestResult()
+            result.update((k, value[k]) for k in ['result', 'subtest']
+                          if k in value)
+
+        # Keys after the tests have been read along with them
+        for key in ['name', 'options', 'uname', 'glxinfo', 'lspci',
+                    'time_elapsed']:
+            setattr(results, key, reader.metadata.get(key))
+        return results
+
     def __find_totals(self, results):
         """
         Private: Find the total number of pass, fail, crash, skip, and warn in
@@ -437,6 +460,9 @@ class Summary:
         heavy lifting, this method just passes it a bunch of dicts and lists
         of dicts, which mako turns into pretty HTML.
         """
+        # Only the HTML summary needs mako, the other summaries don't wait
+        # for it to be imported
+        from mako.template import Template
 
         # Copy static files
         shutil.copy(path.join(self.TEMPLATE_DIR, "index.css"),
@@ -458,7 +484,7 @@ class Summary:
         index = path.join(destination, "index.html")
 
         # Iterate across the tests creating the various test specific files
-        for each in self.results:
+        for each, reader in zip(self.results, self._readers):
             name = escape_pathname(each.name)
             os.mkdir(path.join(destination, name))
 
@@ -478,8 +504,10 @@ class Summary:
                                            glxinfo=each.glxinfo,
                                            lspci=each.lspci))
 
-            # Then build the individual test results
-            for key, value in each.tests.iteritems():
+            # Then build the individual test results, the results are read
+            # again one at a time, rather than holding the output of every
+            # test of every run at once
+            for key, value in reader.iter_tests():
                 html_path = path.join(destination, name, escape_filename(key + ".html"))
                 temp_path = path.dirname(html_path)
 
@@ -0,0 +1,191 @@
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# This permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE AUTHOR(S) BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN
+# AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF
+# OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+""" An index of the metadata of shader_test and glslparser test files
+
+Finding out the command of a shader_test or a glslparser test means opening
+and parsing the test file. For the tests that come with piglit this is done
+once at build time: piglit-build-index.py records the shader_runner each
+shader_test needs and the config block of each glslparser test in one index
+file per test tree. ShaderTest and GLSLParserTest look their file up in the
+index first, and only read the file itself when it is not in the index or has
+changed since the index was written.
+
+"""
+
+import os
+import tempfile
+import threading
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+__all__ = [
+    'INDEX',
+    'INDEX_NAME',
+    'TestIndex',
+    'build_index',
+    'read_index',
+    'write_index',
+]
+
+# Bump this when the format of the index changes
+_VERSION = 1
+
+INDEX_NAME = 'test-index.json'
+
+if 'PIGLIT_BUILD_DIR' in os.environ:
+    _BUILD_DIR = os.environ['PIGLIT_BUILD_DIR']
+else:
+    _BUILD_DIR = os.path.join(os.path.dirname(__file__), '..')
+
+
+class TestIndex(object):
+    """ Looks up the metadata of test files in index files
+
+    The index files are read on the first lookup, missing or broken index
+    files are ignored.
+
+    Arguments:
+    paths -- a list of index files
+
+    """
+    def __init__(self, paths):
+        self.paths = paths
+        self._files = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        files = self._files
+        if files is None:
+            with self._lock:
+                if self._files is None:
+                    files = {}
+                    for path in self.paths:
+                        files.update(read_index(path))
+                    self._files = files
+                files = self._files
+        return files
+
+    def lookup(self, filepath):
+        """ Return the metadata of a test file, or None
+
+        None is returned if the file is not in the index, or if its mtime or
+        size differ from when it was indexed.
+
+        """
+        entry = self._load().get(os.path.abspath(filepath))
+        if entry is None:
+            return None
+
+        try:
+            stat = os.stat(filepath)
+        except OSError:
+            return None
+        if [stat.st_mtime, stat.st_size] != entry[:2]:
+            return None
+        return entry[2]
+
+
+# The index of the tests in piglit's own tests and generated_tests
+INDEX = TestIndex([
+    os.path.normpath(os.path.join(_BUILD_DIR, 'tests', INDEX_NAME)),
+    os.path.normpath(os.path.join(_BUILD_DIR, 'generated_tests', INDEX_NAME)),
+])
+
+
+def read_index(path):
+    """ Return the entries of an index file, or {} if it can't be read """
+    try:
+        with open(path, 'r') as f:
+            index = json.load(f)
+    except (IOError, ValueError):
+        return {}
+
+    if index.get('version') != _VERSION:
+        return {}
+    return index['files']
+
+
+def write_index(path, files):
+    """ Write the entries returned by build_index() into an index file
+
+    The index is written to a temporary file that is then renamed, so that a
+    piglit starting while the index is being rebuilt reads either the old or
+    the new index.
+
+    """
+    fd, temp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'version': _VERSION, 'files': files}, f,
+                      separators=(',', ':'))
+        os.chmod(temp, 0644)
+        os.rename(temp, path)
+    except:
+        os.unlink(temp)
+        raise
+
+
+def build_index(root, previous=None):
+    """ Return the index entries of the test files below root
+
+    Every shader_test and glslparser test is read, and the result of reading
+    it is stored along with its mtime and size. Files that cannot be parsed
+    are left out, they raise their error when the test runs.
+
+    Keyword Arguments:
+    previous -- the entries of an earlier index, files that haven't changed
+                since are not read again
+
+    """
+    # These modules use INDEX themselves
+    from framework.shader_test import ShaderTest, ShaderTestParserException
+    from framework.glsl_parser_test import (GLSLParserTest,
+                                            GLSLParserException, EXTENSIONS)
+
+    previous = previous or {}
+    files = {}
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            ext = filename.rsplit('.')[-1]
+            if ext == 'shader_test':
+                read = lambda p: ShaderTest(p)._read_runner()
+            elif ext in EXTENSIONS:
+                read = lambda p: GLSLParserTest(p)._read_config()
+            else:
+                continue
+
+            filepath = os.path.abspath(os.path.join(dirpath, filename))
+            stat = os.stat(filepath)
+            stamp = [stat.st_mtime, stat.st_size]
+
+            entry = previous.get(filepath)
+            if entry is not None and entry[:2] == stamp:
+                files[filepath] = entry
+                continue
+
+            try:
+                files[filepath] = stamp + [read(filepath)]
+            except (ShaderTestParserException, GLSLParserException):
+                pass
+    return files
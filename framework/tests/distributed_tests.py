@@ -0,0 +1,239 @@
+# Copyright (c) 2014 Intel Corporation
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+""" Tests for the distributed module """
+
+import socket
+import threading
+import nose.tools as nt
+import framework.distributed as distributed
+from framework.core import Options
+from framework.exectest import Test
+from framework.log import LogManager
+from framework.dmesg import DummyDmesg
+
+
+class _Test(Test):
+    """ A Test that passes when its command exits with 0 """
+    def interpret_result(self):
+        if self.result['returncode'] == 0:
+            self.result['result'] = 'pass'
+
+
+class _Backend(object):
+    """ A backend that keeps the results in a dictionary """
+    def __init__(self):
+        self.tests = {}
+
+    def write_test(self, name, data):
+        self.tests[name] = data
+
+
+def _coordinator(names):
+    """ Return a Coordinator listening on a free port, and its backend """
+    backend = _Backend()
+    coordinator = distributed.Coordinator(
+        names, {}, backend, LogManager('dummy', len(names)),
+        ('localhost', 0))
+    return coordinator, backend
+
+
+def _worker(coordinator, names, jobs=1):
+    """ Return a Worker with a _Test for each of names """
+    def load(_):
+        tests = dict((n, _Test(['/bin/true'])) for n in names)
+        return tests, Options(), DummyDmesg()
+
+    return distributed.Worker(coordinator.address, load,
+                              LogManager('dummy', 0), jobs=jobs)
+
+
+def _background(target):
+    thread = threading.Thread(target=target)
+    thread.daemon = True
+    thread.start()
+    return thread
+
+
+class _RawWorker(object):
+    """ Speaks the protocol by hand, to misbehave in ways Worker doesn't """
+    def __init__(self, address, jobs=1):
+        self.sock = socket.create_connection(address)
+        self.file = self.sock.makefile('rb')
+        self.send({'type': 'hello', 'jobs': jobs})
+        nt.assert_equal(self.receive()['type'], 'setup')
+
+    def send(self, message):
+        self.sock.sendall(distributed.json.dumps(message) + '\n')
+
+    def receive(self):
+        return distributed.json.loads(self.file.readline())
+
+
+def test_parse_address():
+    """ parse_address() splits host and port """
+    nt.assert_equal(distributed.parse_address('localhost:1234'),
+                    ('localhost', 1234))
+
+
+def test_parse_address_no_host():
+    """ parse_address() allows an empty host """
+    nt.assert_equal(distributed.parse_address(':1234'), ('', 1234))
+
+
+def test_workers_run_all():
+    """ Coordinator collects a result for every test from several workers """
+    names = ['test{}'.format(i) for i in xrange(20)]
+    coordinator, backend = _coordinator(names)
+    workers = [_worker(coordinator, names, jobs=2) for _ in xrange(2)]
+    threads = [_background(w.run) for w in workers]
+
+    coordinator.run()
+    for thread in threads:
+        thread.join(10)
+
+    nt.assert_list_equal(sorted(backend.tests), sorted(names))
+    nt.assert_equal(sum(w.completed for w in workers), len(names))
+    for result in backend.tests.itervalues():
+        nt.assert_equal(result['result'], 'pass')
+
+
+def test_dead_worker():
+    """ Coordinator hands the tests of a worker that died to another one """
+    names = ['test{}'.format(i) for i in xrange(10)]
+    coordinator, backend = _coordinator(names)
+    thread = _background(coordinator.run)
+
+    dead = _RawWorker(coordinator.address)
+    dead.send({'type': 'request'})
+    batch = dead.receive()
+    nt.assert_equal(batch['type'], 'batch')
+    dead.sock.shutdown(socket.SHUT_RDWR)
+    dead.sock.close()
+
+    _worker(coordinator, names).run()
+    thread.join(10)
+
+    nt.assert_list_equal(sorted(backend.tests), sorted(names))
+
+
+def test_silent_worker():
+    """ Coordinator hands the tests of a worker that went silent to another
+    one
+    """
+    names = ['test{}'.format(i) for i in xrange(10)]
+    coordinator, backend = _coordinator(names)
+    coordinator.HEARTBEAT_TIMEOUT = 0.5
+    thread = _background(coordinator.run)
+
+    # Like a machine that lost power, the connection is never closed
+    silent = _RawWorker(coordinator.address)
+    silent.send({'type': 'request'})
+    nt.assert_equal(silent.receive()['type'], 'batch')
+
+    worker = _worker(coordinator, names)
+    worker.HEARTBEAT = 0.1
+    worker.run()
+    thread.join(10)
+
+    nt.assert_list_equal(sorted(backend.tests), sorted(names))
+    nt.assert_equal(worker.completed, len(names))
+
+
+def test_steal():
+    """ Coordinator takes tests from a busy worker for an idle one """
+    names = ['test{}'.format(i) for i in xrange(10)]
+    coordinator, backend = _coordinator(names)
+    coordinator.BATCH_ROUNDS = 1
+    thread = _background(coordinator.run)
+
+    busy = _RawWorker(coordinator.address)
+    busy.send({'type': 'request'})
+    batch = busy.receive()['names']
+    nt.assert_equal(len(batch), len(names))
+
+    idle = _RawWorker(coordinator.address)
+    idle.send({'type': 'request'})
+    nt.assert_equal(busy.receive()['type'], 'steal')
+
+    busy.send({'type': 'returned', 'names': batch[5:]})
+    stolen = idle.receive()['names']
+    nt.assert_true(stolen)
+    nt.assert_true(set(stolen).issubset(batch[5:]))
+
+    for worker, names_ in [(busy, batch[:5]), (idle, batch[5:])]:
+        for name in names_:
+            worker.send({'type': 'result', 'name': name,
+                         'result': {'result': 'pass'}})
+    thread.join(10)
+
+    nt.assert_list_equal(sorted(backend.tests), sorted(names))
+
+
+def test_steal_single_test():
+    """ Coordinator doesn't steal from a worker with one test not started """
+    names = ['test0', 'test1']
+    coordinator, backend = _coordinator(names)
+    coordinator.BATCH_ROUNDS = 1
+    thread = _background(coordinator.run)
+
+    busy = _RawWorker(coordinator.address)
+    busy.send({'type': 'request'})
+    batch = busy.receive()['names']
+    nt.assert_equal(len(batch), 2)
+
+    idle = _RawWorker(coordinator.address)
+    idle.send({'type': 'request'})
+    busy.sock.settimeout(0.5)
+    nt.assert_raises(socket.timeout, busy.receive)
+
+    for name in batch:
+        busy.send({'type': 'result', 'name': name,
+                   'result': {'result': 'pass'}})
+    thread.join(10)
+
+    nt.assert_list_equal(sorted(backend.tests), sorted(names))
+
+
+def test_steal_nothing_returned():
+    """ Coordinator doesn't steal again from a worker that gave up nothing """
+    names = ['test{}'.format(i) for i in xrange(3)]
+    coordinator, backend = _coordinator(names)
+    coordinator.BATCH_ROUNDS = 1
+    thread = _background(coordinator.run)
+
+    busy = _RawWorker(coordinator.address)
+    busy.send({'type': 'request'})
+    batch = busy.receive()['names']
+    nt.assert_equal(len(batch), 3)
+
+    idle = _RawWorker(coordinator.address)
+    idle.send({'type': 'request'})
+    nt.assert_equal(busy.receive()['type'], 'steal')
+    busy.send({'type': 'returned', 'names': []})
+    busy.sock.settimeout(0.5)
+    nt.assert_raises(socket.timeout, busy.receive)
+
+    for name in batch:
+        busy.send({'type': 'result', 'name': name,
+                   'result': {'result': 'pass'}})
+    thread.join(10)
+
+    nt.assert_list_equal(sorted(backend.tests), sorted(names))
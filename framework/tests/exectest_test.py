@@ -20,8 +20,13 @@
 
 """ Tests for the exectest module """
 
+import os
+import time
 import nose.tools as nt
-from framework.exectest import PiglitTest, Test
+import framework.tests.utils as utils
+from framework.core import Options
+from framework.exectest import (PiglitTest, Test, Spawner, OutputCapture,
+                                WATCHDOG)
 
 
 # Helpers
@@ -69,6 +74,28 @@ def test_timeout():
     test.run()
     assert test.result['result'] == 'timeout'
 
+def test_timeout_kill():
+    """ Test that tests ignoring SIGTERM are killed after the grace period """
+
+    def helper():
+        if (test.result['returncode'] == 0):
+            test.result['result'] = "pass"
+
+    test = TestTest(['/bin/sh', '-c', "trap '' TERM; sleep 60"])
+    test.test_interpret_result = helper
+    test.timeout = 1
+
+    grace = WATCHDOG.grace
+    WATCHDOG.grace = 1
+    try:
+        start = time.time()
+        test.run()
+    finally:
+        WATCHDOG.grace = grace
+
+    assert test.result['result'] == 'timeout'
+    assert time.time() - start < 10
+
 def test_timeout_pass():
     """ Test that the correct result is returned if a test does not timeout """
 
@@ -112,3 +139,171 @@ def test_piglitest_no_clobber():
 
     nt.assert_dict_equal(test.result['subtest'],
                          {'test1': 'pass', 'test2': 'pass'})
+
+
+def test_spawner_environment_shared():
+    """ Spawner.environment() shares the base environment between tests """
+    spawner = Spawner()
+    opts = Options()
+
+    nt.assert_is(spawner.environment(opts, {}), spawner.environment(opts, {}))
+
+
+def test_spawner_environment_precedence():
+    """ Spawner.environment(): test env overrides Options.env overrides os """
+    spawner = Spawner()
+    opts = Options()
+    opts.env['PIGLIT_TEST_A'] = 'opts'
+    opts.env['PIGLIT_TEST_B'] = 'opts'
+
+    env = spawner.environment(opts, {'PIGLIT_TEST_B': 'test'})
+
+    nt.assert_equal(env['PATH'], os.environ['PATH'])
+    nt.assert_equal(env['PIGLIT_TEST_A'], 'opts')
+    nt.assert_equal(env['PIGLIT_TEST_B'], 'test')
+
+
+def test_spawner_environment_options_change():
+    """ Spawner.environment() notices changes to Options.env """
+    spawner = Spawner()
+    opts = Options()
+    spawner.environment(opts, {})
+    opts.env['PIGLIT_TEST_A'] = 'new'
+
+    nt.assert_equal(spawner.environment(opts, {})['PIGLIT_TEST_A'], 'new')
+
+
+def test_output_capture_unlimited():
+    """ OutputCapture keeps everything when the limit is 0 """
+    capture = OutputCapture(0)
+    capture.feed('a' * 100)
+    capture.feed('b' * 100)
+    capture.close()
+
+    nt.assert_equal(capture.value, 'a' * 100 + 'b' * 100)
+    nt.assert_equal(capture.truncated, 0)
+
+
+def test_output_capture_truncate():
+    """ OutputCapture keeps the head and the tail of large output """
+    capture = OutputCapture(10)
+    for chunk in ['0123', '4567', 'x' * 100, 'abc', 'defgh']:
+        capture.feed(chunk)
+    capture.close()
+
+    nt.assert_equal(capture.value,
+                    '01234' + OutputCapture.MARKER.format(106) + 'defgh')
+
+
+@utils.nose_generator
+def test_output_capture_tiny_limit():
+    """ Generate tests for OutputCapture with limits of a few bytes """
+    def check(limit, expected):
+        capture = OutputCapture(limit)
+        for chunk in ['abc', 'd', 'efg']:
+            capture.feed(chunk)
+        capture.close()
+        nt.assert_equal(capture.value, expected)
+
+    for limit, head, tail in [(1, 'a', 'g'), (2, 'a', 'g'), (3, 'a', 'g'),
+                              (4, 'ab', 'fg')]:
+        check.description = \
+            'OutputCapture({}) keeps the head and the tail'.format(limit)
+        yield (check, limit, head + OutputCapture.MARKER.format(
+            7 - len(head + tail)) + tail)
+
+
+def test_output_capture_status_lines():
+    """ OutputCapture splits off status lines spread over several chunks """
+    capture = OutputCapture(0, 'PIGLIT:')
+    for chunk in ['out\nPIG', 'LIT: {"result": "pass"}\r', '\nmore\n',
+                  'PIGLIT: {}']:
+        capture.feed(chunk)
+    capture.close()
+
+    nt.assert_equal(capture.value, 'out\nmore\n')
+    nt.assert_list_equal(capture.status_lines,
+                         ['PIGLIT: {"result": "pass"}', 'PIGLIT: {}'])
+
+
+def test_output_capture_status_lines_truncated():
+    """ OutputCapture keeps status lines that are in truncated output """
+    capture = OutputCapture(10, 'PIGLIT:')
+    capture.feed('x' * 100 + '\nPIGLIT: {"result": "pass"}\n' + 'y' * 100)
+    capture.close()
+
+    nt.assert_list_equal(capture.status_lines, ['PIGLIT: {"result": "pass"}'])
+    nt.assert_not_in('PIGLIT', capture.value)
+    nt.assert_equal(capture.truncated, 191)
+
+
+def test_piglittest_status_lines():
+    """ PiglitTest.interpret_result() uses the status lines of the process """
+    class _PiglitTest(PiglitTest):
+        def is_skip(self):
+            return False
+
+    test = _PiglitTest(['/bin/sh', '-c',
+                        'echo out; echo \'PIGLIT: {"result": "pass"}\''])
+    test.run()
+
+    nt.assert_equal(test.result['result'], 'pass')
+    nt.assert_equal(test.result['out'], 'out\n')
+
+
+def test_lazy_env_result():
+    """ Test creates its env and result when they are first used """
+    test = PiglitTest(['/bin/true'])
+    nt.assert_is_none(test._env)
+    nt.assert_is_none(test._result)
+
+    nt.assert_equal(test.result['result'], 'fail')
+    nt.assert_dict_equal(test.env, {})
+    nt.assert_is_not_none(test._env)
+
+
+def test_command_interned():
+    """ Tests share the strings of the commands they have in common """
+    test1 = PiglitTest(['foo', '-auto'])
+    test2 = PiglitTest('foo -auto')
+    for arg1, arg2 in zip(test1._command, test2._command):
+        nt.assert_is(arg1, arg2)
+
+
+def test_piglittest_no_dict():
+    """ PiglitTest has no __dict__, which would cost memory for every test """
+    nt.assert_false(hasattr(PiglitTest(['/bin/true']), '__dict__'))
+
+
+def test_release():
+    """ Test.release() drops the result of a test """
+    test = PiglitTest(['/bin/true'])
+    test.result['out'] = 'output'
+    test.release()
+
+    nt.assert_is_none(test._result)
+    nt.assert_not_in('out', test.result)
+
+
+def test_invocation_key_equal():
+    """ Tests that run the same way have the same invocation_key() """
+    test1 = PiglitTest(['foo', '-auto'])
+    test2 = PiglitTest('foo -auto')
+    nt.assert_equal(test1.invocation_key(), test2.invocation_key())
+
+
+def test_invocation_key_env():
+    """ Tests with different environments have different invocation_key()s """
+    test1 = PiglitTest(['foo', '-auto'])
+    test2 = PiglitTest(['foo', '-auto'])
+    test2.env['FOO'] = 'bar'
+    nt.assert_not_equal(test1.invocation_key(), test2.invocation_key())
+
+
+def test_invocation_key_class():
+    """ Tests of different classes have different invocation_key()s """
+    class _OtherTest(TestTest):
+        pass
+
+    nt.assert_not_equal(TestTest(['foo']).invocation_key(),
+                        _OtherTest(['foo']).invocation_key())
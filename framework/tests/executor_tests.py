@@ -0,0 +1,223 @@
+# Copyright (c) 2014 Intel Corporation
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+""" Tests for the executor module """
+
+import os
+import time
+import threading
+import nose.tools as nt
+from nose.plugins.skip import SkipTest
+import framework.tests.utils as utils
+import framework.executor as executor
+from framework.exectest import Test
+from framework.log import LogManager
+from framework.dmesg import DummyDmesg
+
+
+class _Test(Test):
+    """ A Test that passes when its command exits with 0 """
+    def interpret_result(self):
+        if self.result['returncode'] == 0:
+            self.result['result'] = 'pass'
+
+
+class _TimedTest(_Test):
+    """ A Test that records when it starts and when its process has ended """
+    def __init__(self, *args, **kwargs):
+        super(_TimedTest, self).__init__(*args, **kwargs)
+        self.span = []
+        self._test_hook_execute_run = lambda: self.span.append(time.time())
+
+    def interpret_result(self):
+        self.span.append(time.time())
+        super(_TimedTest, self).interpret_result()
+
+
+class _RunTest(_Test):
+    """ A Test that overrides run(), and thus has no steps """
+    def run(self):
+        self.result['result'] = 'pass'
+
+
+def _run(executor_, tests):
+    """ Run the tests with the executor, returns the finished tests by name """
+    finished = {}
+
+    def callback(name, test):
+        finished[name] = test
+
+    executor_.run(tests.iteritems(), LogManager('dummy', len(tests)),
+                  DummyDmesg(), callback)
+    return finished
+
+
+@utils.nose_generator
+def test_get_executor():
+    """ Generate tests that get_executor() knows every executor """
+    def check(name):
+        executor.get_executor(name)
+
+    for name in executor.EXECUTORS:
+        check.description = "get_executor('{}') returns an executor".format(
+            name)
+        yield check, name
+
+
+@utils.nose_generator
+def test_executors_run_all():
+    """ Generate tests that each executor runs every test """
+    def check(class_):
+        tests = dict(('test{}'.format(i), _Test(['/bin/echo', str(i)]))
+                     for i in xrange(10))
+        finished = _run(class_(4), tests)
+
+        nt.assert_equal(sorted(finished.keys()), sorted(tests.keys()))
+        for name, test in finished.iteritems():
+            nt.assert_equal(test.result['result'], 'pass')
+            nt.assert_equal(test.result['out'], name[len('test'):] + '\n')
+
+    for name in executor.EXECUTORS:
+        check.description = "{} executor runs every test".format(name)
+        yield check, executor.get_executor(name)
+
+
+@utils.nose_generator
+def test_executors_exclusive():
+    """ Generate tests that exclusive tests never overlap other tests """
+    def check(class_):
+        tests = {}
+        spans = {}
+
+        def make(name, run_concurrent):
+            test = _TimedTest(['/bin/sleep', '0.2'],
+                              run_concurrent=run_concurrent)
+            test.span = spans[name] = []
+            tests[name] = test
+
+        for i in xrange(6):
+            make('concurrent{}'.format(i), True)
+        make('exclusive', False)
+
+        class_(3).run(tests.iteritems(), LogManager('dummy', len(tests)),
+                      DummyDmesg(), lambda *_: None,
+                      exclusive=lambda t: not t.run_concurrent)
+
+        start, end = spans.pop('exclusive')
+        nt.assert_equal(len(spans), 6)
+        for name, (other_start, other_end) in spans.iteritems():
+            assert other_end <= start or other_start >= end, \
+                '{} overlapped the exclusive test'.format(name)
+
+    for name in executor.EXECUTORS:
+        check.description = \
+            "{} executor runs exclusive tests on their own".format(name)
+        yield check, executor.get_executor(name)
+
+
+def test_eventloop_stderr():
+    """ EventLoopExecutor captures stdout and stderr separately """
+    tests = {'test': _Test(['/bin/sh', '-c', 'echo out; echo err >&2'])}
+    finished = _run(executor.EventLoopExecutor(), tests)
+
+    nt.assert_equal(finished['test'].result['out'], 'out\n')
+    nt.assert_equal(finished['test'].result['err'], 'err\n')
+
+
+def test_eventloop_timeout():
+    """ EventLoopExecutor times out tests that run too long """
+    test = _Test(['/bin/sleep', '60'])
+    test.timeout = 1
+    finished = _run(executor.EventLoopExecutor(), {'test': test})
+
+    nt.assert_equal(finished['test'].result['result'], 'timeout')
+
+
+def test_eventloop_no_steps():
+    """ EventLoopExecutor runs tests that override Test.run() """
+    finished = _run(executor.EventLoopExecutor(),
+                    {'test': _RunTest(['/bin/true'])})
+
+    nt.assert_equal(finished['test'].result['result'], 'pass')
+
+
+@utils.nose_generator
+def test_executors_rusage():
+    """ Generate tests that each executor records the resources tests used """
+    def check(class_):
+        if not hasattr(os, 'wait4'):
+            raise SkipTest('os.wait4() is not available')
+        finished = _run(class_(1), {'test': _Test(['/bin/true'])})
+
+        nt.assert_set_equal(
+            set(finished['test'].result['rusage']),
+            set(['utime', 'stime', 'maxrss', 'minflt', 'majflt', 'nvcsw',
+                 'nivcsw']))
+
+    for name in executor.EXECUTORS:
+        check.description = \
+            "{} executor records the rusage of tests".format(name)
+        yield check, executor.get_executor(name)
+
+
+def test_testqueue_get_nowait():
+    """ TestQueue.get_nowait() returns None until a test is put """
+    queue = executor.TestQueue()
+    nt.assert_is_none(queue.get_nowait())
+    queue.put('test', 'value')
+    nt.assert_equal(queue.get_nowait(), ('test', 'value'))
+    queue.close()
+    nt.assert_raises(StopIteration, queue.get_nowait)
+
+
+@utils.nose_generator
+def test_executors_more():
+    """ Generate tests that each executor runs the tests of a TestQueue """
+    def check(class_):
+        tests = {'test0': _Test(['/bin/echo', '0'])}
+        more = executor.TestQueue()
+        finished = {}
+
+        def callback(name, test):
+            finished[name] = test
+
+        def produce():
+            for i in xrange(1, 5):
+                # Let the executor run out of tests before each one
+                time.sleep(0.05)
+                more.put('test{}'.format(i), _Test(['/bin/echo', str(i)]))
+            more.close()
+
+        producer = threading.Thread(target=produce)
+        producer.start()
+        class_(2).run(tests.iteritems(), LogManager('dummy', 1),
+                      DummyDmesg(), callback, more=more)
+        producer.join()
+
+        nt.assert_equal(sorted(finished),
+                        ['test{}'.format(i) for i in xrange(5)])
+        for name, test in finished.iteritems():
+            nt.assert_equal(test.result['out'], name[len('test'):] + '\n')
+
+    for name in executor.EXECUTORS:
+        check.description = \
+            "{} executor runs tests as they are put into a TestQueue".format(
+                name)
+        yield check, executor.get_executor(name)
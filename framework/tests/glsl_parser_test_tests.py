@@ -36,7 +36,10 @@ sys.stderr = sys.stdout
 def _check_config(content):
     """ This is the test that actually checks the glsl config section """
     with utils.with_tempfile(content) as tfile:
-        return glsl.GLSLParserTest(tfile), tfile
+        test = glsl.GLSLParserTest(tfile)
+        # The file is only read once the command is needed
+        test.command
+        return test, tfile
 
 
 def test_no_config_start():
@@ -45,21 +48,36 @@ def test_no_config_start():
                '// glsl_version: 1.00\n'
                '// [end config]\n')
     with utils.with_tempfile(content) as tfile:
-        with nt.assert_raises(SystemExit) as exc:
-            glsl.GLSLParserTest(tfile)
+        with nt.assert_raises(glsl.GLSLParserException) as exc:
+            glsl.GLSLParserTest(tfile).command
             nt.assert_equal(
                 exc.exception, 'No [config] section found!',
                 msg="No config section found, no exception raised")
 
 
+def test_file_not_read_on_init():
+    """ GLSLParserTest doesn't read the file until the command is needed """
+    glsl.GLSLParserTest('this/file/does/not/exist.frag')
+
+
+def test_parse_error_from_command():
+    """ GLSLParserTest raises parse errors from command, not __init__ """
+    content = ('// expect_result: pass\n'
+               '// glsl_version: 1.00\n'
+               '// [end config]\n')
+    with utils.with_tempfile(content) as tfile:
+        test = glsl.GLSLParserTest(tfile)
+        nt.assert_raises(glsl.GLSLParserException, lambda: test.command)
+
+
 def test_find_config_start():
     """ GLSLParserTest finds [config] """
     content = ('// [config]\n'
                '// glsl_version: 1.00\n'
                '//\n')
     with utils.with_tempfile(content) as tfile:
-        with nt.assert_raises(SystemExit) as exc:
-            glsl.GLSLParserTest(tfile)
+        with nt.assert_raises(glsl.GLSLParserException) as exc:
+            glsl.GLSLParserTest(tfile).command
             nt.assert_not_equal(
                 exc.exception, 'No [config] section found!',
                 msg="Config section not parsed")
@@ -68,8 +86,8 @@ def test_find_config_start():
 def test_no_config_end():
     """ GLSLParserTest requires [end config] """
     with utils.with_tempfile('// [config]\n') as tfile:
-        with nt.assert_raises(SystemExit) as exc:
-            glsl.GLSLParserTest(tfile)
+        with nt.assert_raises(glsl.GLSLParserException) as exc:
+            glsl.GLSLParserTest(tfile).command
             nt.assert_equal(
                 exc.exception, 'No [end config] section found!',
                 msg="config section not closed, no exception raised")
@@ -81,8 +99,8 @@ def test_no_expect_result():
                '// glsl_version: 1.00\n'
                '//\n')
     with utils.with_tempfile(content) as tfile:
-        with nt.assert_raises(SystemExit) as exc:
-            glsl.GLSLParserTest(tfile)
+        with nt.assert_raises(glsl.GLSLParserException) as exc:
+            glsl.GLSLParserTest(tfile).command
             nt.assert_equal(
                 exc.exception,
                 'Missing required section expect_result from config',
@@ -95,8 +113,8 @@ def test_no_glsl_version():
                '// expect_result: pass\n'
                '// [end config]\n')
     with utils.with_tempfile(content) as tfile:
-        with nt.assert_raises(SystemExit) as exc:
-            glsl.GLSLParserTest(tfile)
+        with nt.assert_raises(glsl.GLSLParserException) as exc:
+            glsl.GLSLParserTest(tfile).command
             nt.assert_equal(
                 exc.exception,
                 'Missing required section glsl_version from config',
@@ -211,7 +229,7 @@ def test_bad_section_name():
                '// new_awesome_key: foo\n'
                '// [end config]\n')
 
-    with nt.assert_raises(SystemExit) as e:
+    with nt.assert_raises(glsl.GLSLParserException) as e:
         _, name = _check_config(content)
 
         nt.eq_(e.exception.message,
@@ -236,9 +254,9 @@ def test_good_section_names():
 
 def check_no_duplicates(content, dup):
     """ Ensure that duplicate entries raise an error """
-    with nt.assert_raises(SystemExit) as e:
+    with nt.assert_raises(glsl.GLSLParserException) as e:
         with utils.with_tempfile(content) as tfile:
-            glsl.GLSLParserTest(tfile)
+            glsl.GLSLParserTest(tfile).command
 
             nt.eq_(
                 e.exception.message,
@@ -265,8 +283,8 @@ def test_duplicate_entries():
 
 def check_bad_character(tfile):
     """ Check for bad characters """
-    with nt.assert_raises(SystemExit) as e:
-        glsl.GLSLParserTest(tfile)
+    with nt.assert_raises(glsl.GLSLParserException) as e:
+        glsl.GLSLParserTest(tfile).command
 
         # Obviously this isn't a perfect check, but it should be close enough
         if not e.exception.message.startswith('Bad character "'):
@@ -306,7 +324,7 @@ def glslparser_exetensions_seperators():
 def check_good_extension(file_, desc):
     """ A good extension should not raise a GLSLParserException """
     try:
-        glsl.GLSLParserTest(file_)
+        glsl.GLSLParserTest(file_).command
     except glsl.GLSLParserException:
         nt.ok_(False,
                'GLSLParserException was raised by "required_extensions: {}"'
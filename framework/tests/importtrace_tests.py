@@ -0,0 +1,84 @@
+# Copyright (c) 2014 Intel Corporation
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+""" Tests for the importtrace module """
+
+import os
+import sys
+from StringIO import StringIO
+import nose.tools as nt
+import framework.tests.utils as utils
+from framework.importtrace import ImportTracer
+
+
+def _write_modules(directory):
+    """ Write a module that imports another one into directory """
+    with open(os.path.join(directory, 'trace_outer.py'), 'w') as f:
+        f.write('import trace_inner\n')
+    with open(os.path.join(directory, 'trace_inner.py'), 'w') as f:
+        f.write('import time\ntime.sleep(0.01)\n')
+
+
+def _traced_import():
+    """ Import trace_outer with an ImportTracer, and return the tracer """
+    tracer = ImportTracer()
+    with utils.tempdir() as directory:
+        _write_modules(directory)
+        sys.path.insert(0, directory)
+        tracer.install()
+        try:
+            import trace_outer
+        finally:
+            tracer.uninstall()
+            sys.path.remove(directory)
+            sys.modules.pop('trace_outer', None)
+            sys.modules.pop('trace_inner', None)
+    return tracer
+
+
+def test_times_nested():
+    """ ImportTracer times nested imports separately """
+    times = _traced_import().times
+
+    inner_self, inner_cumulative = times['trace_inner']
+    outer_self, outer_cumulative = times['trace_outer']
+    nt.assert_greater_equal(inner_self, 0.01)
+    nt.assert_greater_equal(outer_cumulative, inner_cumulative)
+    nt.assert_less(outer_self, inner_self)
+
+
+def test_uninstall():
+    """ ImportTracer.uninstall() restores the builtin __import__ """
+    original = __import__
+    tracer = ImportTracer()
+    tracer.install()
+    tracer.uninstall()
+    nt.assert_is(__import__, original)
+
+
+def test_report():
+    """ ImportTracer.report() lists the modules, slowest first """
+    out = StringIO()
+    _traced_import().report(out)
+    lines = out.getvalue().splitlines()
+
+    nt.assert_true(lines[1].endswith('| trace_outer'))
+    nt.assert_true(lines[2].endswith('| trace_inner'))
+    nt.assert_true(lines[-1].endswith('total of 2 modules'))
@@ -0,0 +1,138 @@
+# Copyright (c) 2014 Intel Corporation
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+""" Tests for the incremental module """
+
+import os
+import copy
+try:
+    import simplejson as json
+except ImportError:
+    import json
+import nose.tools as nt
+import framework.tests.utils as utils
+import framework.incremental as incremental
+from framework.exectest import Test
+
+
+class _Test(Test):
+    """ A Test with a dummy interpret_result """
+    def interpret_result(self):
+        pass
+
+
+def test_fingerprint_stable():
+    """ Fingerprinter.fingerprint() is the same for the same test """
+    fingerprinter = incremental.Fingerprinter()
+
+    nt.assert_equal(fingerprinter.fingerprint(_Test(['a', '-auto'])),
+                    fingerprinter.fingerprint(_Test(['a', '-auto'])))
+
+
+def test_fingerprint_command():
+    """ Fingerprinter.fingerprint() changes with the command """
+    fingerprinter = incremental.Fingerprinter()
+
+    nt.assert_not_equal(fingerprinter.fingerprint(_Test(['a', '-auto'])),
+                        fingerprinter.fingerprint(_Test(['a', '-fbo'])))
+
+
+def test_fingerprint_env():
+    """ Fingerprinter.fingerprint() changes with the environment of the test
+    """
+    fingerprinter = incremental.Fingerprinter()
+    test = _Test(['a'])
+    before = fingerprinter.fingerprint(test)
+    test.env['MESA_GL_VERSION_OVERRIDE'] = '3.3'
+
+    nt.assert_not_equal(before, fingerprinter.fingerprint(test))
+
+
+def test_fingerprint_driver_env():
+    """ Fingerprinter.fingerprint() changes with the driver variables of the
+    environment piglit runs in
+    """
+    test = _Test(['a'])
+    base = incremental.Fingerprinter(environ={'HOME': '/a'}).fingerprint(test)
+    nt.assert_equal(
+        base,
+        incremental.Fingerprinter(environ={'HOME': '/b'}).fingerprint(test))
+    for environ in [{'LIBGL_ALWAYS_SOFTWARE': '1'},
+                    {'MESA_GL_VERSION_OVERRIDE': '4.5'},
+                    {'GALLIUM_DRIVER': 'llvmpipe'},
+                    {'LD_LIBRARY_PATH': '/opt/mesa/lib'}]:
+        nt.assert_not_equal(
+            base, incremental.Fingerprinter(environ=environ).fingerprint(test))
+
+
+def test_fingerprint_driver():
+    """ Fingerprinter.fingerprint() changes with the driver fingerprint """
+    test = _Test(['a'])
+
+    nt.assert_not_equal(incremental.Fingerprinter('1').fingerprint(test),
+                        incremental.Fingerprinter('2').fingerprint(test))
+
+
+def test_fingerprint_file():
+    """ Fingerprinter.fingerprint() changes when a file on the command does
+    """
+    with utils.tempdir() as tdir:
+        name = os.path.join(tdir, 'foo.shader_test')
+        with open(name, 'w') as f:
+            f.write('a')
+        before = incremental.Fingerprinter().fingerprint(_Test(['a', name]))
+
+        with open(name, 'w') as f:
+            f.write('ab')
+        after = incremental.Fingerprinter().fingerprint(_Test(['a', name]))
+
+    nt.assert_not_equal(before, after)
+
+
+def test_load_previous():
+    """ load_previous() skips results without fingerprints and timeouts """
+    data = copy.deepcopy(utils.JSON_DATA)
+    data['tests']['sometest']['fingerprint'] = 'abc'
+    data['tests']['timeout'] = copy.deepcopy(data['tests']['sometest'])
+    data['tests']['timeout']['result'] = 'timeout'
+    data['tests']['old'] = {'result': 'pass'}
+
+    with utils.tempdir() as tdir:
+        with open(os.path.join(tdir, 'results.json'), 'w') as f:
+            json.dump(data, f)
+        previous = incremental.load_previous([tdir])
+
+    nt.assert_list_equal(previous.keys(), ['sometest'])
+
+
+def test_split_reusable():
+    """ split_reusable() reuses only results with a matching fingerprint """
+    fingerprinter = incremental.Fingerprinter()
+    tests = {'same': _Test(['a']), 'changed': _Test(['b']), 'new': _Test(['c'])}
+    previous = {
+        'same': {'result': 'pass',
+                 'fingerprint': fingerprinter.fingerprint(tests['same'])},
+        'changed': {'result': 'pass', 'fingerprint': 'abc'},
+    }
+
+    run, reused = incremental.split_reusable(tests, previous, fingerprinter)
+
+    nt.assert_list_equal(sorted(run.keys()), ['changed', 'new'])
+    nt.assert_list_equal(reused, [('same', previous['same'])])
@@ -111,6 +111,8 @@ def test_print_when_expected():
     quiet = log.QuietLog(TEST_STATE)
     printing.append(('QuietLog.log', quiet.log, ['pass']))
     printing.append(('QuietLog.summary', quiet.summary, []))
+    printing.append(('QuietLog.note', log.QuietLog.note,
+                     [TEST_STATE, 'a note']))
 
     # Test VerboseLog
     verbose = log.VerboseLog(TEST_STATE)
@@ -160,6 +162,8 @@ def test_noprint_when_expected():
     printing.append(('DummyLog.start', dummy.start, ['name']))
     printing.append(('DummyLog.log', dummy.log, ['pass']))
     printing.append(('DummyLog.summary', dummy.summary, []))
+    printing.append(('DummyLog.note', log.DummyLog.note,
+                     [TEST_STATE, 'a note']))
 
     for name, func, args in printing:
         check_no_output.description = "{} produces no output".format(name)
@@ -0,0 +1,166 @@
+# Copyright (c) 2014 Intel Corporation
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+""" Tests for the matcher module """
+
+import os
+import nose.tools as nt
+import framework.matcher as matcher
+import framework.shader_test as shader_test
+import framework.glsl_parser_test as glsl
+import framework.tests.utils as utils
+
+
+def test_matches_no_filters():
+    """ TestMatcher.matches() matches everything without filters """
+    nt.ok_(matcher.TestMatcher().matches('spec/foo/bar'))
+
+
+def check_matches(include, exclude, name, expected):
+    nt.eq_(matcher.TestMatcher(include, exclude).matches(name), expected)
+
+
+@utils.nose_generator
+def test_matches():
+    """ Generate tests for TestMatcher.matches() """
+    cases = [
+        (['foo'], [], 'spec/foo/bar', True),
+        (['foo', 'baz'], [], 'spec/baz', True),
+        (['foo'], [], 'spec/bar', False),
+        ([], ['foo'], 'spec/foo/bar', False),
+        (['spec'], ['foo', 'bar'], 'spec/bar', False),
+        (['(a)\\1'], [], 'spec/aa', True),
+        (['(?i)FOO', 'bar'], [], 'spec/foo', True),
+        (['(?i)FOO', 'bar'], [], 'spec/BAR', False),
+    ]
+    for include, exclude, name, expected in cases:
+        check_matches.description = \
+            'TestMatcher({0}, {1}).matches({2!r}) is {3}'.format(
+                include, exclude, name, expected)
+        yield check_matches, include, exclude, name, expected
+
+
+def check_may_contain(include, exclude, group, expected):
+    nt.eq_(matcher.TestMatcher(include, exclude).may_contain(group), expected)
+
+
+@utils.nose_generator
+def test_may_contain():
+    """ Generate tests for TestMatcher.may_contain() """
+    cases = [
+        # Unanchored includes can match in any group
+        (['glsl-1.10'], [], 'spec/ARB_foo', True),
+        (['^spec/glsl-1.10/'], [], 'spec', True),
+        (['^spec/glsl-1.10/'], [], 'spec/glsl-1.10', True),
+        (['^spec/glsl-1.10/'], [], 'spec/glsl-1.10/execution', True),
+        (['^spec/glsl-1\\.10/'], [], 'spec/glsl-1.20', False),
+        (['^spec/glsl-1.10', 'foo'], [], 'spec/glsl-1.20', True),
+        (['(?i)^spec/glsl-1.10'], [], 'spec/glsl-1.20', True),
+        ([], ['glsl-1.10'], 'spec/glsl-1.10', False),
+        ([], ['glsl-1.10'], 'spec/glsl-1.10/execution', False),
+        ([], ['glsl-1.10'], 'spec/glsl-1.20', True),
+        # These depend on what follows the group name
+        ([], ['glsl-1.10$'], 'spec/glsl-1.10', True),
+        ([], ['glsl-1.10\\b'], 'spec/glsl-1.10', True),
+        ([], ['glsl-1.10/(?!execution)'], 'spec/glsl-1.10', True),
+    ]
+    for include, exclude, group, expected in cases:
+        check_may_contain.description = \
+            'TestMatcher({0}, {1}).may_contain({2!r}) is {3}'.format(
+                include, exclude, group, expected)
+        yield check_may_contain, include, exclude, group, expected
+
+
+def test_prunes():
+    """ TestMatcher.prunes is only True when groups can be ruled out """
+    nt.ok_(not matcher.TestMatcher(['foo'], ['bar$']).prunes)
+    nt.ok_(matcher.TestMatcher(['^foo']).prunes)
+    nt.ok_(matcher.TestMatcher([], ['bar']).prunes)
+
+
+def _discover(include, exclude, function):
+    """ Run function with a discovery matcher set """
+    matcher.set_discovery_matcher(matcher.TestMatcher(include, exclude))
+    try:
+        return function()
+    finally:
+        matcher.set_discovery_matcher(None)
+
+
+def test_add_shader_test_dir_prunes():
+    """ add_shader_test_dir() skips tests of groups that are filtered out """
+    with utils.tempdir() as tdir:
+        for sub in ['a', 'b']:
+            os.mkdir(os.path.join(tdir, sub))
+            with open(os.path.join(tdir, sub, 'x.shader_test'), 'w') as f:
+                f.write('[require]\n')
+
+        group = {}
+        _discover(['^tests/a/'], [],
+                  lambda: shader_test.add_shader_test_dir(
+                      group, tdir, recursive=True, prefix='tests'))
+
+    nt.assert_list_equal(sorted(group['a']), ['x'])
+    nt.assert_dict_equal(group['b'], {})
+
+
+def test_add_shader_test_dir_pruned_not_listed():
+    """ add_shader_test_dir() doesn't list directories that are filtered out
+    """
+    # Listing the directory would raise, it doesn't exist
+    group = {}
+    _discover(['^tests/a/'], [],
+              lambda: shader_test.add_shader_test_dir(
+                  group, '/does/not/exist', recursive=True,
+                  prefix='tests/b'))
+    nt.assert_dict_equal(group, {})
+
+
+def test_import_glsl_parser_tests_prunes():
+    """ import_glsl_parser_tests() skips directories that are filtered out """
+    with utils.tempdir() as tdir:
+        for sub in ['a', 'b']:
+            os.mkdir(os.path.join(tdir, sub))
+            with open(os.path.join(tdir, sub, 'x.frag'), 'w') as f:
+                f.write('')
+
+        group = {}
+        _discover([], ['tests/b'],
+                  lambda: glsl.import_glsl_parser_tests(
+                      group, tdir, [''], prefix='tests'))
+
+    nt.assert_list_equal(sorted(group), ['a/x.frag'])
+
+
+def test_import_glsl_parser_tests_empty_prefix():
+    """ import_glsl_parser_tests() with an empty prefix keeps anchored tests
+    """
+    with utils.tempdir() as tdir:
+        os.makedirs(os.path.join(tdir, 'spec', 'glsl-1.10', 'compiler'))
+        with open(os.path.join(tdir, 'spec', 'glsl-1.10', 'compiler',
+                               'a.vert'), 'w') as f:
+            f.write('')
+
+        group = {}
+        _discover(['^spec/glsl-1.10'], [],
+                  lambda: glsl.import_glsl_parser_tests(
+                      group, tdir, ['spec'], prefix=''))
+
+    nt.assert_list_equal(sorted(group), ['spec/glsl-1.10/compiler/a.vert'])
@@ -20,13 +20,18 @@
 
 """ Provides test for the framework.profile modules """
 
+import os
 import copy
 import platform
 import nose.tools as nt
 from nose.plugins.skip import SkipTest
 import framework.core as core
 import framework.dmesg as dmesg
+import framework.exectest as exectest
+import framework.log as log
+import framework.matcher as matcher
 import framework.profile as profile
+import framework.tests.utils as utils
 
 
 def test_initialize_testprofile():
@@ -139,6 +144,21 @@ def test_testprofile_update_test_list():
     nt.assert_dict_equal(profile1.test_list, baseline)
 
 
+def test_testprofile_update_test_sources():
+    """ TestProfile.update() adds the test sources of the other profiles """
+    source1 = lambda: []
+    source2 = lambda: []
+
+    profile1 = profile.TestProfile()
+    profile1.add_test_source(source1)
+    profile2 = profile.TestProfile()
+    profile2.add_test_source(source2)
+
+    profile1.update(profile2)
+
+    nt.assert_list_equal(profile1.test_sources, [source1, source2])
+
+
 def generate_prepare_test_list_flatten():
     """ Generate tests for TestProfile.prepare_test_list() """
     tests = {'group1': {'test1': 'thingy', 'group3': {'test2': 'thing'}},
@@ -263,3 +283,249 @@ def test_matches_exclude_mar(data):
     del baseline['group3/test5']
 
     nt.assert_dict_equal(profile_.test_list, baseline)
+
+
+def test_prepare_test_list_shard_exclude():
+    """ TestProfile.prepare_test_list: shards before dropping exclude_tests
+
+    Resuming a shard must not move tests between shards.
+
+    """
+    class _Test(object):
+        run_concurrent = True
+
+    data = dict(('test{}'.format(i), _Test()) for i in xrange(10))
+    env = core.Options(shard=[1, 2])
+
+    profile_ = profile.TestProfile()
+    profile_.test_list = dict(data)
+    profile_._prepare_test_list(env)
+    first = sorted(profile_.test_list)
+
+    env.exclude_tests.add(first[0])
+    profile_ = profile.TestProfile()
+    profile_.test_list = dict(data)
+    profile_._prepare_test_list(env)
+
+    nt.assert_list_equal(sorted(profile_.test_list), first[1:])
+
+
+def test_load_test_profile_cached():
+    """ load_test_profile loads a profile from the cache the second time """
+    import tests.sanity
+
+    with utils.tempdir() as tdir:
+        with utils.profile_cache(tdir):
+            first = profile.load_test_profile('sanity')
+            nt.ok_(os.listdir(tdir), msg='No cache file was written')
+
+            second = profile.load_test_profile('sanity')
+
+    nt.ok_(second is not tests.sanity.profile,
+           msg='The profile was not loaded from the cache')
+    nt.assert_equal(second.tests, {})
+    nt.assert_equal(sorted(second.test_list), sorted(first.tests))
+    nt.assert_equal(second.test_list['glean/basic'].command,
+                    first.tests['glean/basic'].command)
+
+
+def test_load_test_profile_not_flattened():
+    """ load_test_profile leaves the profile of the module unflattened
+
+    Profiles like quick import the profile of all, and change its groups.
+
+    """
+    import tests.sanity
+
+    with utils.tempdir() as tdir:
+        with utils.profile_cache(tdir):
+            profile.load_test_profile('sanity')
+
+    nt.assert_not_equal(tests.sanity.profile.tests, {})
+
+
+def test_cache_key_ignores_pyc():
+    """ The cache key doesn't change when importing writes .pyc files """
+    piglit_dir = profile._PIGLIT_DIR
+    with utils.tempdir() as tdir:
+        for sub in ['framework', 'tests', os.path.join('tests', 'spec')]:
+            os.mkdir(os.path.join(tdir, sub))
+        with open(os.path.join(tdir, 'tests', 'all.py'), 'w') as f:
+            f.write('')
+
+        profile._PIGLIT_DIR = tdir
+        try:
+            key = profile._cache_key('all')
+            for pyc in ['all.pyc', os.path.join('spec', 'x.pyc')]:
+                with open(os.path.join(tdir, 'tests', pyc), 'w') as f:
+                    f.write('')
+            nt.assert_equal(profile._cache_key('all'), key)
+
+            with open(os.path.join(tdir, 'tests', 'spec', 'a.shader_test'),
+                      'w') as f:
+                f.write('')
+            nt.assert_not_equal(profile._cache_key('all'), key)
+        finally:
+            profile._PIGLIT_DIR = piglit_dir
+
+
+def test_cached_profile_wrong_key():
+    """ A cached profile with a different key is not used """
+    with utils.tempdir() as tdir:
+        path = os.path.join(tdir, 'cache')
+        profile._write_cached_profile(path, 'key', profile.TestProfile())
+        nt.ok_(profile._read_cached_profile(path, 'key') is not None)
+        nt.ok_(profile._read_cached_profile(path, 'other key') is None)
+
+
+def test_cached_profile_corrupt():
+    """ A corrupt profile cache is ignored """
+    with utils.with_tempfile('not a pickle') as path:
+        nt.ok_(profile._read_cached_profile(path, 'key') is None)
+
+
+def test_cached_profile_unpicklable():
+    """ A profile that cannot be pickled is not cached """
+    profile_ = profile.TestProfile()
+    profile_.filter_tests(lambda p, t: True)
+
+    with utils.tempdir() as tdir:
+        profile._write_cached_profile(os.path.join(tdir, 'cache'), 'key',
+                                      profile_)
+        nt.assert_list_equal(os.listdir(tdir), [])
+
+
+def test_profile_cache_disabled():
+    """ An empty profile_cache disables the profile cache """
+    with utils.profile_cache(''):
+        nt.ok_(profile._cache_path('sanity') is None)
+
+
+def test_load_test_profile_pruned_not_cached():
+    """ A profile loaded with a pruning matcher is not cached """
+    with utils.tempdir() as tdir:
+        with utils.profile_cache(tdir):
+            profile.load_test_profile(
+                'sanity', matcher.TestMatcher(exclude=['glean/basic']))
+            nt.assert_list_equal(os.listdir(tdir), [])
+
+
+def _sourced_profile():
+    """ Return a profile with one test in test_list and two from a source """
+    def source():
+        yield 'source/test1', exectest.PiglitTest(['/bin/true'])
+        yield 'source/test2', exectest.PiglitTest(['/bin/true'])
+
+    profile_ = profile.TestProfile()
+    profile_.test_list['group/test'] = exectest.PiglitTest(['/bin/true'])
+    profile_.add_test_source(source)
+    return profile_
+
+
+def test_prepare_test_list_test_sources():
+    """ TestProfile.prepare_test_list: filters the tests of test sources """
+    env = core.Options(exclude_filter=['test2'])
+    profile_ = _sourced_profile()
+    profile_._prepare_test_list(env)
+
+    nt.assert_list_equal(sorted(profile_.test_list),
+                         ['group/test', 'source/test1'])
+    nt.assert_list_equal(profile_.test_sources, [])
+
+
+def test_prepare_test_list_stream():
+    """ TestProfile.prepare_test_list: leaves test sources for streaming """
+    profile_ = _sourced_profile()
+    profile_._prepare_test_list(core.Options(), stream=True)
+
+    nt.assert_list_equal(sorted(profile_.test_list), ['group/test'])
+    nt.assert_equal(len(profile_.test_sources), 1)
+
+
+def test_run_test_sources():
+    """ TestProfile.run() runs the filtered tests of test sources """
+    class _Backend(object):
+        def __init__(self):
+            self.tests = {}
+
+        def write_test(self, name, data):
+            self.tests[name] = data
+
+    backend = _Backend()
+    env = core.Options(exclude_filter=['test2'], execute=False)
+    _sourced_profile().run(env, 'dummy', backend)
+
+    nt.assert_list_equal(sorted(backend.tests),
+                         ['group/test', 'source/test1'])
+
+
+def test_run_releases_results():
+    """ TestProfile.run() drops the results the backend has written """
+    class _Backend(object):
+        def write_test(self, name, data):
+            pass
+
+    profile_ = profile.TestProfile()
+    profile_.test_list['test'] = exectest.PiglitTest(['/bin/true'])
+    profile_.run(core.Options(execute=False), 'dummy', _Backend())
+
+    nt.assert_is_none(profile_.test_list['test']._result)
+
+
+def test_group_duplicates():
+    """ _group_duplicates() runs one of the tests that run the same way """
+    tests = {
+        'b/test': exectest.PiglitTest(['foo', '-auto']),
+        'a/test': exectest.PiglitTest(['foo', '-auto']),
+        'c/test': exectest.PiglitTest(['bar', '-auto']),
+    }
+    run, duplicates = profile._group_duplicates(tests)
+
+    nt.assert_list_equal(sorted(run), ['a/test', 'c/test'])
+    nt.assert_dict_equal(duplicates, {'a/test': ['b/test']})
+
+
+def test_run_duplicates():
+    """ TestProfile.run() writes the result of a test for its duplicates """
+    class _Backend(object):
+        def __init__(self):
+            self.tests = {}
+
+        def write_test(self, name, data):
+            self.tests[name] = data
+
+    profile_ = profile.TestProfile()
+    profile_.test_list['a/test'] = exectest.PiglitTest(['/bin/true'])
+    profile_.test_list['b/test'] = exectest.PiglitTest(['/bin/true'])
+    backend = _Backend()
+    profile_.run(core.Options(execute=False), 'dummy', backend)
+
+    nt.assert_list_equal(sorted(backend.tests), ['a/test', 'b/test'])
+
+
+def test_run_duplicates_logged():
+    """ TestProfile.run() reports the number of duplicates in the log """
+    class _Log(log.DummyLog):
+        notes = []
+
+        @classmethod
+        def note(cls, state, message):
+            cls.notes.append(message)
+
+    class _Backend(object):
+        def write_test(self, name, data):
+            pass
+
+    profile_ = profile.TestProfile()
+    for name in ['a/test', 'b/test', 'c/test']:
+        profile_.test_list[name] = exectest.PiglitTest(['/bin/true'])
+
+    log.LogManager.LOG_MAP['notes'] = _Log
+    try:
+        profile_.run(core.Options(execute=False), 'notes', _Backend())
+    finally:
+        del log.LogManager.LOG_MAP['notes']
+
+    nt.assert_list_equal(
+        _Log.notes,
+        ['2 tests run the same way as another test, and share its result'])
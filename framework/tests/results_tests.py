@@ -81,6 +81,333 @@ def test_initialize_jsonbackend():
         assert isinstance(func, results.JSONBackend)
 
 
+def test_initialize_jsonlbackend():
+    """ Test that JSONLBackend initializes """
+    with utils.tempdir() as tdir:
+        func = results.JSONLBackend(tdir, BACKEND_INITIAL_META)
+        assert isinstance(func, results.JSONLBackend)
+
+
+def _write_jsonl(tdir):
+    """ Write the results of a run with a single test using JSONLBackend """
+    backend = results.JSONLBackend(tdir, BACKEND_INITIAL_META)
+    backend.write_test('a/test', results.TestResult({'result': 'pass',
+                                                     'time': 1.5}))
+    return backend
+
+
+def test_jsonlbackend_one_record_per_line():
+    """ JSONLBackend writes a header, one record per test and a footer """
+    with utils.tempdir() as tdir:
+        _write_jsonl(tdir).finalize({'time_elapsed': 2.0})
+        with open(os.path.join(tdir, 'results.jsonl'), 'r') as f:
+            records = [json.loads(l) for l in f]
+
+    nt.assert_list_equal([r['type'] for r in records],
+                         ['header', 'test', 'footer'])
+    nt.assert_equal(records[1]['data']['result'], 'pass')
+
+
+def test_load_results_jsonl():
+    """ load_results() loads the results of the jsonl backend """
+    with utils.tempdir() as tdir:
+        _write_jsonl(tdir).finalize({'time_elapsed': 2.0})
+        result = results.load_results(tdir)
+
+    nt.assert_equal(result.name, 'name')
+    nt.assert_equal(result.time_elapsed, 2.0)
+    nt.assert_equal(result.options['test_count'], 0)
+    nt.assert_equal(result.tests['a/test']['result'], status.PASS)
+
+
+def test_load_results_jsonl_torn():
+    """ load_results() drops a partially written last jsonl record """
+    with utils.tempdir() as tdir:
+        backend = _write_jsonl(tdir)
+        backend._file.write('{"type":"test","name":"b/te')
+        backend._file.flush()
+        result = results.load_results(tdir)
+
+    nt.assert_list_equal(result.tests.keys(), ['a/test'])
+    nt.assert_is_none(result.time_elapsed)
+
+
+@nt.raises(Exception)
+def test_load_results_jsonl_corrupt():
+    """ load_results() raises if a jsonl record other than the last is broken
+    """
+    with utils.tempdir() as tdir:
+        backend = _write_jsonl(tdir)
+        backend._file.write('{"type":"test","name":"b/te\n')
+        backend.finalize()
+        results.load_results(tdir)
+
+
+class _CountingBackend(results.JSONLBackend):
+    """ A JSONLBackend that counts how many times the file was synced """
+    def __init__(self, *args, **kwargs):
+        self.syncs = 0
+        super(_CountingBackend, self).__init__(*args, **kwargs)
+
+    def _sync_file(self):
+        self.syncs += 1
+        super(_CountingBackend, self)._sync_file()
+
+
+def test_fsync_batches_records():
+    """ FSyncMixin syncs a full batch of records at once """
+    with utils.tempdir() as tdir:
+        backend = _CountingBackend(tdir, BACKEND_INITIAL_META,
+                                   file_fsync=True, file_sync_interval=60,
+                                   file_sync_records=4)
+        for i in xrange(3):
+            backend.write_test(str(i), results.TestResult({'result': 'pass'}))
+        backend._flusher.join(0.2)
+        # With the header that is a full batch of 4 records
+        nt.assert_equal(backend.syncs, 1)
+        backend.finalize()
+
+    nt.assert_equal(backend.syncs, 2)
+    nt.assert_false(backend._flusher.is_alive())
+
+
+def test_fsync_interval():
+    """ FSyncMixin syncs a partial batch once the interval has passed """
+    with utils.tempdir() as tdir:
+        backend = _CountingBackend(tdir, BACKEND_INITIAL_META,
+                                   file_fsync=True, file_sync_interval=0.01,
+                                   file_sync_records=100)
+        backend._flusher.join(0.5)
+        nt.assert_equal(backend.syncs, 1)
+        backend.finalize()
+
+
+def test_fsync_disabled():
+    """ FSyncMixin doesn't sync or start a thread without file_fsync """
+    with utils.tempdir() as tdir:
+        backend = _CountingBackend(tdir, BACKEND_INITIAL_META)
+        backend.write_test('a', results.TestResult({'result': 'pass'}))
+        backend.finalize()
+
+    nt.assert_is_none(backend._flusher)
+    nt.assert_equal(backend.syncs, 0)
+
+
+class _ListBackend(results.Backend):
+    """ A backend that keeps the tests written in a list """
+    def __init__(self):
+        self.tests = []
+        self.metadata = None
+
+    def write_test(self, name, data):
+        if name == 'broken':
+            raise ValueError(name)
+        self.tests.append((name, data))
+
+    def finalize(self, metadata=None):
+        self.metadata = metadata
+
+
+def test_writerthread_writes_in_order():
+    """ WriterThread writes every test in order before finalizing """
+    backend = _ListBackend()
+    writer = results.WriterThread(backend, queue_size=2)
+    for i in xrange(10):
+        writer.write_test(str(i), {'result': 'pass'})
+    writer.finalize({'time_elapsed': 1})
+
+    nt.assert_list_equal([n for n, _ in backend.tests],
+                         [str(i) for i in xrange(10)])
+    nt.assert_dict_equal(backend.metadata, {'time_elapsed': 1})
+    nt.assert_false(writer._thread.is_alive())
+
+
+def test_writerthread_after_finalize():
+    """ WriterThread drops tests written after finalize() """
+    backend = _ListBackend()
+    writer = results.WriterThread(backend, queue_size=1)
+    writer.finalize()
+    for i in xrange(3):
+        writer.write_test(str(i), {'result': 'pass'})
+
+    nt.assert_list_equal(backend.tests, [])
+
+
+@nt.raises(ValueError)
+def test_writerthread_raises_error():
+    """ WriterThread.finalize() raises the error of a failed write """
+    backend = _ListBackend()
+    writer = results.WriterThread(backend)
+    writer.write_test('broken', {'result': 'pass'})
+    writer.write_test('a', {'result': 'pass'})
+    try:
+        writer.finalize()
+    finally:
+        # The backend is not finalized after an error
+        nt.assert_is_none(backend.metadata)
+
+
+def _write_json(tdir, count=3):
+    """ Write the results of a run with count tests using JSONBackend """
+    backend = results.JSONBackend(tdir, BACKEND_INITIAL_META)
+    for i in xrange(count):
+        backend.write_test('group/test{}'.format(i),
+                           results.TestResult({'result': 'pass',
+                                               'out': 'x' * 100 * i}))
+    return backend
+
+
+def test_testrunreader_matches_load_results():
+    """ TestrunReader reads the same tests and metadata as load_results() """
+    chunk = results._JSONStream.CHUNK
+    # A small chunk makes values span many reads
+    results._JSONStream.CHUNK = 7
+    try:
+        with utils.tempdir() as tdir:
+            _write_json(tdir).finalize({'time_elapsed': 12})
+            expected = results.load_results(tdir)
+            reader = results.TestrunReader(tdir)
+            tests = dict(reader.iter_tests())
+    finally:
+        results._JSONStream.CHUNK = chunk
+
+    nt.assert_dict_equal(tests, expected.tests)
+    nt.assert_equal(reader.metadata['time_elapsed'], 12)
+    nt.assert_dict_equal(reader.metadata['options'], expected.options)
+
+
+def test_testrunreader_compact():
+    """ TestrunReader reads a results.json written without indentation """
+    with utils.resultfile() as tfile:
+        reader = results.TestrunReader(tfile.name)
+        nt.assert_list_equal([n for n, _ in reader.iter_tests()],
+                             ['sometest'])
+        nt.assert_equal(reader.metadata['name'], 'fake-tests')
+
+
+def test_testrunreader_metadata_first():
+    """ TestrunReader.metadata reads past the tests when used first """
+    with utils.tempdir() as tdir:
+        _write_json(tdir).finalize({'time_elapsed': 12})
+        reader = results.TestrunReader(tdir)
+        nt.assert_equal(reader.metadata['time_elapsed'], 12)
+        nt.assert_equal(len(list(reader.iter_tests())), 3)
+
+
+def test_testrunreader_truncated():
+    """ TestrunReader drops the test being written when a run was stopped """
+    with utils.tempdir() as tdir:
+        backend = _write_json(tdir)
+        backend._file.write(',\n        "group/partial": {\n  "resu')
+        backend._file.flush()
+        reader = results.TestrunReader(tdir)
+        names = [n for n, _ in reader.iter_tests()]
+
+    nt.assert_list_equal(names, ['group/test0', 'group/test1', 'group/test2'])
+    nt.assert_not_in('time_elapsed', reader.metadata)
+
+
+@nt.raises(ValueError)
+def test_testrunreader_corrupt():
+    """ TestrunReader raises for a broken value in the middle of results """
+    with utils.tempdir() as tdir:
+        _write_json(tdir).finalize({'time_elapsed': 12})
+        with open(os.path.join(tdir, 'results.json'), 'r') as f:
+            data = f.read()
+        with open(os.path.join(tdir, 'results.json'), 'w') as f:
+            f.write(data.replace('"result": "pass"', '"result": pass', 2)
+                    .replace('"result": pass', '"result": "pass"', 1))
+        list(results.TestrunReader(tdir).iter_tests())
+
+
+@nt.raises(ValueError)
+def test_testrunreader_value_too_long():
+    """ TestrunReader doesn't read a whole file for an unterminated value """
+    max_value = results._JSONStream.MAX_VALUE
+    results._JSONStream.MAX_VALUE = 10
+    try:
+        with utils.tempdir() as tdir:
+            _write_json(tdir).finalize({'time_elapsed': 12})
+            list(results.TestrunReader(tdir).iter_tests())
+    finally:
+        results._JSONStream.MAX_VALUE = max_value
+
+
+def test_testrunreader_jsonl():
+    """ TestrunReader reads the results of the jsonl backend """
+    with utils.tempdir() as tdir:
+        _write_jsonl(tdir).finalize({'time_elapsed': 2.0})
+        reader = results.TestrunReader(tdir)
+        tests = list(reader.iter_tests())
+
+    nt.assert_equal(tests[0][0], 'a/test')
+    nt.assert_equal(tests[0][1]['result'], status.PASS)
+    nt.assert_equal(reader.metadata['time_elapsed'], 2.0)
+
+
+def test_testrunreader_updates_old():
+    """ TestrunReader updates results written by older versions """
+    data = utils.JSON_DATA.copy()
+    data['results_version'] = 0
+    with utils.tempdir() as tdir:
+        with open(os.path.join(tdir, 'main'), 'w') as f:
+            json.dump(data, f)
+        reader = results.TestrunReader(tdir)
+        nt.assert_list_equal([n for n, _ in reader.iter_tests()],
+                             ['sometest'])
+
+    nt.assert_equal(reader.metadata['results_version'],
+                    results.CURRENT_JSON_VERSION)
+
+
+def test_load_results_repairs_truncated():
+    """ load_results() drops the test being written when a run was stopped """
+    with utils.tempdir() as tdir:
+        backend = _write_json(tdir)
+        backend._file.write(',\n        "group/partial": {\n  "resu')
+        backend._file.flush()
+        result = results.load_results(tdir)
+
+    nt.assert_list_equal(sorted(result.tests),
+                         ['group/test0', 'group/test1', 'group/test2'])
+
+
+def test_rfind():
+    """ _rfind() finds the last occurence, also across blocks """
+    with utils.with_tempfile('ab..ab....ab.....') as name:
+        with open(name, 'r') as f:
+            for block in [1, 2, 3, 100]:
+                nt.assert_equal(results._rfind(f, 'ab', block), 10)
+                nt.assert_equal(results._rfind(f, '.a', block), 9)
+                nt.assert_is_none(results._rfind(f, 'ba', block))
+
+
+def test_repairedfile_read():
+    """ _RepairedFile reads the start of a file, then the suffix """
+    with utils.with_tempfile('0123456789') as name:
+        with open(name, 'r') as f:
+            repaired = results._RepairedFile(f, 4, 'abc')
+            nt.assert_list_equal([repaired.read(3) for _ in xrange(4)],
+                                 ['012', '3ab', 'c', ''])
+            nt.assert_equal(results._RepairedFile(f, 4, 'abc').read(),
+                            '0123abc')
+
+
+def test_write_results():
+    """ write_results() writes results that load_results() loads """
+    with utils.resultfile() as tfile:
+        expected = results.load_results(tfile.name)
+        with utils.tempdir() as tdir:
+            metadata = dict((k, v) for k, v in expected.__dict__.iteritems()
+                            if k in expected.serialized_keys and k != 'tests')
+            with open(os.path.join(tdir, 'results.json'), 'w') as f:
+                results.write_results(f, metadata,
+                                      expected.tests.iteritems())
+            new = results.load_results(tdir)
+
+    nt.assert_dict_equal(new.__dict__, expected.__dict__)
+
+
 def test_load_results_folder_as_main():
     """ Test that load_results takes a folder with a file named main in it """
     with utils.tempdir() as tdir:
@@ -182,6 +509,7 @@ def test_get_backend():
     # expect
     backends = {
         'json': results.JSONBackend,
+        'jsonl': results.JSONLBackend,
     }
 
     check = lambda n, i: nt.assert_is(results.get_backend(n), i)
@@ -273,3 +601,32 @@ class TestJUnitMultiTest(TestJUnitSingleTest):
     def test_xml_valid(self):
         """ JUnitBackend.write_test() (twice) produces valid xml """
         super(TestJUnitMultiTest, self).test_xml_valid()
+
+
+class TestJUnitRusage(TestJUnitSingleTest):
+    @classmethod
+    def setup_class(cls):
+        super(TestJUnitRusage, cls).setup_class()
+        cls.test_file = os.path.join(cls.tdir, 'results.xml')
+        test = results.JUnitBackend(cls.tdir, BACKEND_INITIAL_META)
+        test.write_test(
+            'a/test/group/test1',
+            results.TestResult({
+                'time': 1.2345,
+                'result': 'pass',
+                'out': 'this is stdout',
+                'err': 'this is stderr',
+                'rusage': {'utime': 1.0, 'maxrss': 2048},
+            })
+        )
+        test.finalize()
+
+    def test_xml_valid(self):
+        """ JUnitBackend.write_test() with rusage produces valid xml """
+        super(TestJUnitRusage, self).test_xml_valid()
+
+    def test_rusage(self):
+        """ JUnitBackend.write_test() adds rusage to system-err """
+        err = etree.parse(self.test_file).find('.//system-err')
+        nt.assert_equal(err.text,
+                        'this is stderr\n\nrusage: maxrss=2048, utime=1.0')
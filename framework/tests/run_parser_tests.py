@@ -23,9 +23,13 @@
 import sys
 import os
 import shutil
+import threading
 import ConfigParser
 import nose.tools as nt
 import framework.tests.utils as utils
+import framework.results
+import framework.profile
+from framework.exectest import Test
 import framework.programs.run as run
 import framework.core as core
 
@@ -207,3 +211,67 @@ class TestPlatform(_Helpers):
 
             run._run_parser(['-f', os.path.join(tdir, 'piglit.conf'),
                              'quick.py', 'foo'])
+
+
+@nt.raises(KeyboardInterrupt)
+def test_finalize_on_error():
+    """ run._finalize_on_error() writes the queued results when interrupted
+    """
+    class Backend(framework.results.Backend):
+        def __init__(self):
+            self.tests = []
+            self.finalized = False
+
+        def write_test(self, name, data):
+            self.tests.append(name)
+
+        def finalize(self, metadata=None):
+            self.finalized = True
+
+    backend = Backend()
+    writer = framework.results.WriterThread(backend)
+    try:
+        with run._finalize_on_error(writer):
+            for i in xrange(10):
+                writer.write_test(str(i), {'result': 'pass'})
+            raise KeyboardInterrupt
+    finally:
+        nt.assert_equal(len(backend.tests), 10)
+        nt.ok_(backend.finalized)
+
+
+def test_run_before_system_info():
+    """ run.run() runs tests while the system information is collected """
+    ran = threading.Event()
+    first = []
+
+    class _Test(Test):
+        def interpret_result(self):
+            self.result['result'] = 'pass'
+            ran.set()
+
+    def collect_system_info():
+        first.append(ran.wait(10))
+        return {'uname': 'foo'}
+
+    def merge_test_profiles(*_):
+        profile = framework.profile.TestProfile()
+        profile.test_list['a/test'] = _Test(['/bin/true'])
+        return profile
+
+    saved = (core.collect_system_info,
+             framework.profile.merge_test_profiles, run._piglit_dir)
+    core.collect_system_info = collect_system_info
+    framework.profile.merge_test_profiles = merge_test_profiles
+    run._piglit_dir = lambda: None
+    try:
+        with utils.tempdir() as tdir:
+            run.run(['-l', 'dummy', 'quick.py', tdir])
+            results = framework.results.load_results(tdir)
+    finally:
+        (core.collect_system_info, framework.profile.merge_test_profiles,
+         run._piglit_dir) = saved
+
+    nt.assert_list_equal(first, [True])
+    nt.assert_equal(results.uname, 'foo')
+    nt.assert_equal(results.tests['a/test']['result'], 'pass')
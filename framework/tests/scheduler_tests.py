@@ -0,0 +1,112 @@
+# Copyright (c) 2014 Intel Corporation
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+""" Tests for the scheduler module """
+
+import os
+import copy
+try:
+    import simplejson as json
+except ImportError:
+    import json
+import nose.tools as nt
+import framework.tests.utils as utils
+import framework.scheduler as scheduler
+
+
+def test_order_by_duration():
+    """ order_by_duration() puts the longest tests first """
+    tests = [('a', None), ('b', None), ('c', None)]
+    durations = {'a': 1.0, 'b': 10.0, 'c': 5.0}
+
+    nt.assert_list_equal(
+        [n for n, _ in scheduler.order_by_duration(tests, durations)],
+        ['b', 'c', 'a'])
+
+
+def test_order_by_duration_unknown():
+    """ order_by_duration() assumes unknown tests take the median duration """
+    tests = [('a', None), ('b', None), ('c', None), ('new', None)]
+    durations = {'a': 1.0, 'b': 10.0, 'c': 5.0}
+
+    nt.assert_list_equal(
+        [n for n, _ in scheduler.order_by_duration(tests, durations)],
+        ['b', 'c', 'new', 'a'])
+
+
+def test_order_by_duration_default():
+    """ order_by_duration() uses the default for unknown tests if given """
+    tests = [('a', None), ('new', None)]
+
+    nt.assert_list_equal(
+        [n for n, _ in scheduler.order_by_duration(tests, {'a': 1.0},
+                                                   default=2.0)],
+        ['new', 'a'])
+
+
+def test_load_durations():
+    """ load_durations() reads the time of each test from results """
+    data = copy.deepcopy(utils.JSON_DATA)
+    data['tests']['othertest'] = {'result': 'pass'}
+
+    with utils.tempdir() as tdir:
+        with open(os.path.join(tdir, 'results.json'), 'w') as f:
+            json.dump(data, f)
+        durations = scheduler.load_durations([tdir])
+
+    nt.assert_dict_equal(durations, {'sometest': 0.01})
+
+
+class _Test(object):
+    """ Stands in for a Test, only run_concurrent is used by shard() """
+    def __init__(self, run_concurrent=True):
+        self.run_concurrent = run_concurrent
+
+
+def test_shard_covers_all():
+    """ shard() puts every test into exactly one shard """
+    tests = dict(('test{}'.format(i), _Test(i % 3 != 0)) for i in xrange(20))
+    shards = [scheduler.shard(tests, i, 3) for i in xrange(1, 4)]
+
+    names = [n for s in shards for n in s]
+    nt.assert_list_equal(sorted(names), sorted(tests))
+
+
+def test_shard_concurrent_split():
+    """ shard() splits concurrent and non-concurrent tests separately """
+    tests = dict([('a', _Test(True)), ('b', _Test(True)),
+                  ('c', _Test(False)), ('d', _Test(False))])
+
+    for index in [1, 2]:
+        concurrent = [t.run_concurrent for t in
+                      scheduler.shard(tests, index, 2).itervalues()]
+        nt.assert_list_equal(sorted(concurrent), [False, True])
+
+
+def test_shard_durations():
+    """ shard() balances shards by duration """
+    tests = dict((n, _Test()) for n in 'abcd')
+    durations = {'a': 10.0, 'b': 6.0, 'c': 3.0, 'd': 1.0}
+
+    nt.assert_list_equal(
+        sorted(scheduler.shard(tests, 1, 2, durations=durations)), ['a'])
+    nt.assert_list_equal(
+        sorted(scheduler.shard(tests, 2, 2, durations=durations)),
+        ['b', 'c', 'd'])
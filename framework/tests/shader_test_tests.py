@@ -31,13 +31,25 @@ def test_initialize_shader_test():
     shader_test.ShaderTest('tests/spec/glsl-es-1.00/execution/sanity.shader_test')
 
 
+def test_file_not_read_on_init():
+    """ ShaderTest doesn't read the file until the command is needed """
+    shader_test.ShaderTest('this/file/does/not/exist.shader_test')
+
+
+def test_invocation_key_not_read():
+    """ ShaderTest.invocation_key() doesn't read the file """
+    test1 = shader_test.ShaderTest('this/file/does/not/exist.shader_test')
+    test2 = shader_test.ShaderTest('this/file/does/not/exist.shader_test')
+    nt.assert_equal(test1.invocation_key(), test2.invocation_key())
+
+
 def test_parse_gl_test_no_decimal():
     """ The GL Parser raises an exception if GL version lacks decimal """
     data = ('[require]\n'
             'GL = 2\n')
     with utils.with_tempfile(data) as temp:
         with nt.assert_raises(shader_test.ShaderTestParserException) as exc:
-            shader_test.ShaderTest(temp)
+            shader_test.ShaderTest(temp).command
             nt.assert_equal(exc.exception, "No GL version set",
                             msg="A GL version was passed without a decimal, "
                                 "which should have raised an exception, but "
@@ -51,11 +63,12 @@ def test_parse_gles2_test():
             'GLSL ES >= 1.00\n')
     with utils.with_tempfile(data) as temp:
         test = shader_test.ShaderTest(temp)
+        command = test.command
 
     nt.assert_equal(
-        os.path.basename(test.command[0]), "shader_runner_gles2",
+        os.path.basename(command[0]), "shader_runner_gles2",
         msg="This test should have run with shader_runner_gles2, "
-            "but instead ran with " + os.path.basename(test.command[0]))
+            "but instead ran with " + os.path.basename(command[0]))
 
 
 def test_parse_gles3_test():
@@ -65,11 +78,12 @@ def test_parse_gles3_test():
             'GLSL ES >= 3.00\n')
     with utils.with_tempfile(data) as temp:
         test = shader_test.ShaderTest(temp)
+        command = test.command
 
     nt.assert_equal(
-        os.path.basename(test.command[0]), "shader_runner_gles3",
+        os.path.basename(command[0]), "shader_runner_gles3",
         msg="This test should have run with shader_runner_gles3, "
-            "but instead ran with " + os.path.basename(test.command[0]))
+            "but instead ran with " + os.path.basename(command[0]))
 
 
 def test_add_shader_test():
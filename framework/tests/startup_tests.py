@@ -0,0 +1,78 @@
+# Copyright (c) 2014 Intel Corporation
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+""" Tests that keep the startup of the piglit commands fast """
+
+import os
+import sys
+import time
+import subprocess
+import nose.tools as nt
+import framework.tests.utils as utils
+
+# The root of the piglit source tree
+PIGLIT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+
+# An upper bound for running the sanity profile without running its tests. It
+# takes well under a second, this is loose enough not to fail on a loaded
+# machine, but catches startup work that grows with the size of piglit
+SANITY_BOUND = 5.0
+
+
+def _loaded_modules(module):
+    """ Return the modules loaded by importing module in a new python """
+    out = subprocess.check_output(
+        [sys.executable, '-c',
+         'import sys; import {0}; print("\\n".join(sys.modules))'.format(
+             module)],
+        cwd=PIGLIT_DIR)
+    return set(out.splitlines())
+
+
+@utils.nose_generator
+def test_no_optional_imports():
+    """ Generate tests that the run commands don't import what they don't use
+    """
+    def check(module, unwanted):
+        nt.assert_not_in(unwanted, _loaded_modules(module))
+
+    for module in ['framework.programs.run', 'framework.programs.summary']:
+        for unwanted in ['lxml.etree', 'mako.template']:
+            check.description = '{0} does not import {1}'.format(module,
+                                                                 unwanted)
+            yield check, module, unwanted
+
+
+def test_sanity_dry_run_time():
+    """ piglit run --dry-run of the sanity profile starts up quickly """
+    with utils.tempdir() as directory:
+        env = os.environ.copy()
+        env['XDG_CACHE_HOME'] = os.path.join(directory, 'cache')
+        start = time.time()
+        with open(os.devnull, 'w') as devnull:
+            subprocess.check_call(
+                [sys.executable, os.path.join(PIGLIT_DIR, 'piglit'), 'run',
+                 '--dry-run', 'tests/sanity.py',
+                 os.path.join(directory, 'results')],
+                cwd=PIGLIT_DIR, env=env, stdout=devnull)
+        elapsed = time.time() - start
+
+    nt.assert_less(elapsed, SANITY_BOUND)
@@ -0,0 +1,158 @@
+# Copyright (c) 2014 Intel Corporation
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+""" Tests for the subtests module """
+
+import os
+import stat
+import nose.tools as nt
+import framework.tests.utils as utils
+import framework.core as core
+import framework.profile as profile
+import framework.subtests as subtests
+from framework.exectest import PiglitTest
+from framework.results import TestResult
+
+# A test binary with two subtests, the second one fails
+_SCRIPT = """#!/bin/sh
+if [ "$1" = "-list-subtests" ]; then
+    echo "first: First subtest"
+    echo "second: Second subtest"
+    exit 0
+fi
+case "$2" in
+    first) echo 'PIGLIT: {"subtest": {"First subtest": "pass"}}' ;;
+    second) echo 'PIGLIT: {"subtest": {"Second subtest": "fail"}}'
+            echo 'PIGLIT: {"result": "fail"}'
+            exit 0 ;;
+esac
+echo 'PIGLIT: {"result": "pass"}'
+"""
+
+
+class _Test(PiglitTest):
+    """ A PiglitTest that is never skipped """
+    __slots__ = []
+
+    def is_skip(self):
+        return False
+
+
+def _write_script(directory):
+    """ Write _SCRIPT into directory, and return its path """
+    path = os.path.join(directory, 'subtests.sh')
+    with open(path, 'w') as f:
+        f.write(_SCRIPT)
+    os.chmod(path, stat.S_IRWXU)
+    return path
+
+
+def test_list():
+    """ SubtestLister.list() returns the subtests of a test """
+    with utils.tempdir() as tdir:
+        test = _Test([_write_script(tdir)])
+        nt.assert_list_equal(subtests.SubtestLister().list(test),
+                             [('first', 'First subtest'),
+                              ('second', 'Second subtest')])
+
+
+def test_list_no_subtests():
+    """ SubtestLister.list() returns [] for tests that can't list subtests """
+    nt.assert_list_equal(subtests.SubtestLister().list(_Test(['/bin/false'])),
+                         [])
+
+
+def test_list_cached():
+    """ SubtestLister.list() uses the cache while the binary is unchanged """
+    with utils.tempdir() as tdir:
+        cache = os.path.join(tdir, 'cache', 'subtests.json')
+        test = _Test([_write_script(tdir)])
+
+        lister = subtests.SubtestLister(cache)
+        expected = lister.list(test)
+        lister.save()
+
+        # Without the cache this would fail to run
+        os.chmod(test.command[0], stat.S_IRUSR)
+        nt.assert_list_equal(subtests.SubtestLister(cache).list(test),
+                             expected)
+
+
+def test_split():
+    """ split() adds -subtest to the command of each part """
+    test = _Test(['/bin/test', '-auto'])
+    parts = subtests.split('group/test', test, [('a', 'A'), ('b', 'B')])
+
+    nt.assert_list_equal([n for n, _ in parts], ['group/test/a',
+                                                 'group/test/b'])
+    nt.assert_list_equal(parts[1][1].command,
+                         ['/bin/test', '-auto', '-subtest', 'b'])
+
+
+def test_merge():
+    """ merge() returns the worst result and every subtest """
+    results = [
+        TestResult({'result': 'pass', 'subtest': {'A': 'pass'}, 'out': 'a',
+                    'time': 1.0}),
+        TestResult({'result': 'skip', 'subtest': {'B': 'skip'}, 'out': 'b',
+                    'time': 2.0}),
+        TestResult({'result': 'crash', 'returncode': -11, 'time': 0.5}),
+    ]
+    merged = subtests.merge(_Test(['/bin/test']),
+                            [('a', 'A'), ('b', 'B'), ('c', 'C')], results)
+
+    nt.assert_equal(str(merged['result']), 'crash')
+    nt.assert_dict_equal(merged['subtest'],
+                         {'A': 'pass', 'B': 'skip', 'C': 'crash'})
+    nt.assert_equal(merged['returncode'], -11)
+    nt.assert_equal(merged['time'], 2.0)
+    nt.assert_in('==> -subtest b <==\nb', merged['out'])
+
+
+def test_merge_skip():
+    """ merge() only skips when every part was skipped """
+    results = [TestResult({'result': 'skip'}), TestResult({'result': 'skip'})]
+    merged = subtests.merge(_Test(['/bin/test']), [('a', 'A'), ('b', 'B')],
+                            results)
+    nt.assert_equal(str(merged['result']), 'skip')
+
+
+def test_run_split():
+    """ TestProfile.run() runs split tests as parts and merges the results """
+    class _Backend(object):
+        def __init__(self):
+            self.tests = {}
+
+        def write_test(self, name, data):
+            self.tests[name] = data
+
+    with utils.tempdir() as tdir:
+        profile_ = profile.TestProfile()
+        profile_.test_list['group/test'] = _Test([_write_script(tdir)])
+        profile_.split_tests.add('group/test')
+        backend = _Backend()
+        with utils.profile_cache(''):
+            profile_.run(core.Options(), 'dummy', backend)
+
+    nt.assert_list_equal(list(backend.tests), ['group/test'])
+    result = backend.tests['group/test']
+    nt.assert_equal(str(result['result']), 'fail')
+    nt.assert_dict_equal(result['subtest'], {'First subtest': 'pass',
+                                             'Second subtest': 'fail'})
@@ -0,0 +1,150 @@
+# Copyright (c) 2014 Intel Corporation
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+""" Tests for the scheduler module """
+""" Tests for the test_index module """
+
+import os
+import nose.tools as nt
+import framework.test_index as test_index
+import framework.shader_test as shader_test
+import framework.glsl_parser_test as glsl
+import framework.tests.utils as utils
+
+_SHADER_TEST = ('[require]\n'
+                'GL ES >= 2.0\n'
+                'GLSL ES >= 1.00\n')
+
+_PARSER_TEST = ('// [config]\n'
+                '// expect_result: pass\n'
+                '// glsl_version: 1.00\n'
+                '// require_extensions: GL_EXT_foo\n'
+                '// [end config]\n')
+
+
+def _write(directory, name, content):
+    path = os.path.join(directory, name)
+    with open(path, 'w') as f:
+        f.write(content)
+    return path
+
+
+def test_build_index():
+    """ build_index() indexes shader_tests and glslparser tests """
+    with utils.tempdir() as tdir:
+        shader = _write(tdir, 'a.shader_test', _SHADER_TEST)
+        parser = _write(tdir, 'b.frag', _PARSER_TEST)
+        _write(tdir, 'c.txt', 'not a test')
+
+        files = test_index.build_index(tdir)
+
+    nt.assert_equal(sorted(files), sorted([shader, parser]))
+    nt.assert_equal(files[shader][2], 'shader_runner_gles2')
+    nt.assert_equal(files[parser][2], {'expect_result': 'pass',
+                                       'glsl_version': '1.00',
+                                       'require_extensions': 'GL_EXT_foo',
+                                       'check_link': 'false'})
+
+
+def test_build_index_broken():
+    """ build_index() leaves out test files that can't be parsed """
+    with utils.tempdir() as tdir:
+        _write(tdir, 'a.shader_test', 'no config block')
+        _write(tdir, 'b.vert', 'no config block')
+
+        nt.assert_dict_equal(test_index.build_index(tdir), {})
+
+
+def test_build_index_previous():
+    """ build_index() reuses entries of unchanged files """
+    with utils.tempdir() as tdir:
+        shader = _write(tdir, 'a.shader_test', _SHADER_TEST)
+        previous = test_index.build_index(tdir)
+        previous[shader][2] = 'from the previous index'
+
+        files = test_index.build_index(tdir, previous)
+
+    nt.assert_equal(files[shader][2], 'from the previous index')
+
+
+def test_lookup():
+    """ TestIndex.lookup() returns the metadata of indexed files """
+    with utils.tempdir() as tdir:
+        shader = _write(tdir, 'a.shader_test', _SHADER_TEST)
+        index = os.path.join(tdir, test_index.INDEX_NAME)
+        test_index.write_index(index, test_index.build_index(tdir))
+
+        nt.assert_equal(test_index.TestIndex([index]).lookup(shader),
+                        'shader_runner_gles2')
+
+
+def test_lookup_changed():
+    """ TestIndex.lookup() ignores files that changed since they were indexed
+    """
+    with utils.tempdir() as tdir:
+        shader = _write(tdir, 'a.shader_test', _SHADER_TEST)
+        index = os.path.join(tdir, test_index.INDEX_NAME)
+        test_index.write_index(index, test_index.build_index(tdir))
+        _write(tdir, 'a.shader_test', _SHADER_TEST + '\n')
+
+        nt.ok_(test_index.TestIndex([index]).lookup(shader) is None)
+
+
+def test_lookup_missing_index():
+    """ TestIndex.lookup() works without index files """
+    nt.ok_(test_index.TestIndex(['/does/not/exist']).lookup(__file__) is None)
+
+
+def test_shader_test_uses_index():
+    """ ShaderTest takes the runner from the index instead of the file """
+    with utils.tempdir() as tdir:
+        shader = _write(tdir, 'a.shader_test', _SHADER_TEST)
+        files = test_index.build_index(tdir)
+        files[shader][2] = 'shader_runner_gles3'
+        index = os.path.join(tdir, test_index.INDEX_NAME)
+        test_index.write_index(index, files)
+
+        original = shader_test.INDEX
+        shader_test.INDEX = test_index.TestIndex([index])
+        try:
+            command = shader_test.ShaderTest(shader).command
+        finally:
+            shader_test.INDEX = original
+
+    nt.assert_equal(os.path.basename(command[0]), 'shader_runner_gles3')
+
+
+def test_glsl_parser_test_uses_index():
+    """ GLSLParserTest takes the config from the index instead of the file """
+    with utils.tempdir() as tdir:
+        parser = _write(tdir, 'a.frag', _PARSER_TEST)
+        files = test_index.build_index(tdir)
+        files[parser][2]['expect_result'] = 'fail'
+        index = os.path.join(tdir, test_index.INDEX_NAME)
+        test_index.write_index(index, files)
+
+        original = glsl.INDEX
+        glsl.INDEX = test_index.TestIndex([index])
+        try:
+            command = glsl.GLSLParserTest(parser).command
+        finally:
+            glsl.INDEX = original
+
+    nt.assert_equal(command[1:], [parser, 'fail', '1.00', 'GL_EXT_foo'])
@@ -36,12 +36,14 @@ except ImportError:
     import json
 import nose.tools as nt
 import framework.results
+import framework.profile
 
 
 __all__ = [
     'with_tempfile',
     'resultfile',
     'tempdir',
+    'profile_cache',
     'JSON_DATA'
 ]
 
@@ -112,6 +114,24 @@ def tempdir():
     shutil.rmtree(tdir)
 
 
+@contextmanager
+def profile_cache(value):
+    """ Set profile_cache in piglit.conf while the block runs """
+    # Some tests replace core.PIGLIT_CONFIG, the one profile imported is the
+    # one that is read
+    config = framework.profile.PIGLIT_CONFIG
+    added = not config.has_section('core')
+    if added:
+        config.add_section('core')
+    config.set('core', 'profile_cache', value)
+    try:
+        yield value
+    finally:
+        config.remove_option('core', 'profile_cache')
+        if added:
+            config.remove_section('core')
+
+
 @nt.nottest
 class GeneratedTestWrapper(object):
     """ An object proxy for nose test instances
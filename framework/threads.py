@@ -22,7 +22,8 @@
 #
 
 from weakref import WeakKeyDictionary
-from threading import RLock
+from threading import RLock, Condition, Lock
+from contextlib import contextmanager
 
 
 def synchronized_self(function):
@@ -41,3 +42,49 @@ def synchronized_self(function):
 
 # track the locks for each instance
 synchronized_self.locks = WeakKeyDictionary()
+
+
+class ReadWriteLock(object):
+    """ A lock that can be held by many readers, or by a single writer
+
+    Writers are preferred: once a writer is waiting for the lock no new
+    readers are let in, so the current readers drain and the writer gets the
+    lock next. When the writer releases the lock the waiting readers continue.
+
+    """
+    def __init__(self):
+        self._cond = Condition(Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self):
+        """ Context manager holding the lock as one of many readers """
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        """ Context manager holding the lock as the only writer """
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
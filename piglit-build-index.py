@@ -0,0 +1,56 @@
+#!/usr/bin/env python2
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# This permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE AUTHOR(S) BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN
+# AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF
+# OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+""" Write the index of the shader_test and glslparser test files of a tree
+
+This is run by the build, see framework/test_index.py.
+
+"""
+
+import argparse
+import sys
+import os.path as path
+
+sys.path.append(path.dirname(path.realpath(sys.argv[0])))
+from framework.test_index import build_index, read_index, write_index
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("output",
+                        help="The index file to write")
+    parser.add_argument("roots",
+                        nargs="+",
+                        help="Directories to look for test files in")
+    args = parser.parse_args()
+
+    # Only the files that have changed since the last build are read again
+    previous = read_index(args.output)
+    files = {}
+    for root in args.roots:
+        files.update(build_index(root, previous))
+    write_index(args.output, files)
+
+
+if __name__ == "__main__":
+    main()
@@ -27,27 +27,55 @@ import sys
 import os.path
 
 sys.path.append(os.path.dirname(os.path.realpath(sys.argv[0])))
-import framework.core as core
+import framework.results
 
 
 def main():
     parser = argparse.ArgumentParser()
+    parser.add_argument("-o", "--output",
+                        default=None,
+                        metavar="<Output File>",
+                        help="File to write the merged results to. "
+                             "Default: stdout")
     parser.add_argument("results",
                         metavar="<First Results File>",
-                        nargs="*",
+                        nargs="+",
                         help="Space seperated list of results files")
     args = parser.parse_args()
 
-    combined = core.load_results(args.results.pop(0))
+    readers = [framework.results.TestrunReader(r) for r in args.results]
 
-    for resultsDir in args.results:
-        results = core.load_results(resultsDir)
+    # A test in more than one of the results is taken from the last of them.
+    # Only the names of the tests are kept, the results are read again one at
+    # a time while they are written
+    source = {}
+    for index, reader in enumerate(readers):
+        for testname, _ in reader.iter_tests():
+            source[testname] = index
 
-        for testname, result in results.tests.items():
-            combined.tests[testname] = result
+    metadata = dict(readers[0].metadata)
+    for reader in readers[1:]:
+        # Shards of a run are run side by side, so the merged run took as long
+        # as the longest of them
+        if reader.metadata.get('time_elapsed') is not None:
+            metadata['time_elapsed'] = max(metadata.get('time_elapsed'),
+                                           reader.metadata['time_elapsed'])
 
-    combined.write(sys.stdout)
+    # The merged results are no longer a single shard
+    if metadata.get('options') is not None and 'shard' in metadata['options']:
+        metadata['options']['shard'] = [1, 1]
 
+    def tests():
+        for index, reader in enumerate(readers):
+            for testname, result in reader.iter_tests():
+                if source[testname] == index:
+                    yield testname, result
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            framework.results.write_results(f, metadata, tests())
+    else:
+        framework.results.write_results(sys.stdout, metadata, tests())
 
 if __name__ == "__main__":
     main()
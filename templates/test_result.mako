@@ -28,6 +28,24 @@
         <td>Time</td>
         <td>${value.get('time', 'None')}</b>
       </tr>
+    % if value.get('rusage') is not None:
+      <tr>
+        <td>CPU time</td>
+        <td>${value['rusage']['utime']}s user, ${value['rusage']['stime']}s system</td>
+      </tr>
+      <tr>
+        <td>Max RSS</td>
+        <td>${value['rusage']['maxrss']}</td>
+      </tr>
+      <tr>
+        <td>Page faults</td>
+        <td>${value['rusage']['minflt']} minor, ${value['rusage']['majflt']} major</td>
+      </tr>
+      <tr>
+        <td>Context switches</td>
+        <td>${value['rusage']['nvcsw']} voluntary, ${value['rusage']['nivcsw']} involuntary</td>
+      </tr>
+    % endif
     % if value.get('images', None):
       <tr>
         <td>Images</td>
@@ -391,7 +391,8 @@ def add_getactiveuniform_count(group, name, expected):
 
 add_shader_test_dir(shaders,
                     testsDir + '/shaders',
-                    recursive=True)
+                    recursive=True,
+                    prefix='shaders')
 add_concurrent_test(shaders, 'activeprogram-bad-program')
 add_concurrent_test(shaders, 'activeprogram-get')
 add_concurrent_test(shaders, 'attribute0')
@@ -1016,26 +1017,31 @@ spec['!OpenGL 4.4/gl-max-vertex-attrib-stride'] = concurrent_test('gl-4.4-max_ve
 spec['glsl-es-1.00'] = {}
 import_glsl_parser_tests(spec['glsl-es-1.00'],
                          os.path.join(testsDir, 'spec', 'glsl-es-1.00'),
-                         ['compiler'])
+                         ['compiler'],
+                         prefix='spec/glsl-es-1.00')
 spec['glsl-es-1.00']['execution'] = {}
 add_shader_test_dir(spec['glsl-es-1.00']['execution'],
                     os.path.join(testsDir, 'spec', 'glsl-es-1.00', 'execution'),
-                    recursive=True)
+                    recursive=True,
+                    prefix='spec/glsl-es-1.00/execution')
 spec['glsl-es-1.00']['built-in constants'] = concurrent_test('built-in-constants_gles2 ' + os.path.join(testsDir, 'spec/glsl-es-1.00/minimum-maximums.txt'))
 
 # Group spec/glsl-1.10
 spec['glsl-1.10'] = {}
 import_glsl_parser_tests(spec['glsl-1.10'],
                          os.path.join(testsDir, 'spec', 'glsl-1.10'),
-                         ['preprocessor', 'compiler'])
+                         ['preprocessor', 'compiler'],
+                         prefix='spec/glsl-1.10')
 spec['glsl-1.10']['linker'] = {}
 add_shader_test_dir(spec['glsl-1.10']['linker'],
                     os.path.join(testsDir, 'spec', 'glsl-1.10', 'linker'),
-                    recursive=True)
+                    recursive=True,
+                    prefix='spec/glsl-1.10/linker')
 spec['glsl-1.10']['execution'] = {}
 add_shader_test_dir(spec['glsl-1.10']['execution'],
                     os.path.join(testsDir, 'spec', 'glsl-1.10', 'execution'),
-                    recursive=True)
+                    recursive=True,
+                    prefix='spec/glsl-1.10/execution')
 add_concurrent_test(spec['glsl-1.10']['execution'], 'glsl-render-after-bad-attach')
 add_concurrent_test(spec['glsl-1.10']['execution'], 'glsl-1.10-fragdepth')
 spec['glsl-1.10']['execution']['clipping'] = {}
@@ -1059,17 +1065,21 @@ add_concurrent_test(spec['glsl-1.10']['api'], 'getactiveattrib 110');
 spec['glsl-1.20'] = {}
 import_glsl_parser_tests(spec['glsl-1.20'],
                          os.path.join(testsDir, 'spec', 'glsl-1.20'),
-                         ['preprocessor', 'compiler'])
+                         ['preprocessor', 'compiler'],
+                         prefix='spec/glsl-1.20')
 import_glsl_parser_tests(spec['glsl-1.20'],
                          os.path.join(testsDir, 'spec', 'glsl-1.20'),
-                         ['compiler'])
+                         ['compiler'],
+                         prefix='spec/glsl-1.20')
 spec['glsl-1.20']['execution'] = {}
 add_shader_test_dir(spec['glsl-1.20']['execution'],
                     os.path.join(testsDir, 'spec', 'glsl-1.20', 'execution'),
-                    recursive=True)
+                    recursive=True,
+                    prefix='spec/glsl-1.20/execution')
 add_shader_test_dir(spec['glsl-1.20']['execution'],
                     os.path.join(generatedTestDir, 'spec', 'glsl-1.20', 'execution'),
-                    recursive=True)
+                    recursive=True,
+                    prefix='spec/glsl-1.20/execution')
 
 def add_recursion_test(group, name):
     # When the recursion tests fail it is usually because the GLSL
@@ -1133,7 +1143,8 @@ add_concurrent_test(spec['glsl-1.20']['execution'], 'tex-miplevel-selection GL2:
 spec['glsl-1.30'] = {}
 import_glsl_parser_tests(spec['glsl-1.30'],
                          os.path.join(testsDir, 'spec', 'glsl-1.30'),
-                         ['preprocessor', 'compiler'])
+                         ['preprocessor', 'compiler'],
+                         prefix='spec/glsl-1.30')
 spec['glsl-1.30']['execution'] = {}
 
 textureSize_samplers_130 = ['sampler1D', 'sampler2D', 'sampler3D', 'samplerCube', 'sampler1DShadow', 'sampler2DShadow', 'samplerCubeShadow', 'sampler1DArray', 'sampler2DArray', 'sampler1DArrayShadow', 'sampler2DArrayShadow', 'isampler1D', 'isampler2D', 'isampler3D', 'isamplerCube', 'isampler1DArray', 'isampler2DArray', 'usampler1D', 'usampler2D', 'usampler3D', 'usamplerCube', 'usampler1DArray', 'usampler2DArray']
@@ -1182,10 +1193,12 @@ add_concurrent_test(spec['glsl-1.30']['execution'], 'fs-texelFetchOffset-2D')
 add_concurrent_test(spec['glsl-1.30']['execution'], 'fs-textureOffset-2D')
 add_shader_test_dir(spec['glsl-1.30']['execution'],
                     os.path.join(testsDir, 'spec', 'glsl-1.30', 'execution'),
-                    recursive=True)
+                    recursive=True,
+                    prefix='spec/glsl-1.30/execution')
 spec['glsl-1.30']['linker'] = {}
 spec['glsl-1.30']['linker']['clipping'] = {}
 add_plain_test(spec['glsl-1.30']['linker']['clipping'], 'mixing-clip-distance-and-clip-vertex-disallowed')
+spec['glsl-1.30']['execution'].setdefault('clipping', {})
 add_plain_test(spec['glsl-1.30']['execution']['clipping'], 'max-clip-distances')
 for arg in ['vs_basic', 'vs_xfb', 'vs_fbo', 'fs_basic', 'fs_fbo']:
     test_name = 'isinf-and-isnan ' + arg
@@ -1379,10 +1392,13 @@ add_concurrent_test(spec['glsl-1.30']['execution'], 'tex-miplevel-selection text
 spec['glsl-1.40'] = {}
 import_glsl_parser_tests(spec['glsl-1.40'],
                          os.path.join(testsDir, 'spec', 'glsl-1.40'),
-                         ['compiler'])
+                         ['compiler'],
+                         prefix='spec/glsl-1.40')
 add_shader_test_dir(spec['glsl-1.40'],
                     os.path.join(testsDir, 'spec', 'glsl-1.40'),
-                    recursive=True)
+                    recursive=True,
+                    prefix='spec/glsl-1.40')
+spec['glsl-1.40'].setdefault('execution', {})
 spec['glsl-1.40']['execution']['tf-no-position'] = concurrent_test('glsl-1.40-tf-no-position')
 spec['glsl-1.40']['built-in constants'] = concurrent_test('built-in-constants ' + os.path.join(testsDir, 'spec/glsl-1.40/minimum-maximums.txt'))
 
@@ -1409,10 +1425,14 @@ for stage in ['vs', 'gs', 'fs']:
 spec['glsl-1.50'] = {}
 import_glsl_parser_tests(spec['glsl-1.50'],
                          os.path.join(testsDir, 'spec', 'glsl-1.50'),
-                         ['compiler'])
+                         ['compiler'],
+                         prefix='spec/glsl-1.50')
 add_shader_test_dir(spec['glsl-1.50'],
                     os.path.join(testsDir, 'spec', 'glsl-1.50'),
-                    recursive=True)
+                    recursive=True,
+                    prefix='spec/glsl-1.50')
+spec['glsl-1.50'].setdefault('execution', {})
+spec['glsl-1.50']['execution'].setdefault('geometry', {})
 spec['glsl-1.50']['execution']['interface-blocks-api-access-members'] = concurrent_test('glsl-1.50-interface-blocks-api-access-members')
 spec['glsl-1.50']['execution']['get-active-attrib-array'] = concurrent_test('glsl-1.50-get-active-attrib-array')
 spec['glsl-1.50']['execution']['vs-input-arrays'] = concurrent_test('glsl-1.50-vs-input-arrays')
@@ -1489,19 +1509,24 @@ spec['glsl-3.30']['built-in constants'] = concurrent_test('built-in-constants '
 
 import_glsl_parser_tests(spec['glsl-3.30'],
                          os.path.join(testsDir, 'spec', 'glsl-3.30'),
-                         ['compiler'])
+                         ['compiler'],
+                         prefix='spec/glsl-3.30')
 add_shader_test_dir(spec['glsl-3.30'],
                     os.path.join(testsDir, 'spec', 'glsl-3.30'),
-                    recursive=True)
+                    recursive=True,
+                    prefix='spec/glsl-3.30')
 
 # Group spec/glsl-es-3.00
 spec['glsl-es-3.00'] = {}
 import_glsl_parser_tests(spec['glsl-es-3.00'],
                          os.path.join(testsDir, 'spec', 'glsl-es-3.00'),
-                         ['compiler'])
+                         ['compiler'],
+                         prefix='spec/glsl-es-3.00')
 add_shader_test_dir(spec['glsl-es-3.00'],
                     os.path.join(testsDir, 'spec', 'glsl-es-3.00'),
-                    recursive=True)
+                    recursive=True,
+                    prefix='spec/glsl-es-3.00')
+spec['glsl-es-3.00'].setdefault('execution', {})
 add_concurrent_test(spec['glsl-es-3.00']['execution'], 'varying-struct-centroid_gles3')
 spec['glsl-es-3.00']['built-in constants'] = concurrent_test('built-in-constants_gles3 ' + os.path.join(testsDir, 'spec/glsl-es-3.00/minimum-maximums.txt'))
 
@@ -1513,26 +1538,31 @@ profile.test_list['spec/AMD_performance_monitor/measure'] = PiglitTest('amd_perf
 spec['AMD_conservative_depth'] = {}
 import_glsl_parser_tests(spec['AMD_conservative_depth'],
                          os.path.join(testsDir, 'spec', 'amd_conservative_depth'),
-                         [''])
+                         [''],
+                         prefix='spec/AMD_conservative_depth')
 add_shader_test_dir(spec['AMD_conservative_depth'],
                     os.path.join(testsDir, 'spec', 'amd_conservative_depth'),
-                    recursive=True)
+                    recursive=True,
+                    prefix='spec/AMD_conservative_depth')
 
 # Group ARB_arrays_of_arrays
 arb_arrays_of_arrays = {}
 spec['ARB_arrays_of_arrays'] = arb_arrays_of_arrays
 import_glsl_parser_tests(arb_arrays_of_arrays,
                          os.path.join(testsDir, 'spec', 'arb_arrays_of_arrays'),
-                         ['compiler'])
+                         ['compiler'],
+                         prefix='spec/ARB_arrays_of_arrays')
 
 # Group AMD_shader_trinary_minmax
 spec['AMD_shader_trinary_minmax'] = {}
 import_glsl_parser_tests(spec['AMD_shader_trinary_minmax'],
                          os.path.join(testsDir, 'spec', 'amd_shader_trinary_minmax'),
-                         [''])
+                         [''],
+                         prefix='spec/AMD_shader_trinary_minmax')
 add_shader_test_dir(spec['AMD_shader_trinary_minmax'],
                     os.path.join(testsDir, 'spec', 'amd_shader_trinary_minmax'),
-                    recursive=True)
+                    recursive=True,
+                    prefix='spec/AMD_shader_trinary_minmax')
 
 # Group ARB_point_sprite
 arb_point_sprite = {}
@@ -1552,10 +1582,12 @@ arb_tessellation_shader['built-in-constants'] = concurrent_test('built-in-consta
 add_concurrent_test(arb_tessellation_shader, 'arb_tessellation_shader-minmax')
 import_glsl_parser_tests(arb_tessellation_shader,
                          os.path.join(testsDir, 'spec',
-                         'arb_tessellation_shader'), ['compiler'])
+                         'arb_tessellation_shader'), ['compiler'],
+                         prefix='spec/ARB_tessellation_shader')
 add_shader_test_dir(arb_tessellation_shader,
                     os.path.join(testsDir, 'spec', 'arb_tessellation_shader'),
-                    recursive=True)
+                    recursive=True,
+                    prefix='spec/ARB_tessellation_shader')
 
 # Group ARB_texture_multisample
 samplers_atm = ['sampler2DMS', 'isampler2DMS', 'usampler2DMS',
@@ -1625,13 +1657,15 @@ for stage in ['vs', 'fs']:
 spec['AMD_shader_stencil_export'] = {}
 import_glsl_parser_tests(spec['AMD_shader_stencil_export'],
                          os.path.join(testsDir, 'spec', 'amd_shader_stencil_export'),
-                         [''])
+                         [''],
+                         prefix='spec/AMD_shader_stencil_export')
 
 # Group ARB_shader_stencil_export
 spec['ARB_shader_stencil_export'] = {}
 import_glsl_parser_tests(spec['ARB_shader_stencil_export'],
                          os.path.join(testsDir, 'spec', 'arb_shader_stencil_export'),
-                         [''])
+                         [''],
+                         prefix='spec/ARB_shader_stencil_export')
 
 profile.test_list['spec/ARB_stencil_texturing/draw'] = concurrent_test('arb_stencil_texturing-draw')
 
@@ -1698,11 +1732,13 @@ arb_draw_instanced = {}
 spec['ARB_draw_instanced'] = arb_draw_instanced
 import_glsl_parser_tests(arb_draw_instanced,
                         os.path.join(testsDir, 'spec', 'arb_draw_instanced'),
-                        [''])
+                        [''],
+                         prefix='spec/ARB_draw_instanced')
 
 add_shader_test_dir(arb_draw_instanced,
                     os.path.join(testsDir, 'spec', 'arb_draw_instanced', 'execution'),
-                    recursive=True)
+                    recursive=True,
+                    prefix='spec/ARB_draw_instanced')
 arb_draw_instanced['dlist'] = concurrent_test('arb_draw_instanced-dlist')
 arb_draw_instanced['elements'] = concurrent_test('arb_draw_instanced-elements')
 arb_draw_instanced['negative-arrays-first-negative'] = concurrent_test('arb_draw_instanced-negative-arrays-first-negative')
@@ -1728,7 +1764,8 @@ arb_fragment_program = {}
 spec['ARB_fragment_program'] = arb_fragment_program
 add_shader_test_dir(spec['ARB_fragment_program'],
                     os.path.join(testsDir, 'spec', 'arb_fragment_program'),
-                    recursive=True)
+                    recursive=True,
+                    prefix='spec/ARB_fragment_program')
 arb_fragment_program['minmax'] = concurrent_test('arb_fragment_program-minmax')
 add_vpfpgeneric(arb_fragment_program, 'fdo30337a')
 add_vpfpgeneric(arb_fragment_program, 'fdo30337b')
@@ -1759,7 +1796,8 @@ arb_fragment_program_shadow = {}
 spec['ARB_fragment_program_shadow'] = arb_fragment_program_shadow
 add_shader_test_dir(spec['ARB_fragment_program_shadow'],
                     os.path.join(testsDir, 'spec', 'arb_fragment_program_shadow'),
-                    recursive=True)
+                    recursive=True,
+                    prefix='spec/ARB_fragment_program_shadow')
 
 nv_fragment_program_option = {}
 spec['NV_fragment_program_option'] = nv_fragment_program_option
@@ -1776,13 +1814,15 @@ add_vpfpgeneric(arb_fragment_coord_conventions, 'fp-arb-fragment-coord-conventio
 import_glsl_parser_tests(arb_fragment_coord_conventions,
                          os.path.join(testsDir, 'spec',
                                       'arb_fragment_coord_conventions'),
-                         ['compiler'])
+                         ['compiler'],
+                         prefix='spec/ARB_fragment_coord_conventions')
 
 arb_fragment_layer_viewport = {}
 spec['ARB_fragment_layer_viewport'] = arb_fragment_layer_viewport
 add_shader_test_dir(arb_fragment_layer_viewport,
                     os.path.join(testsDir, 'spec', 'arb_fragment_layer_viewport'),
-                    recursive=True)
+                    recursive=True,
+                    prefix='spec/ARB_fragment_layer_viewport')
 
 ati_fragment_shader = {}
 spec['ATI_fragment_shader'] = ati_fragment_shader
@@ -1858,9 +1898,11 @@ arb_gpu_shader5 = {}
 spec['ARB_gpu_shader5'] = arb_gpu_shader5
 add_shader_test_dir(arb_gpu_shader5,
                     os.path.join(testsDir, 'spec', 'arb_gpu_shader5'),
-                    recursive=True)
+                    recursive=True,
+                    prefix='spec/ARB_gpu_shader5')
 import_glsl_parser_tests(arb_gpu_shader5,
-                         testsDir + '/spec/arb_gpu_shader5', [''])
+                         testsDir + '/spec/arb_gpu_shader5', [''],
+                         prefix='spec/ARB_gpu_shader5')
 for stage in ['vs', 'fs']:
     for type in ['unorm', 'float', 'int', 'uint']:
         for comps in ['r', 'rg', 'rgb', 'rgba']:
@@ -1916,27 +1958,33 @@ arb_shader_subroutine = {}
 spec['ARB_shader_subroutine'] = arb_shader_subroutine
 add_shader_test_dir(arb_shader_subroutine,
                     os.path.join(testsDir, 'spec', 'arb_shader_subroutine'),
-                    recursive=True)
+                    recursive=True,
+                    prefix='spec/ARB_shader_subroutine')
 import_glsl_parser_tests(arb_shader_subroutine,
-                         testsDir + '/spec/arb_shader_subroutine', [''])
+                         testsDir + '/spec/arb_shader_subroutine', [''],
+                         prefix='spec/ARB_shader_subroutine')
 add_concurrent_test(arb_shader_subroutine, 'arb_shader_subroutine-minmax')
 
 arb_gpu_shader_fp64 = {}
 spec['ARB_gpu_shader_fp64'] = arb_gpu_shader_fp64
 add_shader_test_dir(arb_gpu_shader_fp64,
                     os.path.join(testsDir, 'spec', 'arb_gpu_shader_fp64'),
-                    recursive=True)
+                    recursive=True,
+                    prefix='spec/ARB_gpu_shader_fp64')
 import_glsl_parser_tests(arb_gpu_shader_fp64,
                     os.path.join(testsDir, 'spec', 'arb_gpu_shader_fp64'),
-                    [''])
+                    [''],
+                         prefix='spec/ARB_gpu_shader_fp64')
 
 arb_texture_query_levels = {}
 spec['ARB_texture_query_levels'] = arb_texture_query_levels
 add_shader_test_dir(arb_texture_query_levels,
                     testsDir + '/spec/arb_texture_query_levels',
-                    recursive=True)
+                    recursive=True,
+                    prefix='spec/ARB_texture_query_levels')
 import_glsl_parser_tests(arb_texture_query_levels,
-                         testsDir + '/spec/arb_texture_query_levels', [''])
+                         testsDir + '/spec/arb_texture_query_levels', [''],
+                         prefix='spec/ARB_texture_query_levels')
 
 arb_occlusion_query = {}
 spec['ARB_occlusion_query'] = arb_occlusion_query
@@ -2012,7 +2060,8 @@ for num_samples in MSAA_SAMPLE_COUNTS:
 
 import_glsl_parser_tests(spec['ARB_sample_shading'],
                          os.path.join(testsDir, 'spec', 'arb_sample_shading'),
-                         ['compiler'])
+                         ['compiler'],
+                         prefix='spec/ARB_sample_shading')
 
 # Group ARB_debug_output
 arb_debug_output = {}
@@ -2066,18 +2115,21 @@ spec['ARB_shader_bit_encoding'] = arb_shader_bit_encoding
 arb_shader_bit_encoding['execution'] = {}
 add_shader_test_dir(arb_shader_bit_encoding['execution'],
                     os.path.join(testsDir, 'spec', 'arb_shader_bit_encoding', 'execution'),
-                    recursive=True)
+                    recursive=True,
+                    prefix='spec/ARB_shader_bit_encoding/execution')
 
 # Group ARB_shader_texture_lod
 arb_shader_texture_lod = {}
 spec['ARB_shader_texture_lod'] = arb_shader_texture_lod
 import_glsl_parser_tests(arb_shader_texture_lod,
                          os.path.join(generatedTestDir, 'spec', 'arb_shader_texture_lod'),
-                         ['compiler'])
+                         ['compiler'],
+                         prefix='spec/ARB_shader_texture_lod')
 arb_shader_texture_lod['execution'] = {}
 add_shader_test_dir(arb_shader_texture_lod['execution'],
                     os.path.join(testsDir, 'spec', 'arb_shader_texture_lod', 'execution'),
-                    recursive=True)
+                    recursive=True,
+                    prefix='spec/ARB_shader_texture_lod/execution')
 add_plain_test(arb_shader_texture_lod['execution'], 'arb_shader_texture_lod-texgrad')
 add_plain_test(arb_shader_texture_lod['execution'], 'arb_shader_texture_lod-texgradcube')
 
@@ -2131,11 +2183,13 @@ arb_shading_language_420pack = {}
 spec['ARB_shading_language_420pack'] = arb_shading_language_420pack
 import_glsl_parser_tests(arb_shading_language_420pack,
                          os.path.join(testsDir, 'spec', 'arb_shading_language_420pack'),
-                         ['compiler'])
+                         ['compiler'],
+                         prefix='spec/ARB_shading_language_420pack')
 arb_shading_language_420pack['execution'] = {}
 add_shader_test_dir(arb_shading_language_420pack['execution'],
                     os.path.join(testsDir, 'spec', 'arb_shading_language_420pack', 'execution'),
-                    recursive=True)
+                    recursive=True,
+                    prefix='spec/ARB_shading_language_420pack/execution')
 spec['ARB_shading_language_420pack']['built-in constants'] = concurrent_test('built-in-constants ' + os.path.join(testsDir, 'spec/arb_shading_language_420pack/minimum-maximums.txt'))
 spec['ARB_shading_language_420pack']['multiple layout qualifiers'] = concurrent_test('arb_shading_language_420pack-multiple-layout-qualifiers')
 
@@ -2145,7 +2199,8 @@ spec['ARB_explicit_attrib_location'] = arb_explicit_attrib_location
 import_glsl_parser_tests(arb_explicit_attrib_location,
                          os.path.join(testsDir,
                          'spec', 'arb_explicit_attrib_location'),
-                         [''])
+                         [''],
+                         prefix='spec/ARB_explicit_attrib_location')
 add_plain_test(arb_explicit_attrib_location, 'glsl-explicit-location-01')
 add_plain_test(arb_explicit_attrib_location, 'glsl-explicit-location-02')
 add_plain_test(arb_explicit_attrib_location, 'glsl-explicit-location-03')
@@ -2161,10 +2216,12 @@ arb_explicit_uniform_location = {}
 spec['ARB_explicit_uniform_location'] = arb_explicit_uniform_location
 import_glsl_parser_tests(arb_explicit_uniform_location,
                          os.path.join(testsDir, 'spec', 'arb_explicit_uniform_location'),
-                         [''])
+                         [''],
+                         prefix='spec/ARB_explicit_uniform_location')
 add_shader_test_dir(arb_explicit_uniform_location,
                     os.path.join(testsDir, 'spec', 'arb_explicit_uniform_location'),
-                    recursive=True)
+                    recursive=True,
+                    prefix='spec/ARB_explicit_uniform_location')
 add_plain_test(arb_explicit_uniform_location, 'arb_explicit_uniform_location-minmax')
 add_plain_test(arb_explicit_uniform_location, 'arb_explicit_uniform_location-boundaries')
 add_plain_test(arb_explicit_uniform_location, 'arb_explicit_uniform_location-array-elements')
@@ -2200,14 +2257,16 @@ arb_texture_query_lod = {}
 spec['ARB_texture_query_lod'] = arb_texture_query_lod
 add_shader_test_dir(arb_texture_query_lod,
                     testsDir + '/spec/arb_texture_query_lod',
-                    recursive=True)
+                    recursive=True,
+                    prefix='spec/ARB_texture_query_lod')
 
 arb_texture_rectangle = {}
 spec['ARB_texture_rectangle'] = arb_texture_rectangle
 add_texwrap_target_tests(arb_texture_rectangle, 'RECT')
 add_shader_test_dir(arb_texture_rectangle,
                     testsDir + '/spec/arb_texture_rectangle',
-                    recursive=True)
+                    recursive=True,
+                    prefix='spec/ARB_texture_rectangle')
 add_msaa_visual_plain_tests(arb_texture_rectangle, 'copyteximage RECT')
 add_concurrent_test(arb_texture_rectangle, '1-1-linear-texture')
 add_plain_test(arb_texture_rectangle, 'texrect-many')
@@ -2828,7 +2887,8 @@ spec['EXT_texture_array']['maxlayers'] = concurrent_test('ext_texture_array-maxl
 spec['EXT_texture_array']['gen-mipmap'] = concurrent_test('ext_texture_array-gen-mipmap')
 add_shader_test_dir(ext_texture_array,
                     testsDir + '/spec/ext_texture_array',
-                    recursive=True)
+                    recursive=True,
+                    prefix='spec/EXT_texture_array')
 add_msaa_visual_plain_tests(ext_texture_array, 'copyteximage 1D_ARRAY')
 add_msaa_visual_plain_tests(ext_texture_array, 'copyteximage 2D_ARRAY')
 add_plain_test(ext_texture_array, 'fbo-array')
@@ -2871,7 +2931,8 @@ add_concurrent_test(arb_texture_cube_map_array, 'fbo-generatemipmap-cubemap arra
 
 import_glsl_parser_tests(arb_texture_cube_map_array,
                          os.path.join(testsDir, 'spec', 'arb_texture_cube_map_array'),
-                         ['compiler'])
+                         ['compiler'],
+                         prefix='spec/ARB_texture_cube_map_array')
 for stage in ['vs', 'gs', 'fs']:
     # textureSize():
     for sampler in textureSize_samplers_atcma:
@@ -2964,7 +3025,8 @@ arb_texture_rg = {}
 spec['ARB_texture_rg'] = arb_texture_rg
 add_shader_test_dir(arb_texture_rg,
                     testsDir + '/spec/arb_texture_rg/execution',
-                    recursive=True)
+                    recursive=True,
+                    prefix='spec/ARB_texture_rg')
 add_fbo_formats_tests('spec/ARB_texture_rg', 'GL_ARB_texture_rg')
 add_fbo_formats_tests('spec/ARB_texture_rg', 'GL_ARB_texture_rg-float', '-float')
 # unsupported for int yet
@@ -3219,10 +3281,12 @@ arb_uniform_buffer_object = {}
 spec['ARB_uniform_buffer_object'] = arb_uniform_buffer_object
 import_glsl_parser_tests(spec['ARB_uniform_buffer_object'],
                          os.path.join(testsDir, 'spec', 'arb_uniform_buffer_object'),
-                         [''])
+                         [''],
+                         prefix='spec/ARB_uniform_buffer_object')
 add_shader_test_dir(spec['ARB_uniform_buffer_object'],
                     os.path.join(testsDir, 'spec', 'arb_uniform_buffer_object'),
-                    recursive=True)
+                    recursive=True,
+                    prefix='spec/ARB_uniform_buffer_object')
 arb_uniform_buffer_object['bindbuffer-general-point'] = concurrent_test('arb_uniform_buffer_object-bindbuffer-general-point')
 arb_uniform_buffer_object['buffer-targets'] = concurrent_test('arb_uniform_buffer_object-buffer-targets')
 arb_uniform_buffer_object['bufferstorage'] = concurrent_test('arb_uniform_buffer_object-bufferstorage')
@@ -3327,7 +3391,8 @@ ext_shader_integer_mix = {}
 spec['EXT_shader_integer_mix'] = ext_shader_integer_mix
 add_shader_test_dir(spec['EXT_shader_integer_mix'],
                     os.path.join(testsDir, 'spec', 'ext_shader_integer_mix'),
-                    recursive=True)
+                    recursive=True,
+                    prefix='spec/EXT_shader_integer_mix')
 
 nv_texture_barrier = {}
 spec['NV_texture_barrier'] = nv_texture_barrier
@@ -3359,7 +3424,8 @@ oes_fixed_point['attribute-arrays'] = concurrent_test('oes_fixed_point-attribute
 spec['OES_standard_derivatives'] = {}
 import_glsl_parser_tests(spec['OES_standard_derivatives'],
                          os.path.join(testsDir, 'spec', 'oes_standard_derivatives'),
-                         ['compiler'])
+                         ['compiler'],
+                         prefix='spec/OES_standard_derivatives')
 
 arb_clear_buffer_object = {}
 spec['ARB_clear_buffer_object'] = arb_clear_buffer_object
@@ -3598,10 +3664,12 @@ for mode in ['1', 'tf 1', 'max', 'tf max']:
 spec['ARB_geometry_shader4'] = arb_geometry_shader4
 add_shader_test_dir(spec['ARB_geometry_shader4'],
                     os.path.join(testsDir, 'spec', 'arb_geometry_shader4'),
-                    recursive=True)
+                    recursive=True,
+                    prefix='spec/ARB_geometry_shader4')
 import_glsl_parser_tests(spec['ARB_geometry_shader4'],
                          os.path.join(testsDir, 'spec', 'arb_geometry_shader4'),
-                         ['compiler'])
+                         ['compiler'],
+                         prefix='spec/ARB_geometry_shader4')
 
 arb_compute_shader = {}
 spec['ARB_compute_shader'] = arb_compute_shader
@@ -3611,10 +3679,12 @@ arb_compute_shader['compiler/work_group_size_too_large'] = \
     concurrent_test('arb_compute_shader-work_group_size_too_large')
 add_shader_test_dir(spec['ARB_compute_shader'],
                     os.path.join(testsDir, 'spec', 'arb_compute_shader'),
-                    recursive=True)
+                    recursive=True,
+                    prefix='spec/ARB_compute_shader')
 import_glsl_parser_tests(spec['ARB_compute_shader'],
                          os.path.join(testsDir, 'spec', 'arb_compute_shader'),
-                         ['compiler'])
+                         ['compiler'],
+                         prefix='spec/ARB_compute_shader')
 arb_compute_shader['built-in constants'] = concurrent_test('built-in-constants ' + os.path.join(testsDir, 'spec/arb_compute_shader/minimum-maximums.txt'))
 
 # group glslparsertest ------------------------------------------------------
@@ -3658,7 +3728,8 @@ add_plain_test(hiz, 'hiz-stencil-test-window-depth1')
 
 fast_color_clear = {}
 add_shader_test_dir(fast_color_clear, testsDir + '/fast_color_clear',
-                    recursive=True)
+                    recursive=True,
+                    prefix='fast_color_clear')
 for subtest in ('sample', 'read_pixels', 'blit', 'copy'):
     for buffer_type in ('rb', 'tex'):
         if subtest == 'sample' and buffer_type == 'rb':
@@ -4181,6 +4252,10 @@ egl_chromium_sync_control = {}
 spec['EGL_CHROMIUM_sync_control'] = egl_chromium_sync_control
 egl_chromium_sync_control['conformance'] = concurrent_test('egl_chromium_sync_control')
 
+# These run many subtests one after another, run each of them on its own
+profile.split_tests.update(['spec/EGL_KHR_fence_sync/conformance',
+                            'spec/EGL_CHROMIUM_sync_control/conformance'])
+
 gles20 = {}
 spec['!OpenGL ES 2.0'] = gles20
 gles20['glsl-fs-pointcoord'] = concurrent_test('glsl-fs-pointcoord_gles2')
@@ -4212,14 +4287,17 @@ for tex_format in ('rgb8', 'srgb8', 'rgba8', 'srgb8-alpha8', 'r11', 'rg11', 'rgb
         arb_es3_compatibility[test_name] = concurrent_test(executable)
 
 add_shader_test_dir(spec, os.path.join(generatedTestDir, 'spec'),
-                    recursive=True)
-import_glsl_parser_tests(profile.tests, generatedTestDir, ['spec'])
+                    recursive=True,
+                    prefix='spec')
+import_glsl_parser_tests(profile.tests, generatedTestDir, ['spec'],
+                         prefix='')
 
 arb_shader_atomic_counters = {}
 spec['ARB_shader_atomic_counters'] = arb_shader_atomic_counters
 import_glsl_parser_tests(spec['ARB_shader_atomic_counters'],
                          os.path.join(testsDir, 'spec', 'arb_shader_atomic_counters'),
-                         [''])
+                         [''],
+                         prefix='spec/ARB_shader_atomic_counters')
 arb_shader_atomic_counters['active-counters'] = concurrent_test('arb_shader_atomic_counters-active-counters')
 arb_shader_atomic_counters['array-indexing'] = concurrent_test('arb_shader_atomic_counters-array-indexing')
 arb_shader_atomic_counters['buffer-binding'] = concurrent_test('arb_shader_atomic_counters-buffer-binding')
@@ -4237,9 +4315,11 @@ arb_derivative_control = {}
 spec['ARB_derivative_control'] = arb_derivative_control
 add_shader_test_dir(arb_derivative_control,
                     os.path.join(testsDir, 'spec', 'arb_derivative_control'),
-                    recursive=True)
+                    recursive=True,
+                    prefix='spec/ARB_derivative_control')
 import_glsl_parser_tests(arb_derivative_control,
-                         testsDir + '/spec/arb_derivative_control', [''])
+                         testsDir + '/spec/arb_derivative_control', [''],
+                         prefix='spec/ARB_derivative_control')
 
 
 profile.tests['hiz'] = hiz
@@ -29,6 +29,8 @@ def add_plain_program_tester_test(group, name, path):
 ######
 # Collecting all tests
 profile = TestProfile()
+# The tests come from outside of piglit, so the profile cannot be cached
+profile.cacheable = False
 
 custom = {}
 api = {}
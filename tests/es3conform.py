@@ -28,6 +28,7 @@ from os import path
 from glob import glob
 from framework.profile import TestProfile
 from framework.exectest import Test, TEST_BIN_DIR
+from framework.matcher import may_contain
 
 __all__ = ['profile']
 
@@ -43,6 +44,8 @@ if not path.exists(path.join(TEST_BIN_DIR, 'GTF3')):
     sys.exit(0)
 
 profile = TestProfile()
+# The tests come from outside of piglit, so the profile cannot be cached
+profile.cacheable = False
 
 # Chase the piglit/bin/GTF symlink to find where the tests really live.
 gtfroot = path.dirname(path.realpath(path.join(TEST_BIN_DIR, 'GTF3')))
@@ -73,7 +76,12 @@ def populateTests(runfile):
 
             newpath = path.join(path.dirname(runfile), line)
             if line.endswith('.run'):
-                populateTests(newpath)
+                # The tests of a .run file are in its directory, skip it if
+                # they are all filtered out of the run
+                directory = path.relpath(path.dirname(newpath), gtfroot)
+                if (directory == '.' or
+                        may_contain(path.join('es3conform', directory))):
+                    populateTests(newpath)
             else:
                 # Add the .test file
                 group = path.join('es3conform', path.relpath(newpath, gtfroot))
@@ -36,6 +36,7 @@ from os import path
 import framework.core
 from framework.profile import TestProfile
 from framework.exectest import Test
+from framework.matcher import matches, may_contain
 
 __all__ = ['profile']
 
@@ -83,6 +84,8 @@ if not (os.path.exists(os.path.join(igtTestRoot, 'single-tests.txt'))
 igtEnvironmentOk = checkEnvironment()
 
 profile = TestProfile()
+# The tests come from outside of piglit, so the profile cannot be cached
+profile.cacheable = False
 
 class IGTTest(Test):
     def __init__(self, binary, arguments=None):
@@ -145,7 +148,7 @@ def addSubTestCases(test):
 
     # a return code of 79 indicates there are no subtests
     if proc.returncode == 79:
-         profile.test_list[path.join('igt', test)] = IGTTest(test)
+         yield path.join('igt', test), IGTTest(test)
          return
 
     if proc.returncode != 0:
@@ -157,11 +160,21 @@ def addSubTestCases(test):
     for subtest in subtests:
         if subtest == "":
             continue
-        profile.test_list[path.join('igt', test, subtest)] = \
-            IGTTest(test, ['--run-subtest', subtest])
-
-for test in tests:
-    addSubTestCases(test)
+        yield (path.join('igt', test, subtest),
+               IGTTest(test, ['--run-subtest', subtest]))
+
+def discoverTests():
+    for test in tests:
+        # Listing the subtests runs the test binary, skip tests that are
+        # filtered out of the run
+        name = path.join('igt', test)
+        if matches(name) or may_contain(name):
+            for pair in addSubTestCases(test):
+                yield pair
+
+# Listing the subtests of every binary takes a while, the tests that have been
+# found already run while the rest are listed
+profile.add_test_source(discoverTests)
 
 profile.dmesg = True
 
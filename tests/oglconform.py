@@ -39,6 +39,8 @@ if not os.path.exists(bin_oglconform):
     sys.exit(0)
 
 profile = TestProfile()
+# The tests come from outside of piglit, so the profile cannot be cached
+profile.cacheable = False
 
 #############################################################################
 ##### OGLCTest: Execute a sub-test of the Intel oglconform test suite.
@@ -65,14 +67,18 @@ class OGLCTest(Test):
 
 testlist_file = '/tmp/oglc.tests'
 
-with open(os.devnull, "w") as devnull:
-    subprocess.call([bin_oglconform, '-generateTestList', testlist_file], stdout=devnull.fileno(), stderr=devnull.fileno())
+def generateTests():
+    with open(os.devnull, "w") as devnull:
+        subprocess.call([bin_oglconform, '-generateTestList', testlist_file], stdout=devnull.fileno(), stderr=devnull.fileno())
 
-with open(testlist_file) as f:
-    testlist = f.read().splitlines()
-    for l in testlist:
-        try:
-            category, test = l.split()
-            profile.test_list[path.join('oglconform', category, test)] = OGLCTest(category, test)
-        except:
-            continue
+    with open(testlist_file) as f:
+        testlist = f.read().splitlines()
+        for l in testlist:
+            try:
+                category, test = l.split()
+            except:
+                continue
+            yield path.join('oglconform', category, test), OGLCTest(category, test)
+
+# Generating the test list runs oglconform, do that while other tests run
+profile.add_test_source(generateTests)
@@ -31,6 +31,7 @@ import itertools
 import framework.core
 from framework.profile import TestProfile
 from framework.exectest import Test
+from framework.matcher import may_contain
 
 __all__ = ['profile']
 
@@ -163,13 +164,22 @@ def populate_profile():
     """ Populate the profile attribute """
     # Add all tests to the profile
     profile = XTSProfile()
+    # The tests come from outside of piglit, so the profile cannot be cached
+    profile.cacheable = False
     fpath = os.path.join(X_TEST_SUITE, 'xts5')
-    for dirpath, _, filenames in os.walk(fpath):
+    for dirpath, dirnames, filenames in os.walk(fpath):
+        # Skip directories whose tests are all filtered out of the run
+        dirnames[:] = [d for d in dirnames if may_contain(
+            os.path.relpath(os.path.join(dirpath, d), X_TEST_SUITE))]
+
         for fname in filenames:
             # only look at the .m test files
             testname, ext = os.path.splitext(fname)
             if ext != '.m':
                 continue
+            if not may_contain('{0}/{1}'.format(
+                    os.path.relpath(dirpath, X_TEST_SUITE), testname)):
+                continue
 
             # incrementing number generator
             counts = (x for x in itertools.count(1, 1))